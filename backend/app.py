@@ -6,6 +6,9 @@ from db import init_db
 from routes.stream_routes import streams_bp
 from routes.session_routes import sessions_bp
 from routes.model_routes import models_bp
+from routes.job_routes import jobs_bp
+from routes.metrics_routes import metrics_bp
+from utils.model_registry import model_registry
 
 def create_app():
     app = Flask(__name__)
@@ -17,10 +20,18 @@ def create_app():
     # Init SQLite
     init_db()
 
+    # Optionally load + warm up models before the first session asks for them
+    # e.g. PREWARM_MODELS=yolofde.pt,yolov8.pt
+    prewarm = [m.strip() for m in os.environ.get("PREWARM_MODELS", "").split(",") if m.strip()]
+    if prewarm:
+        model_registry.prewarm(prewarm)
+
     # Blueprints
     app.register_blueprint(streams_bp, url_prefix="/streams")
     app.register_blueprint(sessions_bp, url_prefix="/")
     app.register_blueprint(models_bp, url_prefix="/")
+    app.register_blueprint(jobs_bp, url_prefix="/jobs")
+    app.register_blueprint(metrics_bp, url_prefix="/")
 
     return app
 
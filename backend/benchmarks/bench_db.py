@@ -0,0 +1,159 @@
+"""
+Load benchmark for session storage: concurrent readers (session listing)
+and writers (session saves), legacy connect-per-call code vs the pooled
+WAL connections + write-behind queue in db.py.
+
+    cd backend && python benchmarks/bench_db.py [--readers 8] [--writers 4] [--seconds 5]
+
+Runs against temporary database files; the real sessions.db is untouched.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db
+
+INSERT = """
+    INSERT INTO sessions
+    (name, timestamp, model_used, source, total_vehicles, car, van, truck, bus, avg_fps)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _row(i):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return (f"Session – {ts}", ts, "YOLO-FDE", f"cam-{i % 7}", 40, 30, 4, 4, 2, 24.5)
+
+
+# ---------- legacy: what session_model did before the pool ----------
+class Legacy:
+    def __init__(self, path):
+        self.path = path
+
+    def _conn(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def setup(self, seed_rows):
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("""CREATE TABLE sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, timestamp TEXT NOT NULL,
+            model_used TEXT NOT NULL, source TEXT NOT NULL, total_vehicles INTEGER NOT NULL,
+            car INTEGER DEFAULT 0, van INTEGER DEFAULT 0, truck INTEGER DEFAULT 0,
+            bus INTEGER DEFAULT 0, avg_fps REAL DEFAULT 0)""")
+        conn.executemany(INSERT, [_row(i) for i in range(seed_rows)])
+        conn.commit()
+        conn.close()
+
+    def write(self, i):
+        conn = self._conn()
+        conn.execute(INSERT, _row(i))
+        conn.commit()
+        conn.close()
+
+    def read(self):
+        conn = self._conn()
+        rows = conn.execute("SELECT * FROM sessions ORDER BY id DESC").fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+
+
+# ---------- pooled: db.get_db() + write_behind ----------
+class Pooled:
+    def __init__(self, path):
+        db.DB_PATH = path
+        db._pool.close_all()
+        db.write_behind.conn = None
+
+    def setup(self, seed_rows):
+        db.init_db()
+        conn = db.get_db()
+        conn.executemany(INSERT, [_row(i) for i in range(seed_rows)])
+        conn.commit()
+        conn.close()
+
+    def write(self, i):
+        db.write_behind.submit(INSERT, _row(i)).wait()
+
+    def read(self):
+        conn = db.get_db()
+        rows = conn.execute("SELECT * FROM sessions ORDER BY id DESC").fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+
+
+def run(impl, readers, writers, seconds):
+    stop = time.monotonic() + seconds
+    ops = {"read": 0, "write": 0, "locked": 0, "error": 0}
+    lat = {"read": [], "write": []}
+    lock = threading.Lock()
+
+    def worker(kind, n):
+        i = 0
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            try:
+                impl.write(n * 100000 + i) if kind == "write" else impl.read()
+                key = kind
+            except sqlite3.OperationalError as e:
+                key = "locked" if "locked" in str(e) else "error"
+            dt = time.perf_counter() - t0
+            with lock:
+                ops[key] += 1
+                if key == kind:
+                    lat[kind].append(dt)
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=("read", n)) for n in range(readers)]
+    threads += [threading.Thread(target=worker, args=("write", n)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    def p95(xs):
+        return sorted(xs)[int(len(xs) * 0.95)] * 1000 if xs else 0.0
+
+    return {
+        "reads/s": ops["read"] / seconds,
+        "writes/s": ops["write"] / seconds,
+        "read p95 ms": p95(lat["read"]),
+        "write p95 ms": p95(lat["write"]),
+        "locked errors": ops["locked"],
+        "other errors": ops["error"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--seed-rows", type=int, default=500)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, cls in (("legacy", Legacy), ("pooled", Pooled)):
+            impl = cls(os.path.join(tmp, f"{name}.db"))
+            impl.setup(args.seed_rows)
+            results[name] = run(impl, args.readers, args.writers, args.seconds)
+        db._pool.close_all()
+
+    keys = list(results["legacy"].keys())
+    print(f"{'':>14} " + " ".join(f"{k:>14}" for k in keys))
+    for name, r in results.items():
+        print(f"{name:>14} " + " ".join(f"{r[k]:>14.1f}" for k in keys))
+
+
+if __name__ == "__main__":
+    main()
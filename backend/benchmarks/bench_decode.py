@@ -0,0 +1,74 @@
+"""
+Decode throughput of each capture backend on the same local files.
+
+    cd backend && python benchmarks/bench_decode.py clip1.mp4 [clip2.mp4 ...] [--width 640] [--skip 1]
+
+For every backend x decoder-thread setting the files are decoded end to
+end. Reported: wall-clock fps and fps per core (frames / CPU seconds of
+this process plus its ffmpeg children), the number that decides how many
+streams fit on a box. Backends that are unavailable here are skipped.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.capture import BACKENDS, open_capture
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def decode_all(path, backend, **opts):
+    cap = open_capture(path, backend=backend, **opts)
+    if cap is None:
+        return None
+    n = 0
+    try:
+        while True:
+            ok, _ = cap.read()
+            if not ok:
+                break
+            n += 1
+    finally:
+        cap.release()
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--threads", default="1,2,0", help="decoder threads to try (0 = decoder default)")
+    ap.add_argument("--width", type=int, default=0, help="also test scaled decoding to this width")
+    ap.add_argument("--skip", type=int, default=0, help="also test keeping 1 of every skip+1 frames")
+    args = ap.parse_args()
+
+    configs = [({}, "full")]
+    if args.width:
+        configs.append(({"width": args.width}, f"w={args.width}"))
+    if args.skip:
+        configs.append(({"skip": args.skip}, f"skip={args.skip}"))
+
+    print(f"{'backend':>8} {'threads':>7} {'mode':>8} {'frames':>7} {'fps':>8} {'fps/core':>9}")
+    for backend in BACKENDS:
+        probe = open_capture(args.files[0], backend=backend)
+        if probe is None:
+            print(f"{backend:>8}  unavailable")
+            continue
+        probe.release()
+        for threads in (int(t) for t in args.threads.split(",")):
+            for opts, label in configs:
+                frames, t0, c0 = 0, time.perf_counter(), cpu_seconds()
+                for path in args.files:
+                    frames += decode_all(path, backend, threads=threads, **opts) or 0
+                wall, cpu = time.perf_counter() - t0, cpu_seconds() - c0
+                print(f"{backend:>8} {threads:>7} {label:>8} {frames:>7} "
+                      f"{frames / wall:>8.1f} {frames / cpu if cpu else 0.0:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
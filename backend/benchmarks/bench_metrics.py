@@ -0,0 +1,103 @@
+"""
+Overhead of the per-frame metrics instrumentation, against the frame time.
+
+    cd backend && python benchmarks/bench_metrics.py [--frames 200000] [--frame-ms 20]
+
+Times exactly what a session does per frame for metrics: six Timer
+blocks feeding StageStats (EWMA + histogram), two moving-window fps ticks
+and one latency sample - with empty stage bodies, so only the bookkeeping
+is measured. The frame time comes from --frame-ms, or by default from one
+stub-detector session of bench_pipeline.py on this machine. Also reports
+the cost of rendering /metrics for --sessions sessions. Exits non-zero
+when the overhead is 1% of the frame time or more.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND)
+
+from utils.pipeline import StageStats, LatencyWindow, Timer
+from utils.metrics import RateWindow
+
+LIMIT = 0.01
+STAGES = ("read", "infer", "track", "count", "plot", "encode")
+
+
+def instrumentation_us(frames: int) -> float:
+    stages = [StageStats(name) for name in STAGES]
+    rate_in, rate_proc = RateWindow(), RateWindow()
+    latency = LatencyWindow()
+    perf = time.perf_counter
+
+    t0 = perf()
+    for _ in range(frames):
+        t_read = perf()
+        rate_in.tick()
+        for st in stages:
+            with Timer(st):
+                pass
+        rate_proc.tick()
+        latency.record(perf() - t_read)
+    return (perf() - t0) / frames * 1e6
+
+
+def baseline_us(frames: int) -> float:
+    # the same loop shape with no bookkeeping, subtracted out
+    perf = time.perf_counter
+    t0 = perf()
+    for _ in range(frames):
+        for _st in STAGES:
+            pass
+    return (perf() - t0) / frames * 1e6
+
+
+def measured_frame_ms() -> float:
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_pipeline.py"),
+           "--case", "stub,1", "--frames", "300"]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=BACKEND)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        raise SystemExit(f"bench_pipeline failed:\n{proc.stderr[-2000:]}")
+    r = json.loads(lines[-1])
+    return r["wall_s"] * 1000.0 / max(1, r["frames"])
+
+
+def scrape_ms(n_sessions: int, repeat: int = 50) -> float:
+    os.environ.setdefault("POOL_MONITOR_S", "3600")
+    from utils.video_worker import StreamManager, StreamSession
+    manager = StreamManager(mode="thread")
+    for sid in range(1, n_sessions + 1):
+        manager.sessions[sid] = StreamSession(sid)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        manager.metrics_text()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=200000)
+    ap.add_argument("--frame-ms", type=float, help="frame time to compare against (default: measure)")
+    ap.add_argument("--sessions", type=int, default=16, help="sessions in the /metrics render test")
+    args = ap.parse_args()
+
+    instrumentation_us(2000)     # warm up
+    cost = max(0.0, instrumentation_us(args.frames) - baseline_us(args.frames))
+    frame_ms = args.frame_ms or measured_frame_ms()
+    share = cost / (frame_ms * 1000.0)
+
+    print(f"instrumentation per frame: {cost:.2f} us")
+    print(f"frame time:                {frame_ms:.2f} ms{'' if args.frame_ms else ' (measured, stub detector)'}")
+    print(f"overhead:                  {share * 100:.3f} % (limit {LIMIT * 100:.0f} %)")
+    print(f"/metrics render, {args.sessions} sessions: {scrape_ms(args.sessions):.2f} ms")
+    if share >= LIMIT:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
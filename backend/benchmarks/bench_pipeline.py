@@ -0,0 +1,296 @@
+"""
+End-to-end benchmark of the real StreamSession pipeline, run headless.
+
+    cd backend && python benchmarks/bench_pipeline.py [--clip clip.mp4] [--models stub,yolov8.pt]
+                                                      [--max 4] [--out results.json]
+
+Without --clip a synthetic clip (boxes driving across a textured road) is
+rendered once into the temp dir. "stub" is a detector registered in the
+model registry: it finds the bright blobs with OpenCV and sleeps --stub-ms
+per batch to stand in for accelerator time, so it needs no GPU, network
+or ultralytics. Any other model name is loaded from models/ and skipped
+when the file is not there.
+
+Every (model, sessions) case runs in a fresh subprocess, so peak RSS is
+per case, against a throwaway SQLite file. Files are read without pacing
+or frame drops, so fps is the pipeline's ceiling. Reported per case:
+mean ms per frame for decode / inference / tracking / counting / plot /
+encode, end-to-end fps summed over sessions, latency percentiles (frame
+read -> counted, or -> JPEG published when --viewers > 0) and peak RSS.
+--out writes it all as JSON, with the commit hash, to compare across
+commits.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import cv2
+import numpy as np
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND)
+
+STAGES = (("read", "decode"), ("infer", "inference"), ("track", "tracking"),
+          ("count", "counting"), ("plot", "plot"), ("encode", "encode"))
+STUB_NAMES = {2: "car", 5: "bus", 7: "truck"}
+
+
+def synthetic_clip(frames: int, width: int, height: int, fps: int = 25) -> str:
+    path = os.path.join(tempfile.gettempdir(), f"tsai_bench_{width}x{height}_{frames}.mp4")
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(0)
+    road = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+    lanes = 6
+    lane_h = height // lanes
+    for i in range(1, lanes):
+        cv2.line(road, (0, i * lane_h), (width, i * lane_h), (150, 150, 150), 2)
+    # (lane, speed px/frame, first frame, length px)
+    cars = [(int(rng.integers(lanes)), float(rng.uniform(4, 12)), int(rng.integers(frames)),
+             int(rng.choice([60, 60, 60, 140]))) for _ in range(frames // 10)]
+
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for f in range(frames):
+        img = road.copy()
+        for lane, speed, t0, length in cars:
+            x = int((f - t0) * speed) - length
+            if -length < x < width:
+                y = lane * lane_h + lane_h // 5
+                cv2.rectangle(img, (x, y), (x + length, y + lane_h * 3 // 5), (235, 235, 235), -1)
+        out.write(img)
+    out.release()
+    return path
+
+
+class _Arr:
+    """Enough of a torch tensor for supervision's from_ultralytics()."""
+
+    def __init__(self, a):
+        self.a = a
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.a
+
+    def int(self):
+        return _Arr(self.a.astype(int))
+
+    def __ge__(self, other):
+        return self.a >= other
+
+    def __len__(self):
+        return len(self.a)
+
+
+class _StubBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy, self.conf, self.cls = _Arr(xyxy), _Arr(conf), _Arr(cls)
+        self.id = None
+
+
+class StubResult:
+    names = STUB_NAMES
+    masks = None
+    obb = None
+
+    def __init__(self, img, xyxy, conf, cls):
+        self.orig_img = img
+        self.orig_shape = img.shape[:2]
+        self.boxes = _StubBoxes(xyxy, conf, cls)
+
+    def __getitem__(self, keep):
+        b = self.boxes
+        return StubResult(self.orig_img, b.xyxy.a[keep], b.conf.a[keep], b.cls.a[keep])
+
+    def plot(self):
+        img = self.orig_img.copy()
+        for x1, y1, x2, y2 in self.boxes.xyxy.a.astype(int):
+            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        return img
+
+
+class StubDetector:
+    """Bright blobs -> boxes (long ones are trucks), plus a fixed per-batch delay."""
+
+    def __init__(self, batch_ms: float = 8.0, stride: int = 4):
+        self.batch_ms = batch_ms
+        self.stride = stride
+
+    def _detect(self, img):
+        s = self.stride
+        grey = cv2.cvtColor(img[::s, ::s], cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(grey, 200, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = [cv2.boundingRect(c) for c in contours]
+        boxes = [(x * s, y * s, (x + w) * s, (y + h) * s) for x, y, w, h in boxes if w * h >= 16]
+        xyxy = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        aspect = (xyxy[:, 2] - xyxy[:, 0]) / np.maximum(xyxy[:, 3] - xyxy[:, 1], 1)
+        cls = np.where(aspect > 3.0, 7, 2)
+        conf = np.full(len(xyxy), 0.9, dtype=np.float32)
+        return StubResult(img, xyxy, conf, cls)
+
+    def predict(self, source, conf=0.25, imgsz=640, verbose=False):
+        frames = source if isinstance(source, list) else [source]
+        if self.batch_ms:
+            time.sleep(self.batch_ms / 1000.0)
+        return [self._detect(f) for f in frames]
+
+
+def run_case(model, n, clip, imgsz, viewers, stub_ms, timeout):
+    """One case, in this (fresh) process; returns the result dict."""
+    os.environ.setdefault("POOL_HIGH_LOAD", "1e9")   # no load shedding mid-measurement
+    import db
+    db.DB_PATH = type(db.DB_PATH)(tempfile.mkdtemp()) / "bench.db"
+    db.init_db()
+    from utils.model_registry import model_registry
+    from utils.video_worker import StreamManager
+
+    if model == "stub":
+        model_registry.register_model("stub", StubDetector(stub_ms))
+    else:
+        model_registry.prewarm([model], imgsz=imgsz)
+
+    manager = StreamManager(mode="thread")
+    t0 = time.perf_counter()
+    sids = []
+    for _ in range(n):
+        ok, msg, sid = manager.start_session(None, model, clip, 0.3, imgsz, 1, {})
+        if not ok:
+            raise SystemExit(f"session failed to start: {msg}")
+        sids.append(sid)
+
+    def watch(sid):
+        for _ in manager.mjpeg_generator(sid):
+            pass
+    for sid in sids:
+        for _ in range(viewers):
+            threading.Thread(target=watch, args=(sid,), daemon=True).start()
+
+    while any(manager.has_session(sid) for sid in sids):
+        if time.perf_counter() - t0 > timeout:
+            for sid in sids:
+                manager.stop_session(sid)
+            break
+        time.sleep(0.02)
+    wall = time.perf_counter() - t0
+
+    sessions = [manager.sessions[sid] for sid in sids]
+    stats = [s.get_stats() for s in sessions]
+    frames = sum(st["frames"] for st in stats)
+    stages = {}
+    for key, name in STAGES:
+        count = sum(st["stages"][key]["frames"] for st in stats)
+        total = sum(st["stages"][key]["total_ms"] for st in stats)
+        stages[name] = {
+            "frames": count,
+            "mean_ms": round(total / count, 3) if count else None,
+            "max_ms": max(st["stages"][key]["max_ms"] for st in stats),
+        }
+    lat = sorted(x for s in sessions for x in s.latency.samples)
+
+    def pct(q):
+        return round(lat[min(len(lat) - 1, int(q * len(lat)))], 2) if lat else None
+    return {
+        "model": model,
+        "sessions": n,
+        "wall_s": round(wall, 3),
+        "frames": frames,
+        "fps": round(frames / wall, 2) if wall > 0 else 0.0,
+        "fps_per_session": round(frames / wall / n, 2) if wall > 0 else 0.0,
+        "stages": stages,
+        "latency_ms": {"p50": pct(0.5), "p90": pct(0.9), "p99": pct(0.99), "max": pct(1.0),
+                       "samples": len(lat)},
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clip", help="local clip; default: a synthetic one")
+    ap.add_argument("--frames", type=int, default=600, help="synthetic clip length")
+    ap.add_argument("--size", default="1280x720", help="synthetic clip WxH")
+    ap.add_argument("--models", default="stub", help="comma-separated: stub and/or files in models/")
+    ap.add_argument("--max", type=int, default=4, help="largest number of concurrent sessions")
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--viewers", type=int, default=1, help="MJPEG viewers per session (0 = no encoding)")
+    ap.add_argument("--stub-ms", type=float, default=8.0, help="stub detector delay per batch")
+    ap.add_argument("--timeout", type=float, default=600.0)
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--case", help=argparse.SUPPRESS)    # internal: model,sessions
+    args = ap.parse_args()
+
+    if args.clip:
+        clip = os.path.abspath(args.clip)
+    else:
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        clip = synthetic_clip(args.frames, w, h)
+
+    if args.case:
+        model, n = args.case.rsplit(",", 1)
+        res = run_case(model, int(n), clip, args.imgsz, args.viewers, args.stub_ms, args.timeout)
+        print(json.dumps(res))
+        return
+
+    models = []
+    for m in (x.strip() for x in args.models.split(",") if x.strip()):
+        if m != "stub" and not os.path.exists(os.path.join(BACKEND, "models", m)):
+            print(f"skipping {m}: not in models/")
+            continue
+        models.append(m)
+    counts = sorted({1, args.max} | {n for n in (2, 4, 8, 16) if n < args.max})
+
+    results = []
+    print(f"{'model':>14} {'sess':>4} {'fps':>8} {'fps/s':>7} {'decode':>7} {'infer':>7} {'track':>7} "
+          f"{'count':>7} {'plot':>7} {'encode':>7} {'p50':>7} {'p99':>7} {'rss_mb':>7}")
+    for model in models:
+        for n in counts:
+            cmd = [sys.executable, os.path.abspath(__file__), "--case", f"{model},{n}", "--clip", clip,
+                   "--imgsz", str(args.imgsz), "--viewers", str(args.viewers),
+                   "--stub-ms", str(args.stub_ms), "--timeout", str(args.timeout)]
+            proc = subprocess.run(cmd, capture_output=True, text=True, cwd=BACKEND)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                print(f"{model} x{n} failed:\n{proc.stderr[-2000:]}")
+                continue
+            r = json.loads(lines[-1])
+            results.append(r)
+            st = r["stages"]
+            ms = [st[name]["mean_ms"] or 0.0 for _, name in STAGES]
+            print(f"{model:>14} {n:>4} {r['fps']:>8.1f} {r['fps_per_session']:>7.1f} "
+                  + " ".join(f"{v:>7.2f}" for v in ms)
+                  + f" {r['latency_ms']['p50'] or 0:>7.1f} {r['latency_ms']['p99'] or 0:>7.1f} {r['peak_rss_mb']:>7.1f}")
+
+    if args.out:
+        report = {
+            "commit": _commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cpus": os.cpu_count(),
+            "clip": clip,
+            "args": {k: v for k, v in vars(args).items() if k != "case"},
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print("wrote", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Aggregate throughput of 1..N concurrent sessions, threads vs processes.
+
+    cd backend && python benchmarks/bench_session_scaling.py --clip clip.mp4 --model yolov8n.pt [--max 8]
+
+Every session processes the same local clip end to end (files are read
+without dropping frames), so the work per session is fixed. Reported:
+wall time, total processed fps across sessions and fps per session. In
+"thread" mode all sessions share this process (and batch inference
+together); in "process" mode each runs in its own child process.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# measure raw scaling: keep the session pool from degrading sessions under load
+os.environ.setdefault("POOL_HIGH_LOAD", "1e9")
+# keep benchmark history out of database/sessions.db; set before db is
+# imported, and only once: spawned process-mode children re-import this file
+os.environ.setdefault("SESSIONS_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from db import init_db
+from utils.video_worker import StreamManager
+
+
+def run(mode, n, model_file, clip, imgsz, timeout):
+    manager = StreamManager(max_sessions=n, mode=mode)
+    t0 = time.perf_counter()
+    for sid in range(1, n + 1):
+        ok, msg, _ = manager.start_session(sid, model_file, clip, 0.3, imgsz, 1, {})
+        if not ok:
+            raise SystemExit(f"session {sid} failed to start: {msg}")
+    while any(manager.has_session(sid) for sid in range(1, n + 1)):
+        if time.perf_counter() - t0 > timeout:
+            for sid in range(1, n + 1):
+                manager.stop_session(sid)
+            break
+        time.sleep(0.05)
+    wall = time.perf_counter() - t0
+    frames = sum((manager.get_stats(sid) or {}).get("frames", 0) for sid in range(1, n + 1))
+    return wall, frames
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clip", required=True)
+    ap.add_argument("--model", required=True, help="model file name inside backend/models")
+    ap.add_argument("--max", type=int, default=os.cpu_count() or 4)
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--timeout", type=float, default=600.0)
+    ap.add_argument("--modes", default="thread,process")
+    args = ap.parse_args()
+
+    init_db()
+    counts = sorted({1, 2, 4, args.max} | set(range(2, args.max + 1, 2)))
+    counts = [n for n in counts if n <= args.max]
+    print(f"{'mode':>8} {'sessions':>8} {'wall_s':>8} {'frames':>8} {'total_fps':>10} {'fps/session':>12}")
+    for mode in args.modes.split(","):
+        for n in counts:
+            wall, frames = run(mode, n, args.model, os.path.abspath(args.clip), args.imgsz, args.timeout)
+            print(f"{mode:>8} {n:>8} {wall:>8.2f} {frames:>8} {frames / wall:>10.1f} {frames / wall / n:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark: session stats under concurrent readers, per-frame locked
+dict updates (the old StreamSession pattern) vs the published snapshot.
+
+    cd backend && python benchmarks/bench_stats.py [--frames 5000] [--every 5]
+
+Each reader polls get_stats() at --poll-hz, like dashboards / the SSE
+publisher watching one session. Reported: writer cost per frame and
+reader latency per get_stats() call.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from types import MappingProxyType
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.counting import TrackCounter
+
+CLASS_NAMES = {0: "car", 1: "van", 2: "truck", 3: "bus", 4: "person"}
+
+
+def _base_stats():
+    return {
+        "sid": 1, "status": "running", "model_file": "m.pt", "source": "x",
+        "resolved_via": "file", "fps_in": 25.0, "fps_proc": 0.0,
+        "counts": {}, "current_visible": {}, "frames": 0,
+    }
+
+
+class LockedStats:
+    """Per-frame writes into a shared dict under a lock; readers copy under the same lock."""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.lock = threading.Lock()
+        self.stats = _base_stats()
+
+    def on_frame(self, frame_no, fps):
+        counts = self.counter.totals_dict()
+        visible = self.counter.current_dict()
+        with self.lock:
+            self.stats["counts"] = dict(counts)
+            self.stats["current_visible"] = dict(visible)
+            self.stats["frames"] += 1
+            if frame_no % 20 == 0:
+                self.stats["fps_proc"] = fps
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class SnapshotStats:
+    """What StreamSession does now: copy-on-write snapshot swapped every N frames."""
+
+    def __init__(self, counter, every):
+        self.counter = counter
+        self.every = every
+        self.frames = 0
+        self._snapshot = MappingProxyType(_base_stats())
+
+    def _publish(self, **changes):
+        snap = dict(self._snapshot)
+        snap.update(changes)
+        self._snapshot = MappingProxyType(snap)
+
+    def on_frame(self, frame_no, fps):
+        self.frames += 1
+        if self.frames % self.every == 0:
+            self._publish(counts=self.counter.totals_dict(), current_visible=self.counter.current_dict(),
+                          frames=self.frames, fps_proc=fps)
+
+    def get_stats(self):
+        return dict(self._snapshot)
+
+
+def run(make, n_frames, n_readers, poll_hz):
+    rng = np.random.default_rng(0)
+    cls = rng.integers(0, len(CLASS_NAMES), 30)
+    ids = np.arange(30, dtype=np.int64)
+    counter = TrackCounter()
+    target = make(counter)
+
+    stop = threading.Event()
+    reads = [0] * n_readers
+    read_time = [0.0] * n_readers
+
+    def reader(i):
+        n, spent = 0, 0.0
+        while not stop.is_set():
+            t = time.perf_counter()
+            target.get_stats()
+            spent += time.perf_counter() - t
+            n += 1
+            stop.wait(1.0 / poll_hz)
+        reads[i], read_time[i] = n, spent
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(n_readers)]
+    for t in threads:
+        t.start()
+
+    t0 = time.perf_counter()
+    for f in range(n_frames):
+        ids += rng.random(30) < 0.02
+        counter.update(cls, ids, CLASS_NAMES)
+        target.on_frame(f, 25.0)
+    writer_s = time.perf_counter() - t0
+
+    stop.set()
+    for t in threads:
+        t.join()
+    total_reads = sum(reads)
+    reader_us = (sum(read_time) / total_reads * 1e6) if total_reads else 0.0
+    return writer_s / n_frames * 1e6, reader_us, total_reads
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=5000)
+    ap.add_argument("--poll-hz", type=float, default=200.0, help="per-reader get_stats() rate")
+    ap.add_argument("--every", type=int, default=5, help="snapshot publish interval (frames)")
+    args = ap.parse_args()
+
+    print(f"{'readers':>7} {'mode':>9} {'writer us/frame':>16} {'reader us/call':>15} {'reads':>9}")
+    for n_readers in (0, 4, 16, 64):
+        for name, make in (("locked", LockedStats),
+                           ("snapshot", lambda c: SnapshotStats(c, args.every))):
+            w_us, r_us, reads = run(make, args.frames, n_readers, args.poll_hz)
+            print(f"{n_readers:>7} {name:>9} {w_us:>16.1f} {r_us:>15.2f} {reads:>9}")
+
+
+if __name__ == "__main__":
+    main()
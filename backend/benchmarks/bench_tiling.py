@@ -0,0 +1,125 @@
+"""
+Accuracy vs latency of full-frame, ROI-cropped and tiled inference on a
+recorded clip.
+
+    cd backend && python benchmarks/bench_tiling.py --clip clip.mp4 --model yolov8n.pt \\
+        [--roi "0,400 3840,400 3840,2160 0,2160"] [--frames 200] [--ref-imgsz 1920]
+
+There is no labelled ground truth, so full-frame inference at --ref-imgsz
+(slow but sees small vehicles) is used as the reference. Every other mode
+is scored against it: recall = reference boxes found (same class,
+IoU >= 0.5), precision = share of its boxes that match the reference.
+Only countable classes are scored; with --roi only reference boxes whose
+anchor lies inside the ROI count.
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+import supervision as sv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ultralytics import YOLO
+from utils.roi import RegionOfInterest
+from utils.counting import COUNTABLE
+
+
+def read_frames(path, n):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < n:
+        ok, f = cap.read()
+        if not ok:
+            break
+        frames.append(f)
+    cap.release()
+    return frames
+
+
+def countable(dets: sv.Detections) -> sv.Detections:
+    names = dets.data.get("class_name") if dets.data else None
+    if names is None or not len(dets):
+        return dets
+    return dets[np.isin(np.char.lower(names.astype(str)), COUNTABLE)]
+
+
+def match(ref: sv.Detections, got: sv.Detections, iou: float = 0.5):
+    """Greedy per-class matching; returns (matched, n_ref, n_got)."""
+    if not len(ref) or not len(got):
+        return 0, len(ref), len(got)
+    ious = sv.box_iou_batch(ref.xyxy, got.xyxy)
+    ious[ref.class_id[:, None] != got.class_id[None, :]] = 0
+    matched = 0
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < iou:
+            break
+        matched += 1
+        ious[i, :] = 0
+        ious[:, j] = 0
+    return matched, len(ref), len(got)
+
+
+def run_mode(model, frames, imgsz, conf, roi: RegionOfInterest):
+    out, t0 = [], time.perf_counter()
+    for f in frames:
+        if roi.active:
+            images, offsets = roi.split(f)
+            results = model.predict(source=images, conf=conf, imgsz=imgsz, verbose=False)
+            out.append(roi.merge(results, offsets))
+        else:
+            res = model.predict(source=f, conf=conf, imgsz=imgsz, verbose=False)[0]
+            out.append(sv.Detections.from_ultralytics(res))
+    ms = (time.perf_counter() - t0) * 1000.0 / max(1, len(frames))
+    return [countable(d) for d in out], ms
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clip", required=True)
+    ap.add_argument("--model", required=True)
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--conf", type=float, default=0.3)
+    ap.add_argument("--ref-imgsz", type=int, default=1920)
+    ap.add_argument("--roi", default="", help='polygon as "x,y x,y x,y ..."')
+    args = ap.parse_args()
+
+    frames = read_frames(args.clip, args.frames)
+    if not frames:
+        sys.exit(f"could not read frames from {args.clip}")
+    polygon = [[int(v) for v in p.split(",")] for p in args.roi.split()] or None
+    model = YOLO(args.model)
+    model.predict(source=frames[0], imgsz=640, verbose=False)   # warm-up
+
+    modes = [("full", 640, None, None), ("full", 1280, None, None)]
+    if polygon:
+        modes += [("roi", 640, polygon, None), ("roi", 1280, polygon, None)]
+    modes += [("tiled 2x2", 640, polygon, (2, 2)), ("tiled 3x2", 640, polygon, (3, 2))]
+
+    ref, ref_ms = run_mode(model, frames, args.ref_imgsz, args.conf, RegionOfInterest())
+    if polygon:
+        # what's outside the ROI is excluded on purpose, not missed
+        clip_roi = RegionOfInterest(polygon=polygon)
+        ref = [clip_roi.keep_inside(d) for d in ref]
+
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"reference: full @ {args.ref_imgsz} ({ref_ms:.1f} ms/frame, "
+          f"{sum(len(d) for d in ref)} boxes)")
+    print(f"{'mode':>10} {'imgsz':>6} {'ms/frame':>9} {'recall':>7} {'precision':>10}")
+    for name, imgsz, poly, tiles in modes:
+        roi = RegionOfInterest(polygon=poly, tiles=tiles)
+        got, ms = run_mode(model, frames, imgsz, args.conf, roi)
+        m = n_ref = n_got = 0
+        for r, g in zip(ref, got):
+            a, b, c = match(r, g)
+            m, n_ref, n_got = m + a, n_ref + b, n_got + c
+        recall = m / n_ref if n_ref else 1.0
+        precision = m / n_got if n_got else 1.0
+        print(f"{name:>10} {imgsz:>6} {ms:>9.1f} {recall:>7.3f} {precision:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: CountingEngine.update() per frame with 4 lines and 3 zones.
+
+    cd backend && python benchmarks/bench_zones.py [--frames 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.zones import CountingEngine
+
+W, H = 1920, 1080
+LINES = [
+    {"name": "north", "points": [[200, 300], [1700, 300]]},
+    {"name": "south", "points": [[200, 800], [1700, 800]]},
+    {"name": "west", "points": [[500, 100], [500, 1000]]},
+    {"name": "east", "points": [[1400, 100], [1400, 1000]]},
+]
+ZONES = [
+    {"name": "junction", "polygon": [[600, 400], [1300, 400], [1400, 700], [500, 700]]},
+    {"name": "bus_bay", "polygon": [[50, 850], [400, 850], [400, 1050], [50, 1050]]},
+    {"name": "lane_l", "polygon": [[700, 0], [900, 0], [950, 1080], [650, 1080], [680, 500]]},
+]
+
+
+def synth(n_tracks: int, n_frames: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform([0, 0], [W, H], (n_tracks, 2))
+    vel = rng.normal(0, 8, (n_tracks, 2))
+    ids = np.arange(1, n_tracks + 1, dtype=np.int64)
+    cls = rng.integers(0, 4, n_tracks)
+    next_id = n_tracks + 1
+    frames = []
+    for _ in range(n_frames):
+        pos = (pos + vel) % [W, H]
+        churn = rng.random(n_tracks) < 0.01
+        k = int(churn.sum())
+        ids[churn] = np.arange(next_id, next_id + k)
+        next_id += k
+        xyxy = np.hstack([pos - [30, 60], pos + [30, 0]])
+        frames.append((xyxy, ids.copy(), cls.copy()))
+    return frames
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=2000)
+    args = ap.parse_args()
+
+    print(f"{'tracks':>7} {'us/frame':>10} {'p99 us':>9} {'crossings':>10}")
+    for n in (10, 100, 300, 1000):
+        frames = synth(n, args.frames)
+        eng = CountingEngine(LINES, ZONES)
+        times = np.empty(len(frames))
+        for i, (xyxy, ids, cls) in enumerate(frames):
+            t0 = time.perf_counter()
+            eng.update(xyxy, ids, cls)
+            times[i] = time.perf_counter() - t0
+        crossings = int(eng.line_counts.sum())
+        print(f"{n:>7} {times.mean() * 1e6:>10.1f} {np.percentile(times, 99) * 1e6:>9.1f} {crossings:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Checks that tiled / ROI inference counts the same vehicles as the full frame.
+
+    cd backend && python benchmarks/check_tile_counts.py [--clip clip.mp4] [--layouts 2x1,2x2,3x3]
+        [--merge-boxes 100,200,300]
+
+Runs the real StreamSession pipeline over one clip (default: the synthetic
+clip of bench_pipeline.py, with its stub detector) once on the full frame
+and once per tile layout, then compares the cumulative counts. A vehicle
+on a tile seam must be merged into one track, not counted once per tile.
+Exits non-zero when any layout's counts differ from the full frame.
+Also times the per-frame seam merge (merge_tile_boxes) on random boxes
+spread over a 3x3-tiled 4K frame, since it runs on every tiled frame.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import StubDetector, synthetic_clip
+
+
+def run(manager, model, clip, options):
+    ok, msg, sid = manager.start_session(None, model, clip, 0.3, 640, 1, options)
+    if not ok:
+        raise SystemExit(f"session failed to start: {msg}")
+    while manager.has_session(sid):
+        time.sleep(0.05)
+    return manager.sessions[sid].get_stats()["counts"]
+
+
+def time_merge(counts, repeat: int = 20):
+    from utils.roi import merge_tile_boxes, EDGE_PX
+    rng = np.random.default_rng(0)
+    tw, th = 3840 // 3, 2160 // 3
+    print(f"{'boxes':>8} {'merged':>8} {'ms/merge':>9}")
+    for n in counts:
+        xy = rng.uniform(0, 1, (n, 2)) * [3840, 2160]
+        wh = rng.uniform(20, 240, (n, 2))
+        xyxy = np.hstack([xy, np.minimum(xy + wh, [3840, 2160])]).astype(np.float32)
+        # boxes reaching an inner tile edge count as cut by it
+        fx, fy = xyxy[:, [0, 2]] % tw, xyxy[:, [1, 3]] % th
+        cut_x = (fx[:, 0] <= EDGE_PX) | (fx[:, 1] >= tw - EDGE_PX)
+        cut_y = (fy[:, 0] <= EDGE_PX) | (fy[:, 1] >= th - EDGE_PX)
+        order = np.lexsort((-rng.random(n), cut_x | cut_y))
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            groups = merge_tile_boxes(xyxy, cut_x, cut_y, order)
+        ms = (time.perf_counter() - t0) * 1000.0 / repeat
+        print(f"{n:>8} {len(groups):>8} {ms:>9.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clip", help="local clip; default: a synthetic one")
+    ap.add_argument("--model", default="stub", help="stub or a file in models/")
+    ap.add_argument("--layouts", default="2x1,2x2,3x3", help="comma-separated COLSxROWS")
+    ap.add_argument("--overlap", type=float, default=0.2)
+    ap.add_argument("--merge-boxes", default="100,200,300", help="box counts to time the merge at; empty to skip")
+    args = ap.parse_args()
+
+    os.environ.setdefault("POOL_HIGH_LOAD", "1e9")
+    import db
+    db.DB_PATH = type(db.DB_PATH)(tempfile.mkdtemp()) / "check.db"
+    db.init_db()
+    from utils.model_registry import model_registry
+    from utils.video_worker import StreamManager
+
+    clip = os.path.abspath(args.clip) if args.clip else synthetic_clip(300, 1280, 720)
+    if args.model == "stub":
+        model_registry.register_model("stub", StubDetector(0))
+    manager = StreamManager(mode="thread")
+
+    full = run(manager, args.model, clip, {})
+    print(f"{'full':>8} {full}")
+    ok = True
+    for layout in (l.strip() for l in args.layouts.split(",") if l.strip()):
+        cols, rows = (int(v) for v in layout.lower().split("x"))
+        counts = run(manager, args.model, clip, {"tiles": [cols, rows], "tile_overlap": args.overlap})
+        same = counts == full
+        ok = ok and same
+        print(f"{layout:>8} {counts} {'OK' if same else 'MISMATCH'}")
+    if args.merge_boxes:
+        time_merge([int(v) for v in args.merge_boxes.split(",")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Simulated load scenarios for the session pool's LoadMonitor.
+
+    cd backend && python benchmarks/sim_session_pool.py
+
+Feeds LoadMonitor.update() synthetic cumulative counters (process CPU
+seconds and per-inference-worker busy seconds, as _counters() collects
+them) for a few server shapes and checks the resulting load against
+POOL_HIGH_LOAD / POOL_ADMIT_LOAD: a lightly used many-core box must not
+degrade or refuse sessions, a saturated one must. Exits non-zero on any
+wrong decision.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.session_pool import LoadMonitor, HIGH_LOAD, ADMIT_LOAD
+
+# name, cores, [(process cpu in cores, [busy fraction of each inference worker])], expect overloaded
+SCENARIOS = [
+    ("16 cores, 4 children at 30% busy", 16, [(1.0, [0.3])] * 4, False),
+    ("16 cores, 4 in-process queues at 30%", 16, [(4.0, [0.3, 0.3, 0.3, 0.3])], False),
+    ("8 cores, 8 children at 95% busy", 8, [(0.95, [0.95])] * 8, True),
+    ("1 core, one queue saturated", 1, [(0.6, [1.0])], True),
+    ("2 cores, cpu bound, queues at 50%", 2, [(2.0, [0.5, 0.5, 0.5, 0.5])], True),
+    ("4 cores, idle", 4, [(0.05, [0.0])], False),
+]
+
+
+def simulate(cores, procs, seconds: float = 2.0):
+    mon = LoadMonitor(cores=cores)
+    before, after = {}, {}
+    for i, (cpu, workers) in enumerate(procs):
+        before[f"cpu:{i}"] = 100.0
+        after[f"cpu:{i}"] = 100.0 + cpu * seconds
+        for j, busy in enumerate(workers):
+            before[f"infer:{i}:{j}"] = 50.0
+            after[f"infer:{i}:{j}"] = 50.0 + busy * seconds
+    mon.update(before, 0.0)
+    mon.update(after, seconds)
+    return mon
+
+
+def main():
+    ok = True
+    print(f"{'scenario':<40} {'cpu':>6} {'infer':>6} {'load':>6} {'admit+1':>8}  decision")
+    for name, cores, procs, expect in SCENARIOS:
+        mon = simulate(cores, procs)
+        overloaded = mon.load > HIGH_LOAD
+        admit = mon.projected(len(procs) + 1)
+        right = overloaded == expect and (expect or admit <= ADMIT_LOAD)
+        ok = ok and right
+        print(f"{name:<40} {mon.cpu:>6.2f} {mon.infer:>6.2f} {mon.load:>6.2f} {admit:>8.2f}  "
+              f"{'degrade' if overloaded else 'ok'}{'' if right else '  WRONG'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Soak test for ResilientReader against a flaky stand-in for a live feed.
+
+    cd backend && python benchmarks/soak_reconnect.py clip.mp4 [--seconds 30] [--drop-every 200]
+
+The stand-in loops a local file at its native fps with network-like
+jitter (frames arrive in bursts), drops the connection every
+--drop-every frames and refuses the first --refuse reconnect attempts
+after each drop. The consumer pulls at the source rate; reported are
+frames delivered, reconnects, gap durations and the longest stall the
+consumer saw, with and without read-ahead.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.resilient_reader import ResilientReader
+
+
+class FlakyFeed:
+    """Live-like capture over a local file: paced, jittery, drops after `drop_every` frames."""
+
+    def __init__(self, path, drop_every, jitter_ms, fps):
+        self.cap = cv2.VideoCapture(path)
+        self.drop_every = drop_every
+        self.jitter = jitter_ms / 1000.0
+        self.period = 1.0 / fps
+        self.n = 0
+        self.next_t = time.monotonic()
+
+    def read(self):
+        self.n += 1
+        if self.n > self.drop_every:
+            return False, None
+        ok, frame = self.cap.read()
+        if not ok:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        # bursty arrival: sometimes late, then the backlog comes at once
+        self.next_t += self.period
+        delay = self.next_t - time.monotonic() + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return ok, frame
+
+    def get(self, prop):
+        return 0.0   # live: no frame count
+
+    def release(self):
+        self.cap.release()
+
+
+def run(path, seconds, drop_every, refuse, jitter_ms, read_ahead, fps):
+    attempts = {"n": 0}
+
+    def opener():
+        attempts["n"] += 1
+        if attempts["n"] % (refuse + 1):
+            return None, None          # camera still down
+        return FlakyFeed(path, drop_every, jitter_ms, fps), "standin"
+
+    reader = ResilientReader(opener, FlakyFeed(path, drop_every, jitter_ms, fps), "standin",
+                             live=True, buffer=read_ahead, backoff_initial=0.05, backoff_max=0.4).start()
+    frames, worst, last = 0, 0.0, time.monotonic()
+    end = last + seconds
+    while time.monotonic() < end:
+        ok, _ = reader.read()
+        if not ok:
+            break
+        now = time.monotonic()
+        worst = max(worst, now - last)
+        last = now
+        frames += 1
+        # steady consumer at the source rate
+        time.sleep(max(0.0, 1.0 / fps - (time.monotonic() - now)))
+    stats = reader.stats()
+    reader.stop()
+    return frames, worst, stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("clip")
+    ap.add_argument("--seconds", type=float, default=30.0)
+    ap.add_argument("--drop-every", type=int, default=200)
+    ap.add_argument("--refuse", type=int, default=2, help="failed attempts before each reconnect succeeds")
+    ap.add_argument("--jitter-ms", type=float, default=80.0)
+    ap.add_argument("--fps", type=float, default=25.0)
+    args = ap.parse_args()
+
+    print(f"{'read_ahead':>10} {'frames':>7} {'reconnects':>10} {'failed':>7} "
+          f"{'max_gap_s':>9} {'total_gap_s':>11} {'worst_stall_ms':>14} {'dropped':>7}")
+    for read_ahead in (1, 4, 8):
+        frames, worst, st = run(args.clip, args.seconds, args.drop_every, args.refuse,
+                                args.jitter_ms, read_ahead, args.fps)
+        print(f"{read_ahead:>10} {frames:>7} {st['reconnects']:>10} {st['failed_attempts']:>7} "
+              f"{st['max_gap_s']:>9} {st['total_gap_s']:>11} {worst * 1000:>14.0f} {st['dropped']:>7}")
+
+
+if __name__ == "__main__":
+    main()
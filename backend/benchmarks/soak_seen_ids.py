@@ -0,0 +1,90 @@
+"""
+Soak run for TrackCounter's seen-id store: millions of synthetic ByteTrack
+ids through one counter, checking counts against an exact set-based
+reference and printing memory as the stream ages. --parked tracks never
+leave the frame (a parked car / stalled truck), so the window has to move
+past ids that are still visible. Exits non-zero when the bitmap outgrows
+its max_window bound.
+
+    cd backend && python benchmarks/soak_seen_ids.py [--frames 200000] [--parked 2] [--check]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.counting import COUNTABLE, TrackCounter
+
+CLASS_NAMES = {0: "car", 1: "van", 2: "truck", 3: "bus", 4: "person"}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=200000)
+    ap.add_argument("--tracks", type=int, default=60, help="vehicles visible per frame")
+    ap.add_argument("--churn", type=float, default=0.05, help="fraction of tracks replaced per frame")
+    ap.add_argument("--parked", type=int, default=2, help="tracks that stay visible for the whole run")
+    ap.add_argument("--check", action="store_true", help="also keep an exact set() reference (grows!)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    ids = np.arange(1, args.tracks + 1, dtype=np.int64)
+    classes = rng.integers(0, len(CLASS_NAMES), args.tracks)
+    next_id = args.tracks + 1
+
+    counter = TrackCounter()
+    reference = {k: set() for k in COUNTABLE} if args.check else None
+    ref_totals = {k: 0 for k in COUNTABLE}
+
+    tracemalloc.start()
+    base_mem = None
+    t0 = time.perf_counter()
+    report_every = max(1, args.frames // 10)
+
+    for f in range(1, args.frames + 1):
+        churn = rng.random(args.tracks) < args.churn
+        churn[:args.parked] = False
+        k = int(churn.sum())
+        if k:
+            ids[churn] = np.arange(next_id, next_id + k)
+            classes[churn] = rng.integers(0, len(CLASS_NAMES), k)
+            next_id += k
+
+        counter.update(classes, ids, CLASS_NAMES)
+
+        if reference is not None:
+            for cid, tid in zip(classes.tolist(), ids.tolist()):
+                name = CLASS_NAMES[cid]
+                if name in reference and tid not in reference[name]:
+                    reference[name].add(tid)
+                    ref_totals[name] += 1
+
+        if f % report_every == 0:
+            cur, _ = tracemalloc.get_traced_memory()
+            if base_mem is None:
+                base_mem = cur
+            st = counter.seen.stats()
+            print(f"frame {f:>9}  ids issued {next_id - 1:>10}  seen-store {st['bytes'] / 1024:7.1f} KiB"
+                  f"  traced {(cur - base_mem) / 1024:9.1f} KiB  compactions {st['compactions']}"
+                  f"  held {st['held']}")
+
+    dt = time.perf_counter() - t0
+    print(f"{args.frames} frames in {dt:.1f}s ({dt / args.frames * 1e6:.1f} us/frame)")
+    print("totals:", counter.totals_dict())
+    seen = counter.seen
+    bounded = seen.bits.shape[1] <= seen.max_window
+    print(f"window {seen.bits.shape[1]} ids (max {seen.max_window})", "OK" if bounded else "UNBOUNDED")
+    ok = bounded
+    if reference is not None:
+        match = counter.totals_dict() == ref_totals
+        print("reference:", ref_totals, "MATCH" if match else "MISMATCH")
+        ok = ok and match
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
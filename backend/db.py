@@ -1,14 +1,220 @@
+import os
+import queue
 import sqlite3
+import threading
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "database" / "sessions.db"
+# SESSIONS_DB: alternate database file (inherited by process-mode session children)
+DB_PATH = Path(os.environ.get("SESSIONS_DB") or Path(__file__).parent / "database" / "sessions.db")
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # readers no longer block on the writer
+    "PRAGMA synchronous=NORMAL",     # safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=10000",
+    "PRAGMA cache_size=-8000",       # 8 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+
+class PooledConnection:
+    """sqlite3.Connection proxy whose close() hands the connection back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self._conn.commit()
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def acquire(self, timeout: float = 30.0) -> PooledConnection:
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self.lock:
+                if self.created < self.size:
+                    self.created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = _connect()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                try:
+                    conn = self.idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted: all {self.size} connections busy for {timeout:g}s"
+                    ) from None
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.created -= 1
+
+
+_pool = ConnectionPool()
+
+
+def get_db():
+    return _pool.acquire()
+
+
+class _Write:
+    __slots__ = ("sql", "params", "done", "rowcount", "error")
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.done = threading.Event()
+        self.rowcount = 0
+        self.error = None
+
+    def wait(self, timeout: float = 30.0) -> int:
+        if not self.done.wait(timeout):
+            raise TimeoutError("database write not committed in time")
+        if self.error is not None:
+            raise self.error
+        return self.rowcount
+
+
+class WriteBehindQueue:
+    """
+    Group-committing writer with one dedicated connection.
+
+    Callers submit() and may wait() for their statement's commit. When no
+    commit is running, submit() commits on the caller's thread along with
+    anything already queued; otherwise the statement is queued and the
+    writer thread commits it with whatever queued meanwhile. Nobody sleeps
+    waiting for more writes: callers block on their own commit, so none
+    would come.
+    """
+
+    def __init__(self, max_batch: int = 256):
+        self.max_batch = max_batch
+        self.q = queue.Queue()
+        self.thread = None
+        self.conn = None        # dedicated, so busy readers can't starve the writer
+        self.lock = threading.Lock()
+        self.commit_lock = threading.Lock()     # held by whoever is committing
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, sql: str, params=()) -> _Write:
+        w = _Write(sql, params)
+        if self.commit_lock.acquire(blocking=False):
+            # nobody committing: do it on this thread, with anything queued,
+            # rather than hand off to the writer (a GIL round trip per write)
+            try:
+                self._commit(self._drain([w]))
+            finally:
+                self.commit_lock.release()
+            return w
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+        self.q.put(w)
+        return w
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            w = self.q.get()
+            with self.commit_lock:
+                self._commit(self._drain([w]))
+
+    def _commit(self, batch):
+        if self.conn is None:
+            self.conn = _connect()
+        conn = self.conn
+        try:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            for w in batch:
+                try:
+                    cur.execute("SAVEPOINT w")
+                    cur.execute(w.sql, w.params)
+                    w.rowcount = cur.rowcount
+                    cur.execute("RELEASE w")
+                except Exception as e:
+                    # one bad statement must not sink the rest of the batch
+                    cur.execute("ROLLBACK TO w")
+                    cur.execute("RELEASE w")
+                    w.error = e
+            conn.commit()
+            self.batches += 1
+            self.writes += len(batch)
+        except Exception as e:
+            for w in batch:
+                if w.error is None:
+                    w.error = e
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            for w in batch:
+                w.done.set()
+
+
+write_behind = WriteBehindQueue()
+
+
 def init_db():
     conn = get_db()
     cur = conn.cursor()
@@ -27,5 +233,45 @@ def init_db():
             avg_fps REAL DEFAULT 0
         );
     """)
+    # id is the rowid, so plain ORDER BY id DESC is already an index walk;
+    # these keep it one when listing is filtered by model / source / time
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_model ON sessions (model_used, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_source ON sessions (source, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_day ON sessions (substr(timestamp, 1, 10))")
+    # one row per session start: sids are reused, history is keyed by run
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_runs (
+            run INTEGER PRIMARY KEY AUTOINCREMENT,
+            sid INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            model_file TEXT NOT NULL,
+            started REAL NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_history_runs_sid ON history_runs (sid, run)")
+    # per-run count history: raw 1 s buckets plus 1 min / 1 h rollups
+    for table in ("count_history", "count_history_1m", "count_history_1h"):
+        cols = [r[1] for r in cur.execute(f"PRAGMA table_info({table})")]
+        if cols and "run" not in cols:
+            # earlier layout keyed by sid alone; its rows can't be told apart by run
+            print(f"{table}: dropping history keyed by sid only")
+            cur.execute(f"DROP TABLE {table}")
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                run INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                car INTEGER DEFAULT 0,
+                van INTEGER DEFAULT 0,
+                truck INTEGER DEFAULT 0,
+                bus INTEGER DEFAULT 0,
+                vis_car INTEGER DEFAULT 0,
+                vis_van INTEGER DEFAULT 0,
+                vis_truck INTEGER DEFAULT 0,
+                vis_bus INTEGER DEFAULT 0,
+                frames INTEGER DEFAULT 0,
+                PRIMARY KEY (run, ts)
+            ) WITHOUT ROWID;
+        """)
     conn.commit()
     conn.close()
@@ -14,6 +14,8 @@ except Exception:
 from ultralytics import YOLO
 import supervision as sv  # ByteTrack, helpers
 
+from utils.counting import TrackCounter
+
 # Only these 4 classes count
 COUNTABLE = ("car", "van", "truck", "bus")
 
@@ -110,7 +112,7 @@ class StreamSession:
 
         # tracking + counting state
         self.tracker = sv.ByteTrack()  # ByteTrack instance
-        self.seen_ids = {k: set() for k in COUNTABLE}         # cumulative identities per class
+        self.counter = TrackCounter(COUNTABLE, NAME_MAP)      # cumulative identities per class
         self.cumulative = {k: 0 for k in COUNTABLE}           # cumulative counts
         self.current_visible = {k: 0 for k in COUNTABLE}      # per-frame visible
 
@@ -130,7 +132,7 @@ class StreamSession:
 
     def _reset_runtime(self):
         self.tracker = sv.ByteTrack()
-        self.seen_ids = {k: set() for k in COUNTABLE}
+        self.counter = TrackCounter(COUNTABLE, NAME_MAP)
         self.cumulative = {k: 0 for k in COUNTABLE}
         self.current_visible = {k: 0 for k in COUNTABLE}
         with self.stats_lock:
@@ -138,23 +140,10 @@ class StreamSession:
             self.stats["current_visible"] = dict(self.current_visible)
 
     def _update_counts_with_tracks(self, tracks: sv.Detections, class_names: dict):
-        # Reset current visible
-        current = {k: 0 for k in COUNTABLE}
-
         # tracks: sv.Detections with .tracker_id, .class_id
-        if len(tracks) > 0:
-            class_ids = tracks.class_id
-            ids = tracks.tracker_id
-            for i in range(len(tracks)):
-                cls_id = int(class_ids[i])
-                track_id = int(ids[i]) if ids is not None else None
-                name = class_names.get(cls_id, str(cls_id)).lower()
-                mapped = NAME_MAP.get(name)
-                if mapped in COUNTABLE:
-                    current[mapped] += 1
-                    if track_id is not None and track_id not in self.seen_ids[mapped]:
-                        self.seen_ids[mapped].add(track_id)
-                        self.cumulative[mapped] += 1
+        self.counter.update(tracks.class_id, tracks.tracker_id, class_names)
+        self.cumulative = self.counter.totals_dict()
+        current = self.counter.current_dict()
 
         with self.stats_lock:
             self.stats["counts"] = dict(self.cumulative)
@@ -0,0 +1,82 @@
+import os
+from flask import Blueprint, request, jsonify, send_file
+
+from utils.batch_jobs import job_manager, find_clips
+from utils.model_export import BACKENDS
+
+jobs_bp = Blueprint("jobs", __name__)
+
+@jobs_bp.route("", methods=["POST"])
+def create_job():
+    """
+    JSON: { path, model_file, conf, imgsz, segments, backend, batch }
+    path: an uploaded file (see /streams/upload) or a directory of clips.
+    segments: max parallel segments per clip (default JOB_WORKERS).
+    backend: pt | onnx | onnx-int8 | openvino (default MODEL_BACKEND, "pt").
+    batch: frames per segment in flight to inference (default JOB_BATCH, else the scheduler's batch limit).
+    Returns: {"job_id": ...}; poll /jobs/<id> for progress.
+    """
+    data = request.get_json(silent=True) or {}
+    path = (data.get("path") or "").strip()
+    model_file = (data.get("model_file") or "").strip()
+    if not path or not model_file:
+        return jsonify({"error": "path and model_file required"}), 400
+    backend = (data.get("backend") or "").strip() or None
+    if backend and backend not in BACKENDS:
+        return jsonify({"error": f"backend must be one of {', '.join(BACKENDS)}"}), 400
+    clips = find_clips(os.path.abspath(path))
+    if not clips:
+        return jsonify({"error": "no video files at path"}), 400
+
+    job = job_manager.submit(
+        clips, model_file,
+        conf=float(data.get("conf") or 0.3),
+        imgsz=int(data.get("imgsz") or 640),
+        segments=int(data.get("segments") or 0) or None,
+        backend=backend,
+        batch=int(data.get("batch") or 0) or None,
+    )
+    return jsonify({"job_id": job.id, "clips": len(clips)}), 202
+
+@jobs_bp.route("", methods=["GET"])
+def list_jobs():
+    # finished jobs drop out after JOB_TTL_S or past the newest JOB_KEEP; their output dirs stay
+    return jsonify({"jobs": job_manager.list()})
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """status, frames_done / frames_total, fps, eta_s; results (counts, files) once done."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.stats())
+
+@jobs_bp.route("/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({"ok": True})
+
+@jobs_bp.route("/<job_id>/counts", methods=["GET"])
+def job_counts(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    path = os.path.join(job.out_dir, "counts.json")
+    if job.status != "done" or not os.path.exists(path):
+        return jsonify({"error": f"job is {job.status}"}), 409
+    return send_file(path, mimetype="application/json")
+
+@jobs_bp.route("/<job_id>/detections", methods=["GET"])
+def job_detections(job_id):
+    """?clip=<index into the job's clips, default 0> -> JSON lines, one per frame."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    if job.status != "done":
+        return jsonify({"error": f"job is {job.status}"}), 409
+    i = request.args.get("clip", 0, type=int)
+    if not 0 <= i < len(job.clips):
+        return jsonify({"error": "clip out of range"}), 404
+    path = job.results[job.clips[i]]["detections"]
+    return send_file(path, mimetype="application/x-ndjson")
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+
+from utils.video_worker import stream_manager
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: stage latency histograms, frame / drop counters, queue depths, windowed fps."""
+    return Response(stream_manager.metrics_text(), mimetype="text/plain; version=0.0.4")
@@ -1,5 +1,8 @@
 import os
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
+
+from utils.model_registry import model_registry
+from utils.model_export import BACKENDS
 
 models_bp = Blueprint("models", __name__)
 
@@ -34,4 +37,50 @@ def get_model_list_legacy():
 def get_model_list_pretty():
     models_dir = os.path.join(os.path.dirname(__file__), "..", "models")
     models_dir = os.path.abspath(models_dir)
-    return jsonify(list_pt(models_dir))
+    models = list_pt(models_dir)
+    # per backend: available / exported / fresh (export matches the current .pt by size + mtime) / unverified, last benchmark
+    for m in models:
+        m.update(model_registry.export_info(m["file"]))
+    return jsonify(models)
+
+@models_bp.route("/models/cache", methods=["GET"])
+def get_model_cache():
+    # resident models, load times, hit/miss counters
+    return jsonify(model_registry.get_stats())
+
+@models_bp.route("/models/benchmark", methods=["POST"])
+def start_model_benchmark():
+    """
+    JSON: { model_file, backends: [...] (default all), imgsz, batch, runs }
+    Exports where needed, then times predict() per backend in the background.
+    202 when started, 409 while another benchmark runs; results on GET.
+    """
+    data = request.get_json(silent=True) or {}
+    model_file = (data.get("model_file") or "").strip()
+    if not model_file:
+        return jsonify({"error": "model_file required"}), 400
+    if not os.path.exists(os.path.join(model_registry.models_dir, model_file)) \
+            and model_file not in model_registry.entries:
+        return jsonify({"error": "model not found"}), 404
+    backends = data.get("backends") or None
+    if backends and any(b not in BACKENDS for b in backends):
+        return jsonify({"error": f"backends must be from {', '.join(BACKENDS)}"}), 400
+    started = model_registry.start_benchmark(
+        model_file,
+        backends=backends,
+        imgsz=int(data.get("imgsz") or 640),
+        batch=max(1, int(data.get("batch") or 1)),
+        runs=max(1, min(500, int(data.get("runs") or 20))),
+    )
+    if not started:
+        return jsonify({"error": "a benchmark is already running"}), 409
+    return jsonify({"ok": True, "model_file": model_file}), 202
+
+@models_bp.route("/models/benchmark", methods=["GET"])
+def get_model_benchmarks():
+    # last result per model: mean / p50 / p90 ms, fps and speedup over pt, per backend
+    bench = model_registry.bench_thread
+    return jsonify({
+        "running": bool(bench and bench.is_alive()),
+        "results": dict(model_registry.benchmarks),
+    })
@@ -1,11 +1,94 @@
-from flask import Blueprint, request, jsonify
-from session_model import save_session_record, fetch_all_sessions, delete_session
+import json
+import hashlib
+from flask import Blueprint, request, jsonify, Response
+from session_model import (
+    save_session_record, delete_session, iter_sessions, aggregate_sessions,
+    sessions_version, AGGREGATE_KEYS,
+)
 
 sessions_bp = Blueprint("sessions", __name__)
 
+MAX_PAGE = 1000
+
+def _filter_args():
+    return {
+        "model": (request.args.get("model") or "").strip() or None,
+        "source": (request.args.get("source") or "").strip() or None,
+        "ts_from": (request.args.get("from") or "").strip() or None,
+        "ts_to": (request.args.get("to") or "").strip() or None,
+    }
+
+def _etag(kind: str) -> str:
+    # table version + the exact query; any insert/delete changes it
+    key = f"{kind}|{sessions_version()}|{sorted(request.args.items(multi=True))}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def _not_modified(etag: str):
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+    return None
+
 @sessions_bp.route("/sessions", methods=["GET"])
 def list_sessions():
-    return jsonify({"sessions": fetch_all_sessions()})
+    """
+    ?limit=50&cursor=<id>&model=&source=&from=YYYY-MM-DD[ HH:MM:SS]&to=...
+    Newest first. With limit, 'next_cursor' is the id to pass as cursor for
+    the next page (null on the last page). Without limit every matching row
+    is returned (legacy behaviour). Streamed; revalidate with If-None-Match.
+    """
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE))
+    filters = _filter_args()
+
+    etag = _etag("list")
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    def gen():
+        yield '{"sessions": ['
+        n = 0
+        last_id = None
+        more = False
+        # one extra row tells us whether another page exists
+        fetch = None if limit is None else limit + 1
+        for row in iter_sessions(limit=fetch, before_id=cursor, **filters):
+            if limit is not None and n == limit:
+                more = True
+                break
+            yield ("," if n else "") + json.dumps(row)
+            n += 1
+            last_id = row["id"]
+        yield '], "next_cursor": ' + json.dumps(last_id if more else None) + "}"
+
+    resp = Response(gen(), mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@sessions_bp.route("/sessions/aggregate", methods=["GET"])
+def aggregate_sessions_route():
+    """
+    ?by=model|source|day plus the same filters as /sessions.
+    Per-group session count, vehicle totals per class and mean avg_fps.
+    """
+    by = request.args.get("by", "model")
+    if by not in AGGREGATE_KEYS:
+        return jsonify({"error": f"by must be one of {sorted(AGGREGATE_KEYS)}"}), 400
+
+    etag = _etag("aggregate")
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    resp = jsonify({"by": by, "groups": aggregate_sessions(by, **_filter_args())})
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 @sessions_bp.route("/sessions", methods=["POST"])
 def save_session_route():
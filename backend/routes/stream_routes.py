@@ -1,8 +1,13 @@
 import os
+import time
 from flask import Blueprint, request, jsonify, Response
 from werkzeug.utils import secure_filename
 
 from utils.video_worker import stream_manager
+from utils.history import query_history, list_runs
+from utils.resolvers import resolver_cache
+from utils.model_export import BACKENDS
+from utils.resilient_reader import MAX_READ_AHEAD
 
 streams_bp = Blueprint("streams", __name__)
 
@@ -12,7 +17,27 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 @streams_bp.route("/start", methods=["POST"])
 def start_stream():
     """
-    JSON: { sid, model_file, source, conf, imgsz, interval }
+    JSON: { sid, model_file, source, conf, imgsz, interval, backend }
+    sid is optional: without it the server assigns one (returned as "sid").
+    backend: pt | onnx | onnx-int8 | openvino (default MODEL_BACKEND, "pt");
+      non-pt backends export the weights on first use and cache them in models/
+    503 when there is no capacity left (load too high, every session degraded).
+    Optional viewer-stream encoding:
+      jpeg_quality (default 80), max_width (px),
+      encode_budget_ms + adaptive_encode (lower quality/size when over budget)
+    Optional directional counting (pixel coords of the source frame):
+      lines: [{name, points: [[x1,y1],[x2,y2]]}], zones: [{name, polygon: [[x,y],...]}]
+    Optional adaptive inference (skip detection while the scene is static):
+      adaptive, motion_threshold (changed-pixel fraction, default 0.001),
+      max_skip (max frames skipped in a row, default 10)
+    Optional high-resolution handling:
+      roi: [[x,y],...] polygon; only its bounding box (outside blacked out) is inferred
+      tiles: n or [cols, rows] (at most 6 per axis) overlapping tiles run as one batch, merged across seams
+      tile_overlap (fraction, default 0.2)
+    Optional decoding:
+      capture_backend (opencv | ffmpeg | pyav), decode_threads, hw_decode,
+      decode_width (scale down while decoding), decode_skip (keep 1 of every n+1 frames)
+      read_ahead (frames buffered ahead of inference, default 4, at most 64)
     """
     data = request.get_json(silent=True) or {}
     sid = int(data.get("sid", 0))
@@ -21,13 +46,42 @@ def start_stream():
     conf = float(data.get("conf") or 0.3)
     imgsz = int(data.get("imgsz") or 640)
     interval = int(data.get("interval") or 1)
+    backend = (data.get("backend") or "").strip() or None
+    if backend and backend not in BACKENDS:
+        return jsonify({"ok": False, "message": f"backend must be one of {', '.join(BACKENDS)}", "sid": sid}), 400
+    options = {
+        "backend": backend,
+        "jpeg_quality": int(data.get("jpeg_quality") or 80),
+        "max_width": int(data.get("max_width") or 0) or None,
+        "encode_budget_ms": float(data.get("encode_budget_ms") or 0) or None,
+        "adaptive_encode": bool(data.get("adaptive_encode", False)),
+        "lines": data.get("lines") or [],
+        "zones": data.get("zones") or [],
+        "adaptive": bool(data.get("adaptive", False)),
+        "motion_threshold": float(data.get("motion_threshold") or 0) or None,
+        "max_skip": int(data.get("max_skip") or 0) or None,
+        "roi": data.get("roi") or None,
+        "tiles": data.get("tiles") or None,
+        "tile_overlap": float(data.get("tile_overlap") or 0) or None,
+        "capture_backend": (data.get("capture_backend") or "").strip() or None,
+        "decode_threads": int(data.get("decode_threads") or 0) or None,
+        "hw_decode": bool(data.get("hw_decode", False)),
+        "decode_width": int(data.get("decode_width") or 0) or None,
+        "decode_skip": int(data.get("decode_skip") or 0),
+        "read_ahead": min(MAX_READ_AHEAD, int(data.get("read_ahead") or 0)) or None,
+    }
 
-    ok, msg = stream_manager.start_session(
+    ok, msg, sid = stream_manager.start_session(
         sid=sid, model_file=model_file, source=source,
-        conf=conf, imgsz=imgsz, interval=interval
+        conf=conf, imgsz=imgsz, interval=interval, options=options
     )
-    status = 200 if ok else 400
-    return jsonify({"ok": ok, "message": msg}), status
+    if ok:
+        status = 200
+    elif msg.startswith(("no capacity", "session limit")):
+        status = 503
+    else:
+        status = 400
+    return jsonify({"ok": ok, "message": msg, "sid": sid}), status
 
 @streams_bp.route("/stop", methods=["POST"])
 def stop_stream():
@@ -36,6 +90,11 @@ def stop_stream():
     stream_manager.stop_session(sid)
     return jsonify({"ok": True})
 
+@streams_bp.route("/list", methods=["GET"])
+def list_streams():
+    """Every session (running or not yet reclaimed), its degrade level, and current load."""
+    return jsonify(stream_manager.list_sessions())
+
 @streams_bp.route("/stats", methods=["GET"])
 def stats():
     sid = int(request.args.get("sid", "0"))
@@ -44,16 +103,106 @@ def stats():
         return jsonify({"error": "invalid sid or no stats"}), 404
     return jsonify(s)
 
+@streams_bp.route("/events", methods=["GET"])
+def stats_events():
+    """
+    Server-sent events instead of polling /stats.
+    ?sid=1,3&rate=2  -> those sessions, at most 2 updates/s
+    ?all=1           -> every session multiplexed into one stream
+    First event per sid carries 'full' stats, later ones only the changed
+    top-level fields in 'delta'.
+    """
+    rate = float(request.args.get("rate") or 2.0)
+    if request.args.get("all") in ("1", "true"):
+        sids = None
+    else:
+        try:
+            sids = [int(x) for x in (request.args.get("sid") or "").split(",") if x.strip()]
+        except ValueError:
+            return jsonify({"error": "sid must be a comma-separated list of ints"}), 400
+        if not sids:
+            return jsonify({"error": "sid or all=1 required"}), 400
+
+    return Response(
+        stream_manager.stats_events(sids, rate),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@streams_bp.route("/history", methods=["GET"])
+def history():
+    """
+    ?sid=1&from=<unix s>&to=<unix s>&resolution=1s|1m|1h|auto[&run=<id>]
+    Defaults to the last hour; 'auto' picks the coarsest table that fits the span.
+    One run per series: `run` (see /history/runs and the "run" stat), else the
+    sid's latest run started before `to`.
+    """
+    sid = int(request.args.get("sid", "0"))
+    run = int(request.args.get("run") or 0) or None
+    t_to = float(request.args.get("to") or time.time())
+    t_from = float(request.args.get("from") or t_to - 3600)
+    resolution = request.args.get("resolution", "auto")
+    if t_from > t_to:
+        return jsonify({"error": "from must be <= to"}), 400
+    return jsonify(query_history(sid, t_from, t_to, resolution, run=run))
+
+@streams_bp.route("/history/runs", methods=["GET"])
+def history_runs():
+    """?sid=1&limit=50: recorded runs (run id, sid, source, model, start time), newest first."""
+    sid = request.args.get("sid")
+    limit = int(request.args.get("limit") or 50)
+    return jsonify(list_runs(int(sid) if sid else None, limit))
+
+@streams_bp.route("/resolvers", methods=["GET"])
+def resolvers():
+    """Resolved-URL cache: entries with seconds left, hits / misses."""
+    return jsonify(resolver_cache.stats())
+
+@streams_bp.route("/scheduler", methods=["GET"])
+def scheduler_stats():
+    # per (model, imgsz) batch sizes and latencies
+    return jsonify(stream_manager.get_scheduler_stats())
+
+@streams_bp.route("/profile", methods=["GET"])
+def profile():
+    """
+    ?sid=1&seconds=5&hz=100&format=json|collapsed
+    Samples the session's threads for `seconds` (blocks meanwhile).
+    'collapsed' returns only the stacks as text, for flamegraph.pl / speedscope.
+    """
+    sid = int(request.args.get("sid", "0"))
+    seconds = float(request.args.get("seconds") or 5.0)
+    hz = float(request.args.get("hz") or 100.0)
+    p = stream_manager.profile_session(sid, seconds, hz)
+    if not p:
+        return jsonify({"error": "invalid sid or session not running"}), 404
+    if request.args.get("format") == "collapsed":
+        return Response(p["collapsed"] + "\n", mimetype="text/plain")
+    return jsonify(p)
+
+@streams_bp.route("/trace", methods=["POST"])
+def trace():
+    """{sid, seconds}: records per-frame stage timings to traces/ (Chrome trace format)."""
+    data = request.get_json(silent=True) or {}
+    sid = int(data.get("sid", 0))
+    seconds = float(data.get("seconds") or 5.0)
+    t = stream_manager.trace_session(sid, seconds)
+    if not t:
+        return jsonify({"error": "invalid sid, session not running or already tracing"}), 404
+    return jsonify(t)
+
 @streams_bp.route("/mjpeg", methods=["GET"])
 def mjpeg():
     sid = int(request.args.get("sid", "0"))
+    # optional per-viewer cap, e.g. /streams/mjpeg?sid=1&fps=5 for thumbnails
+    max_fps = float(request.args.get("fps") or 0) or None
     if not stream_manager.has_session(sid):
         return Response(status=404)
 
     def gen():
         boundary = b"--frame"
         yield b""
-        for jpg in stream_manager.mjpeg_generator(sid):
+        for jpg in stream_manager.mjpeg_generator(sid, max_fps=max_fps):
             yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n"
     return Response(gen(), mimetype="multipart/x-mixed-replace; boundary=frame")
 
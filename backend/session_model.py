@@ -1,9 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime
-from db import get_db, init_db
-
-# ensure table exists
-init_db()
+from db import get_db, write_behind
 
 def save_session_record(
     model_used: str,
@@ -12,11 +9,10 @@ def save_session_record(
     breakdown: Dict[str, int],
     avg_fps: float
 ) -> None:
-    conn = get_db()
-    cur = conn.cursor()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     name = f"Session – {timestamp}"
-    cur.execute("""
+    # group-committed with any other writes in flight; returns once durable
+    write_behind.submit("""
         INSERT INTO sessions
         (name, timestamp, model_used, source, total_vehicles, car, van, truck, bus, avg_fps)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -27,22 +23,99 @@ def save_session_record(
         breakdown.get("truck", 0),
         breakdown.get("bus", 0),
         float(avg_fps or 0.0),
-    ))
-    conn.commit()
-    conn.close()
+    )).wait()
 
 def fetch_all_sessions() -> List[Dict[str, Any]]:
+    # every row at once; the routes page through iter_sessions() instead
+    return list(iter_sessions())
+
+def _filters(model: Optional[str] = None, source: Optional[str] = None,
+             ts_from: Optional[str] = None, ts_to: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+    # timestamps are "YYYY-MM-DD HH:MM:SS" text, so string comparison orders them
+    where, args = [], []
+    if model:
+        where.append("model_used = ?")
+        args.append(model)
+    if source:
+        where.append("source = ?")
+        args.append(source)
+    if ts_from:
+        where.append("timestamp >= ?")
+        args.append(ts_from)
+    if ts_to:
+        # a bare date means "through the end of that day"
+        where.append("timestamp <= ?")
+        args.append(ts_to + " 23:59:59" if len(ts_to) == 10 else ts_to)
+    return where, args
+
+def iter_sessions(limit: Optional[int] = None, before_id: Optional[int] = None,
+                  chunk: int = 200, **filters) -> Iterator[Dict[str, Any]]:
+    """
+    Newest-first rows, keyset-paginated on id (WHERE id < cursor), read in
+    chunks so a long history is never materialized at once.
+    """
+    where, args = _filters(**filters)
+    remaining = limit
+    cursor = before_id
+    while remaining is None or remaining > 0:
+        n = chunk if remaining is None else min(chunk, remaining)
+        clauses = list(where)
+        params = list(args)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+        sql = "SELECT * FROM sessions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        conn = get_db()
+        try:
+            rows = conn.execute(sql, params + [n]).fetchall()
+        finally:
+            conn.close()
+        for r in rows:
+            yield dict(r)
+        if len(rows) < n:
+            return
+        cursor = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+AGGREGATE_KEYS = {
+    "model": "model_used",
+    "source": "source",
+    "day": "substr(timestamp, 1, 10)",
+}
+
+def aggregate_sessions(by: str, **filters) -> List[Dict[str, Any]]:
+    key = AGGREGATE_KEYS[by]
+    where, args = _filters(**filters)
+    sql = f"""
+        SELECT {key} AS key,
+               COUNT(*) AS sessions,
+               SUM(total_vehicles) AS total_vehicles,
+               SUM(car) AS car, SUM(van) AS van, SUM(truck) AS truck, SUM(bus) AS bus,
+               AVG(avg_fps) AS avg_fps
+        FROM sessions
+        {"WHERE " + " AND ".join(where) if where else ""}
+        GROUP BY key
+        ORDER BY key {"DESC" if by == "day" else "ASC"}
+    """
     conn = get_db()
-    cur = conn.cursor()
-    rows = cur.execute("SELECT * FROM sessions ORDER BY id DESC").fetchall()
-    conn.close()
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
     return [dict(r) for r in rows]
 
-def delete_session(session_id: int) -> bool:
+def sessions_version() -> Tuple[int, int]:
+    """(max id, row count): changes on every insert/delete, cheap to compute for ETags."""
     conn = get_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM sessions WHERE id=?", (session_id,))
-    conn.commit()
-    ok = cur.rowcount > 0
-    conn.close()
-    return ok
+    try:
+        row = conn.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM sessions").fetchone()
+    finally:
+        conn.close()
+    return int(row[0]), int(row[1])
+
+def delete_session(session_id: int) -> bool:
+    return write_behind.submit("DELETE FROM sessions WHERE id=?", (session_id,)).wait() > 0
@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import supervision as sv
+
+from .capture import open_capture, DECODE_THREADS
+from .resilient_reader import ResilientReader
+from .model_registry import model_registry
+from .inference_scheduler import inference_scheduler, RESULT_TIMEOUT_S
+from .counting import COUNTABLE, NAME_MAP, build_class_lut
+
+JOBS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "jobs"))
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm", ".ts", ".mpg", ".mpeg")
+
+# segments decoded + tracked in parallel, across all jobs
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", str(max(2, os.cpu_count() or 2))))
+JOB_READ_AHEAD = int(os.environ.get("JOB_READ_AHEAD", "8"))
+# frames each segment re-tracks before its start, to stitch tracks with the previous one
+SEGMENT_OVERLAP = int(os.environ.get("JOB_SEGMENT_OVERLAP", "30"))
+MIN_SEGMENT_FRAMES = int(os.environ.get("JOB_MIN_SEGMENT_FRAMES", "600"))
+# frames per segment queued for inference while the tracker catches up;
+# 0 = the scheduler's batch limit, so even a single segment fills batches
+JOB_BATCH = int(os.environ.get("JOB_BATCH", "0"))
+# finished jobs kept in memory (their output dirs stay on disk)
+JOB_KEEP = int(os.environ.get("JOB_KEEP", "50"))
+JOB_TTL_S = float(os.environ.get("JOB_TTL_S", str(24 * 3600)))
+STITCH_IOU = 0.5
+STITCH_MIN_VOTES = 3     # overlap frames two tracks must agree on to be joined
+
+
+def find_clips(path: str):
+    """A video file, or every video file in a directory (sorted)."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.lower().endswith(VIDEO_EXTS) and os.path.isfile(os.path.join(path, f))
+        )
+    return [path] if os.path.isfile(path) else []
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of xyxy boxes, shape (len(a), len(b))."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_tracks(tail: dict, head: dict):
+    """
+    Joins track ids of two segments over the frames both tracked.
+    tail / head: frame -> (xyxy, track ids). Returns {head id: tail id}.
+    """
+    votes = {}
+    for f, (xa, ta) in tail.items():
+        if f not in head:
+            continue
+        xb, tb = head[f]
+        if not len(ta) or not len(tb):
+            continue
+        iou = _iou(xa, xb)
+        # greedy one-to-one per frame, best overlaps first
+        used_a, used_b = set(), set()
+        for i, j in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[i, j] < STITCH_IOU:
+                break
+            if i in used_a or j in used_b:
+                continue
+            used_a.add(i)
+            used_b.add(j)
+            key = (int(tb[j]), int(ta[i]))
+            votes[key] = votes.get(key, 0) + 1
+
+    mapping, taken = {}, set()
+    for (b, a), n in sorted(votes.items(), key=lambda kv: -kv[1]):
+        if n < STITCH_MIN_VOTES or b in mapping or a in taken:
+            continue
+        mapping[b] = a
+        taken.add(a)
+    return mapping
+
+
+class _Segment:
+    """Frames [start, end) of one clip; end None = until the clip ends."""
+
+    def __init__(self, clip: str, index: int, start: int, end, part_path: str):
+        self.clip = clip
+        self.index = index
+        self.start = start
+        self.end = end
+        self.warm_start = max(0, start - SEGMENT_OVERLAP) if index else 0
+        self.part_path = part_path
+        self.frames = 0          # emitted (own range) frames done
+        self.head = {}           # warm-up frames: frame -> (xyxy, ids), matched to the previous tail
+        self.tail = deque(maxlen=SEGMENT_OVERLAP)   # last own frames, matched to the next head
+        self.seen = set()        # (class index, local track id) in own frames
+        self.error = None
+
+
+class BatchJob:
+    """
+    Offline detection + counting over files, at full speed: no pacing, no
+    JPEG encoding. Long clips are split into segments that run in parallel
+    (their frames batch together in the inference scheduler); each segment
+    starts tracking SEGMENT_OVERLAP frames early so its tracks can be joined
+    to the previous segment's. Per-frame tracks go to
+    <JOBS_DIR>/<id>/<clip>.detections.jsonl, counts to counts.json.
+    """
+
+    def __init__(self, clips, model_file: str, conf: float = 0.3, imgsz: int = 640, segments: int = None,
+                 backend: str = None, batch: int = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.clips = list(clips)
+        self.model_file = model_file
+        self.backend = backend
+        self.conf = conf
+        self.imgsz = imgsz
+        self.max_segments = max(1, int(segments or JOB_WORKERS))
+        self.batch = max(1, int(batch or JOB_BATCH or inference_scheduler.max_batch))
+        self.out_dir = os.path.join(JOBS_DIR, self.id)
+        self.status = "queued"
+        self.message = None
+        self.cancel_event = threading.Event()
+        self.segments = []
+        self.frames_total = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.results = {}        # clip -> {"counts", "frames", "segments", "detections"}
+
+    # -- planning -----------------------------------------------------------
+
+    def _plan(self, clip: str):
+        cap = open_capture(clip, backend="opencv")
+        if cap is None:
+            raise RuntimeError(f"cannot open {clip}")
+        total = cap.frame_count
+        fps = cap.fps
+        cap.release()
+
+        n = max(1, min(self.max_segments, total // MIN_SEGMENT_FRAMES)) if total else 1
+        stem = os.path.splitext(os.path.basename(clip))[0]
+        bounds = [total * i // n for i in range(n)] + [None]
+        segs = [
+            _Segment(clip, i, bounds[i], bounds[i + 1],
+                     os.path.join(self.out_dir, f"{stem}.seg{i}.jsonl"))
+            for i in range(n)
+        ]
+        return segs, total, fps
+
+    # -- per segment --------------------------------------------------------
+
+    def _run_segment(self, seg: _Segment, entry, fps: float):
+        batch_key = inference_scheduler.register(entry, self.imgsz)
+        cap = open_capture(seg.clip, backend="opencv", start=seg.warm_start, threads=DECODE_THREADS)
+        if cap is None:
+            inference_scheduler.unregister(batch_key)
+            raise RuntimeError(f"cannot open {seg.clip}")
+        # decoding runs ahead on its own thread; files never drop frames
+        reader = ResilientReader(lambda: (None, None), cap, "file", live=False,
+                                 buffer=JOB_READ_AHEAD).start()
+        tracker = sv.ByteTrack(frame_rate=int(round(fps)) or 30)
+        lut, lut_names = None, None
+        inflight = deque()       # (frame index, future)
+        idx = seg.warm_start
+        try:
+            with open(seg.part_path, "w") as out:
+                while True:
+                    done = seg.end is not None and idx >= seg.end
+                    if not done and not self.cancel_event.is_set() and len(inflight) < self.batch:
+                        ok, frame = reader.read(self.cancel_event)
+                        if ok:
+                            inflight.append((idx, inference_scheduler.submit(batch_key, frame, self.conf)))
+                            idx += 1
+                            continue
+                        seg.end = idx          # clip ended early / count was off
+                    if not inflight:
+                        break
+
+                    f, fut = inflight.popleft()
+                    res = fut.result(timeout=RESULT_TIMEOUT_S)
+                    tracks = tracker.update_with_detections(sv.Detections.from_ultralytics(res))
+                    tids = tracks.tracker_id if tracks.tracker_id is not None else np.zeros(0, dtype=int)
+                    if f < seg.start:
+                        seg.head[f] = (tracks.xyxy, tids)
+                        continue
+
+                    names = getattr(res, "names", {}) or {}
+                    if names is not lut_names:
+                        lut, lut_names = build_class_lut(names, COUNTABLE, NAME_MAP), names
+                    cls = tracks.class_id if tracks.class_id is not None else np.zeros(len(tracks), dtype=int)
+                    cls_idx = lut.take(np.asarray(cls, dtype=np.int64), mode="clip")
+                    seg.seen.update(zip(cls_idx[cls_idx >= 0].tolist(), np.asarray(tids)[cls_idx >= 0].tolist()))
+                    seg.tail.append((f, tracks.xyxy, tids))
+
+                    conf = tracks.confidence if tracks.confidence is not None else np.ones(len(tracks))
+                    rows = [
+                        [round(float(x1), 1), round(float(y1), 1), round(float(x2), 1), round(float(y2), 1),
+                         round(float(c), 3), int(k), int(t)]
+                        for (x1, y1, x2, y2), c, k, t in zip(tracks.xyxy, conf, cls, tids)
+                    ]
+                    out.write(json.dumps({"frame": f, "detections": rows}) + "\n")
+                    seg.frames += 1
+        finally:
+            # frames still in flight are left to the scheduler; nobody reads them
+            reader.stop()
+            inference_scheduler.unregister(batch_key)
+
+    def _stitch(self, clip: str, segs, fps: float):
+        """Merges segment parts with globally unique track ids; returns the clip's result."""
+        stem = os.path.splitext(os.path.basename(clip))[0]
+        det_path = os.path.join(self.out_dir, f"{stem}.detections.jsonl")
+        seen = set()
+        next_gid = 1
+        prev_map = {}
+        joined = 0
+        with open(det_path, "w") as out:
+            for k, seg in enumerate(segs):
+                link = {}
+                if k:
+                    tail = {f: (x, t) for f, x, t in segs[k - 1].tail}
+                    link = match_tracks(tail, seg.head)
+                    joined += len(link)
+                gmap = {}
+                with open(seg.part_path) as part:
+                    for line in part:
+                        rec = json.loads(line)
+                        for row in rec["detections"]:
+                            tid = row[6]
+                            gid = gmap.get(tid)
+                            if gid is None:
+                                if tid in link and link[tid] in prev_map:
+                                    gid = prev_map[link[tid]]
+                                else:
+                                    gid, next_gid = next_gid, next_gid + 1
+                                gmap[tid] = gid
+                            row[6] = gid
+                        out.write(json.dumps(rec) + "\n")
+                seen.update((c, gmap[t]) for c, t in seg.seen if t in gmap)
+                prev_map = gmap
+                os.remove(seg.part_path)
+
+        counts = np.bincount([c for c, _ in seen], minlength=len(COUNTABLE))
+        return {
+            "counts": {c: int(v) for c, v in zip(COUNTABLE, counts)},
+            "frames": sum(s.frames for s in segs),
+            "fps_in": fps,
+            "segments": len(segs),
+            "tracks_joined": joined,
+            "detections": det_path,
+        }
+
+    # -- job ----------------------------------------------------------------
+
+    def run(self, executor: ThreadPoolExecutor):
+        self.status = "running"
+        self.started = time.time()
+        os.makedirs(self.out_dir, exist_ok=True)
+        try:
+            entry = model_registry.acquire(self.model_file, self.backend)
+        except Exception as e:
+            print("Model load failed:", e)
+            self._finish("failed", f"model load failed: {e}")
+            return
+        try:
+            plans = []
+            for clip in self.clips:
+                segs, total, fps = self._plan(clip)
+                plans.append((clip, segs, fps))
+                self.segments.extend(segs)
+                self.frames_total += total
+
+            futures = [(seg, executor.submit(self._run_segment, seg, entry, fps))
+                       for clip, segs, fps in plans for seg in segs]
+            for seg, fut in futures:
+                try:
+                    fut.result()
+                except Exception as e:
+                    seg.error = str(e)
+                    self.cancel_event.set()
+            failed = [s for s in self.segments if s.error]
+            if failed:
+                self._finish("failed", f"{os.path.basename(failed[0].clip)} segment {failed[0].index}: {failed[0].error}")
+                return
+            if self.cancel_event.is_set():
+                self._finish("cancelled")
+                return
+
+            for clip, segs, fps in plans:
+                self.results[clip] = self._stitch(clip, segs, fps)
+            self._finish("done")
+        except Exception as e:
+            print("Batch job failed:", e)
+            self._finish("failed", str(e))
+        finally:
+            model_registry.release(entry.model_file, entry)
+
+    def _finish(self, status: str, message: str = None):
+        self.status = status
+        self.message = message
+        self.finished = time.time()
+        if status != "done":
+            for seg in self.segments:
+                if os.path.exists(seg.part_path):
+                    os.remove(seg.part_path)
+        else:
+            totals = {c: sum(r["counts"][c] for r in self.results.values()) for c in COUNTABLE}
+            with open(os.path.join(self.out_dir, "counts.json"), "w") as f:
+                json.dump({"total": totals, "clips": self.results}, f, indent=2)
+        try:
+            with open(os.path.join(self.out_dir, "job.json"), "w") as f:
+                json.dump(self.stats(), f, indent=2)
+        except OSError as e:
+            print("Job status write failed:", e)
+
+    def stats(self):
+        done = sum(s.frames for s in self.segments)
+        end = self.finished or time.time()
+        elapsed = end - self.started if self.started else 0.0
+        fps = done / elapsed if elapsed > 0 else 0.0
+        out = {
+            "job_id": self.id,
+            "status": self.status,
+            "message": self.message,
+            "model_file": self.model_file,
+            "backend": self.backend,
+            "clips": self.clips,
+            "segments": len(self.segments),
+            "batch": self.batch,
+            "frames_done": done,
+            "frames_total": self.frames_total,
+            "progress": round(done / self.frames_total, 4) if self.frames_total else None,
+            "fps": round(fps, 1),
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": round((self.frames_total - done) / fps, 1) if fps and self.frames_total > done else None,
+            "created": self.created,
+            "output_dir": self.out_dir,
+        }
+        if self.status == "done":
+            out["results"] = self.results
+        return out
+
+
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, clips, model_file: str, conf: float = 0.3, imgsz: int = 640, segments: int = None,
+               backend: str = None, batch: int = None):
+        job = BatchJob(clips, model_file, conf=conf, imgsz=imgsz, segments=segments, backend=backend,
+                       batch=batch)
+        with self.lock:
+            self._prune_locked()
+            self.jobs[job.id] = job
+        threading.Thread(target=job.run, args=(self.executor,), daemon=True).start()
+        return job
+
+    def get(self, job_id: str):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _prune_locked(self):
+        # forget finished jobs past JOB_TTL_S, then all but the newest JOB_KEEP
+        now = time.time()
+        finished = sorted((j for j in self.jobs.values() if j.finished is not None),
+                          key=lambda j: j.finished, reverse=True)
+        for i, job in enumerate(finished):
+            if i >= JOB_KEEP or now - job.finished > JOB_TTL_S:
+                del self.jobs[job.id]
+
+    def list(self):
+        with self.lock:
+            self._prune_locked()
+            jobs = list(self.jobs.values())
+        return [j.stats() for j in sorted(jobs, key=lambda j: j.created, reverse=True)]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        return True
+
+# Singleton job manager
+job_manager = JobManager()
@@ -0,0 +1,68 @@
+import time
+import threading
+
+
+class FrameBroadcaster:
+    """
+    Latest-frame buffer shared by every MJPEG viewer of a session.
+
+    The producer publishes each encoded JPEG once; viewers wait for a newer
+    sequence number and get a reference to the same bytes object. A slow
+    viewer simply skips the frames it missed - it never holds up the
+    producer or the other viewers.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.viewers = 0
+        self.frames_sent = 0
+
+    def publish(self, jpg: bytes):
+        with self.cond:
+            self.frame = jpg
+            self.seq += 1
+            self.cond.notify_all()
+
+    def reset(self):
+        with self.cond:
+            self.frame = None
+            self.cond.notify_all()
+
+    def wake(self):
+        # lets waiting viewers re-check their stop condition
+        with self.cond:
+            self.cond.notify_all()
+
+    def subscribe(self, stop_event: threading.Event, max_fps: float = None):
+        """Generator of JPEG bytes for one viewer, newest frame first."""
+        min_gap = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        last_seq = 0
+        next_at = 0.0
+        with self.cond:
+            self.viewers += 1
+        try:
+            while not stop_event.is_set():
+                if min_gap:
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        # rate cap: sleep, then take whatever is newest
+                        stop_event.wait(delay)
+                        continue
+                with self.cond:
+                    if self.seq == last_seq or self.frame is None:
+                        self.cond.wait(timeout=1.0)
+                    if self.seq == last_seq or self.frame is None:
+                        continue
+                    last_seq = self.seq
+                    frame = self.frame
+                    self.frames_sent += 1
+                next_at = time.monotonic() + min_gap
+                yield frame
+        finally:
+            with self.cond:
+                self.viewers -= 1
+
+    def stats(self):
+        return {"viewers": self.viewers, "seq": self.seq, "frames_sent": self.frames_sent}
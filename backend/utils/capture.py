@@ -0,0 +1,296 @@
+import os
+import json
+import shutil
+import subprocess
+import cv2
+import numpy as np
+
+try:
+    import av  # optional: PyAV decoder backend
+except ImportError:
+    av = None
+
+DEFAULT_BACKEND = os.environ.get("CAPTURE_BACKEND", "opencv")
+# 0 = let the decoder pick; 1-2 keeps many parallel streams from fighting over cores
+DECODE_THREADS = int(os.environ.get("DECODE_THREADS", "0"))
+OPEN_TIMEOUT_MS = int(os.environ.get("CAPTURE_OPEN_TIMEOUT_MS", "10000"))
+
+
+def _scaled_size(w: int, h: int, width: int = None):
+    if not width or w <= width:
+        return w, h
+    return int(width), max(2, int(round(h * width / w / 2)) * 2)
+
+
+class Capture:
+    """
+    cv2.VideoCapture-compatible reader (read / get / isOpened / release).
+
+    Backends decode into BGR numpy frames, optionally scaled down to `width`
+    and keeping only every (skip + 1)-th frame. open() returns only once the
+    first frame has been decoded, so a returned capture is known to work.
+    hold: how many returned frames the consumer may keep alive at once;
+    backends that decode into reused buffers keep more buffers than that.
+    """
+
+    name = "base"
+
+    def __init__(self, url: str, threads: int = DECODE_THREADS, hw_accel: bool = False,
+                 width: int = None, skip: int = 0, hold: int = 0):
+        self.url = url
+        self.hold = max(0, int(hold or 0))
+        self.threads = max(0, int(threads or 0))
+        self.hw_accel = bool(hw_accel)
+        self.width = int(width) if width else None
+        self.skip = max(0, int(skip or 0))
+        self.fps = 0.0
+        self.frame_size = (0, 0)      # as decoded (after `width` scaling)
+        self.source_size = (0, 0)     # as encoded in the stream
+        self.frame_count = 0
+        self._first = None      # frame decoded by open(), handed out by the first read()
+
+    def open(self) -> bool:
+        raise NotImplementedError
+
+    def _read(self):
+        raise NotImplementedError
+
+    def read(self):
+        if self._first is not None:
+            frame, self._first = self._first, None
+            return True, frame
+        return self._read()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps / (self.skip + 1)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.frame_size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frame_size[1])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count // (self.skip + 1))
+        return 0.0
+
+    def isOpened(self) -> bool:
+        return self.frame_size != (0, 0)
+
+    def scale(self):
+        """(sx, sy) from source-frame pixels to decoded-frame pixels."""
+        if 0 in self.source_size or 0 in self.frame_size:
+            return 1.0, 1.0
+        return self.frame_size[0] / self.source_size[0], self.frame_size[1] / self.source_size[1]
+
+    def release(self):
+        pass
+
+
+class OpenCVCapture(Capture):
+    """cv2.VideoCapture on the FFmpeg backend with decoder threads / HW acceleration hints."""
+
+    name = "opencv"
+
+    def __init__(self, url: str, start: int = 0, **kw):
+        super().__init__(url, **kw)
+        self.start = max(0, int(start or 0))    # first frame index (files only)
+
+    def open(self) -> bool:
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS]
+        if self.threads and hasattr(cv2, "CAP_PROP_N_THREADS"):
+            params += [cv2.CAP_PROP_N_THREADS, self.threads]
+        if self.hw_accel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        self.cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG, params)
+        if not self.cap.isOpened():
+            return False
+        self.fps = float(self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if self.start:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+        ok, frame = self._read()
+        if not ok:
+            return False
+        self._first = frame
+        self.frame_size = (frame.shape[1], frame.shape[0])
+        self.source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH) or frame.shape[1]),
+                            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or frame.shape[0]))
+        return True
+
+    def _read(self):
+        # grab() without retrieve() skips the colour conversion of dropped frames
+        for _ in range(self.skip):
+            if not self.cap.grab():
+                return False, None
+        ok, frame = self.cap.read()
+        if not ok:
+            return False, None
+        if self.width and frame.shape[1] > self.width:
+            w, h = _scaled_size(frame.shape[1], frame.shape[0], self.width)
+            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        return True, frame
+
+    def release(self):
+        cap = getattr(self, "cap", None)
+        if cap is not None:
+            cap.release()
+
+
+class FFmpegCapture(Capture):
+    """
+    ffmpeg subprocess writing raw BGR frames to a pipe.
+
+    Scaling and frame dropping happen inside ffmpeg. Frames are read with
+    readinto() straight into a small ring of preallocated numpy buffers,
+    so no per-frame bytes object is created or copied. A buffer is reused
+    `ring` frames later, so the ring is grown past `hold` (every frame the
+    pipeline can have queued or in flight); otherwise a frame still waiting
+    in a queue would be overwritten in place.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, url: str, ring: int = 16, **kw):
+        super().__init__(url, **kw)
+        self.ring_size = max(2, ring, self.hold + 2)
+        self.proc = None
+        self._ring = []
+        self._i = 0
+
+    def _probe(self):
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height,r_frame_rate,nb_frames", "-of", "json", self.url],
+            capture_output=True, timeout=OPEN_TIMEOUT_MS / 1000.0,
+        )
+        streams = json.loads(out.stdout or b"{}").get("streams") or []
+        if not streams:
+            return None
+        s = streams[0]
+        num, _, den = str(s.get("r_frame_rate", "0/1")).partition("/")
+        self.fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+        self.frame_count = int(s.get("nb_frames") or 0) if str(s.get("nb_frames", "")).isdigit() else 0
+        return int(s["width"]), int(s["height"])
+
+    def open(self) -> bool:
+        if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+            return False
+        try:
+            size = self._probe()
+        except (subprocess.SubprocessError, ValueError, KeyError):
+            return False
+        if not size:
+            return False
+        w, h = _scaled_size(size[0], size[1], self.width)
+
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        if self.hw_accel:
+            cmd += ["-hwaccel", "auto"]
+        if self.threads:
+            cmd += ["-threads", str(self.threads)]
+        cmd += ["-i", self.url, "-an", "-sn"]
+        filters = []
+        if self.skip:
+            filters.append(f"select=not(mod(n\\,{self.skip + 1}))")
+        if (w, h) != size:
+            filters.append(f"scale={w}:{h}")
+        if filters:
+            cmd += ["-vf", ",".join(filters), "-vsync", "0"]
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                     bufsize=w * h * 3)
+        self._ring = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(self.ring_size)]
+        ok, frame = self._read()
+        if not ok:
+            self.release()
+            return False
+        self._first = frame
+        self.frame_size = (w, h)
+        self.source_size = size
+        return True
+
+    def _read(self):
+        buf = self._ring[self._i]
+        view = memoryview(buf).cast("B")
+        got = 0
+        while got < len(view):
+            n = self.proc.stdout.readinto(view[got:])
+            if not n:
+                return False, None
+            got += n
+        self._i = (self._i + 1) % len(self._ring)
+        return True, buf
+
+    def release(self):
+        if self.proc is not None:
+            try:
+                self.proc.kill()
+                self.proc.wait(timeout=2.0)
+            except Exception:
+                pass
+            if self.proc.stdout:
+                self.proc.stdout.close()
+            self.proc = None
+
+
+class PyAVCapture(Capture):
+    """In-process libav decoding through PyAV (optional dependency)."""
+
+    name = "pyav"
+
+    def open(self) -> bool:
+        if av is None:
+            return False
+        try:
+            self.container = av.open(self.url, timeout=OPEN_TIMEOUT_MS / 1000.0)
+            stream = self.container.streams.video[0]
+        except Exception:
+            return False
+        stream.thread_type = "AUTO"
+        if self.threads:
+            stream.codec_context.thread_count = self.threads
+        self.fps = float(stream.average_rate or 0.0)
+        self.frame_count = int(stream.frames or 0)
+        self._frames = self.container.decode(stream)
+        ok, frame = self._read()
+        if not ok:
+            self.release()
+            return False
+        self._first = frame
+        self.frame_size = (frame.shape[1], frame.shape[0])
+        cc = stream.codec_context
+        self.source_size = (int(cc.width or frame.shape[1]), int(cc.height or frame.shape[0]))
+        return True
+
+    def _read(self):
+        try:
+            # skipped frames are decoded but never converted to BGR
+            for _ in range(self.skip):
+                next(self._frames)
+            f = next(self._frames)
+        except Exception:   # StopIteration at the end, av errors on broken input
+            return False, None
+        w, h = _scaled_size(f.width, f.height, self.width)
+        return True, f.to_ndarray(format="bgr24", width=w, height=h)
+
+    def release(self):
+        container = getattr(self, "container", None)
+        if container is not None:
+            container.close()
+            self.container = None
+
+
+BACKENDS = {c.name: c for c in (OpenCVCapture, FFmpegCapture, PyAVCapture)}
+
+
+def open_capture(url: str, backend: str = None, **opts):
+    """Opens `url` with the named backend; None if it can't deliver a first frame."""
+    cls = BACKENDS.get(backend or DEFAULT_BACKEND, OpenCVCapture)
+    cap = cls(url, **opts)
+    try:
+        if cap.open():
+            return cap
+    except Exception as e:
+        print(f"{cls.name} capture open error:", e)
+    cap.release()
+    return None
@@ -0,0 +1,170 @@
+import numpy as np
+
+# Only these 4 classes count
+COUNTABLE = ("car", "van", "truck", "bus")
+
+# Map YOLO label names -> our canonical names
+NAME_MAP = {"car": "car", "van": "van", "truck": "truck", "bus": "bus"}
+
+
+def build_class_lut(class_names: dict, classes=COUNTABLE, name_map=NAME_MAP):
+    """
+    Array mapping model class id -> index into `classes` (-1 = not counted).
+    Built once per model so the per-frame path never touches strings.
+    """
+    # one trailing -1 so out-of-range ids can be clipped onto it
+    size = (max(class_names.keys()) + 2) if class_names else 1
+    lut = np.full(size, -1, dtype=np.int64)
+    index = {c: i for i, c in enumerate(classes)}
+    for cid, name in class_names.items():
+        mapped = name_map.get(str(name).lower())
+        if mapped in index:
+            lut[int(cid)] = index[mapped]
+    return lut
+
+
+class SeenIds:
+    """
+    Per-class bitmap of tracker ids already counted.
+
+    ByteTrack ids only ever increase, so the bitmap covers a sliding window
+    [base, base + capacity). Once the window reaches max_window ids it is
+    compacted: the base moves to half a window behind the newest id and
+    everything below base is treated as already seen, except ids still
+    visible in that frame (a parked car can outlive any window), whose
+    per-class seen bits move into a small side table. Memory is bounded by
+    n_classes * max_window bytes plus one entry per long-lived track.
+    """
+
+    def __init__(self, n_classes: int, capacity: int = 1024, max_window: int = 16384):
+        self.base = 0
+        self.high_water = -1
+        self.max_window = max(capacity, max_window)
+        self.bits = np.zeros((n_classes, capacity), dtype=bool)
+        self.held = {}           # id below base, still tracked -> set of class indices seen
+        self.compactions = 0
+
+    def _fit(self, tids: np.ndarray, hi: int):
+        cap = self.bits.shape[1]
+        if hi - self.base < cap:
+            return
+        new_base = self.base
+        if cap >= self.max_window:
+            # keep half a window of history behind the newest id
+            new_base = max(self.base, hi - cap // 2)
+        new_cap = cap
+        while hi - new_base >= new_cap:
+            new_cap *= 2
+        shift = new_base - self.base
+        if shift:
+            self.compactions += 1
+            # visible ids that fall below the new base keep their seen bits;
+            # held ids that are no longer visible count as seen from now on
+            visible = set(tids.tolist())
+            self.held = {t: c for t, c in self.held.items() if t in visible}
+            for t in visible:
+                if self.base <= t < new_base:
+                    self.held[t] = set(np.flatnonzero(self.bits[:, t - self.base]).tolist())
+        grown = np.zeros((self.bits.shape[0], new_cap), dtype=bool)
+        if shift < cap:
+            grown[:, :cap - shift] = self.bits[:, shift:]
+        self.bits = grown
+        self.base = new_base
+
+    def mark_new(self, cls_idx: np.ndarray, tids: np.ndarray) -> np.ndarray:
+        """Marks (class, id) pairs as seen; returns a mask of the ones seen for the first time."""
+        if tids.size == 0:
+            return np.zeros(0, dtype=bool)
+        hi = int(tids.max())
+        self.high_water = max(self.high_water, hi)
+        self._fit(tids, hi)
+        if int(tids.min()) >= self.base:
+            offs = tids - self.base
+            new = ~self.bits[cls_idx, offs]
+            self.bits[cls_idx[new], offs[new]] = True
+            return new
+
+        in_window = tids >= self.base
+        new = np.zeros(tids.shape, dtype=bool)
+        offs = tids[in_window] - self.base
+        cls_w = cls_idx[in_window]
+        fresh = ~self.bits[cls_w, offs]
+        self.bits[cls_w[fresh], offs[fresh]] = True
+        new[in_window] = fresh
+        # below the window: held ids are looked up, the rest were counted before compaction
+        for i in np.flatnonzero(~in_window).tolist():
+            seen = self.held.get(int(tids[i]))
+            if seen is not None and int(cls_idx[i]) not in seen:
+                seen.add(int(cls_idx[i]))
+                new[i] = True
+        return new
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.bits.nbytes)
+
+    def stats(self):
+        return {
+            "base": self.base,
+            "high_water": self.high_water,
+            "window": int(self.bits.shape[1]),
+            "bytes": self.nbytes,
+            "held": len(self.held),
+            "compactions": self.compactions,
+        }
+
+
+class TrackCounter:
+    """
+    Cumulative + currently-visible counts per countable class, computed with
+    array ops over all tracks of a frame.
+    """
+
+    def __init__(self, classes=COUNTABLE, name_map=NAME_MAP):
+        self.classes = tuple(classes)
+        self.name_map = name_map
+        self.totals = np.zeros(len(self.classes), dtype=np.int64)
+        self.current = np.zeros(len(self.classes), dtype=np.int64)
+        self.seen = SeenIds(len(self.classes))
+        self._lut = np.full(1, -1, dtype=np.int64)
+        self._lut_names = None
+        self.last_keep = np.zeros(0, dtype=bool)
+        self.last_cls_idx = np.zeros(0, dtype=np.int64)
+
+    def _lut_for(self, class_names: dict):
+        # names dict is the same object for every result of a given model
+        if class_names is not self._lut_names:
+            self._lut = build_class_lut(class_names, self.classes, self.name_map)
+            self._lut_names = class_names
+        return self._lut
+
+    def update(self, class_ids, tracker_ids, class_names: dict):
+        n = len(self.classes)
+        if class_ids is None or len(class_ids) == 0:
+            self.current = np.zeros(n, dtype=np.int64)
+            self.last_keep = np.zeros(0, dtype=bool)
+            self.last_cls_idx = np.zeros(0, dtype=np.int64)
+            return self.current
+
+        lut = self._lut_for(class_names)
+        cls_idx = lut.take(np.asarray(class_ids, dtype=np.int64), mode="clip")
+        keep = cls_idx >= 0
+        cls_idx = cls_idx[keep]
+        # exposed for per-track consumers (line / zone counting)
+        self.last_keep = keep
+        self.last_cls_idx = cls_idx
+
+        self.current = np.bincount(cls_idx, minlength=n)
+
+        if tracker_ids is not None:
+            tids = np.asarray(tracker_ids, dtype=np.int64)[keep]
+            valid = tids >= 0
+            new = self.seen.mark_new(cls_idx[valid], tids[valid])
+            self.totals += np.bincount(cls_idx[valid][new], minlength=n)
+        return self.current
+
+    def totals_dict(self):
+        return {c: int(v) for c, v in zip(self.classes, self.totals)}
+
+    def current_dict(self):
+        return {c: int(v) for c, v in zip(self.classes, self.current)}
@@ -0,0 +1,82 @@
+import time
+import cv2
+
+MIN_QUALITY = 40
+MIN_WIDTH = 320
+
+
+class JpegEncoder:
+    """
+    JPEG encoder for the viewer stream with optional downscaling.
+
+    In adaptive mode, when the average encode time goes over budget_ms the
+    encoder first lowers quality, then output width. It steps back toward the
+    configured settings once encoding is comfortably under budget again.
+    """
+
+    def __init__(self, quality: int = 80, max_width: int = None,
+                 budget_ms: float = None, adaptive: bool = False, alpha: float = 0.1):
+        self.base_quality = int(min(100, max(MIN_QUALITY, quality)))
+        self.base_width = int(max_width) if max_width else None
+        self.budget_ms = float(budget_ms) if budget_ms else None
+        self.adaptive = bool(adaptive) and self.budget_ms is not None
+        self.alpha = alpha
+
+        self.quality = self.base_quality
+        self.width = self.base_width
+        self.frames = 0
+        self.avg_ms = 0.0
+        self.avg_bytes = 0.0
+        self._since_adjust = 0
+
+    def encode(self, img):
+        t0 = time.perf_counter()
+        h, w = img.shape[:2]
+        if self.width and w > self.width:
+            img = cv2.resize(img, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        ms = (time.perf_counter() - t0) * 1000.0
+        if not ok:
+            return None
+        data = buf.tobytes()
+
+        self.frames += 1
+        a = self.alpha if self.frames > 1 else 1.0
+        self.avg_ms += a * (ms - self.avg_ms)
+        self.avg_bytes += a * (len(data) - self.avg_bytes)
+        if self.adaptive:
+            self._adapt(w)
+        return data
+
+    def _adapt(self, src_width: int):
+        # let the EWMA settle after each change before judging again
+        self._since_adjust += 1
+        if self._since_adjust < 15:
+            return
+
+        if self.avg_ms > self.budget_ms:
+            if self.quality > MIN_QUALITY:
+                self.quality = max(MIN_QUALITY, self.quality - 10)
+            else:
+                cur = self.width or src_width
+                if cur > MIN_WIDTH:
+                    self.width = max(MIN_WIDTH, int(cur * 0.75))
+            self._since_adjust = 0
+        elif self.avg_ms < 0.5 * self.budget_ms:
+            if self.width != self.base_width:
+                nxt = int((self.width or src_width) / 0.75)
+                limit = self.base_width or src_width
+                self.width = None if (self.base_width is None and nxt >= src_width) else min(nxt, limit)
+                self._since_adjust = 0
+            elif self.quality < self.base_quality:
+                self.quality = min(self.base_quality, self.quality + 5)
+                self._since_adjust = 0
+
+    def stats(self):
+        return {
+            "quality": self.quality,
+            "width": self.width,
+            "adaptive": self.adaptive,
+            "encode_ms": round(self.avg_ms, 2),
+            "bytes_per_frame": int(self.avg_bytes),
+        }
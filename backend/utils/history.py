@@ -0,0 +1,279 @@
+import time
+import threading
+import numpy as np
+
+from db import get_db
+from .counting import COUNTABLE
+
+FLUSH_INTERVAL = 5.0          # seconds between batched writes
+RING_SECONDS = 3600           # raw buckets kept in memory per session
+
+# resolution -> (table, bucket seconds)
+RESOLUTIONS = {
+    "1s": ("count_history", 1),
+    "1m": ("count_history_1m", 60),
+    "1h": ("count_history_1h", 3600),
+}
+# raw rows are only kept for a day; rollups carry the long-range history
+RETENTION = {"count_history": 24 * 3600, "count_history_1m": 30 * 24 * 3600}
+
+_COLUMNS = (
+    ["ts"] + list(COUNTABLE) + [f"vis_{c}" for c in COUNTABLE] + ["frames"]
+)
+
+
+def _start_run(sid: int, source: str, model_file: str) -> int:
+    conn = get_db()
+    try:
+        cur = conn.execute(
+            "INSERT INTO history_runs (sid, source, model_file, started) VALUES (?, ?, ?, ?)",
+            (sid, source or "", model_file or "", time.time()),
+        )
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+class CountHistory:
+    """
+    Per-session ring buffer of fixed time buckets.
+
+    Each row: bucket start ts, vehicles newly counted per class, peak
+    visible per class and the number of processed frames (= fps for 1 s
+    buckets). The session thread calls record() per frame; the writer
+    thread drains finished rows in batches. Rows are stored under the
+    current run id (one per start of the session, see history_runs),
+    since sids are reused across streams and server restarts.
+    """
+
+    def __init__(self, sid: int, bucket_s: int = 1, capacity: int = RING_SECONDS, classes=COUNTABLE):
+        self.sid = sid
+        self.run = None
+        self.bucket_s = bucket_s
+        self.n = len(classes)
+        self.ring = np.zeros((capacity, 2 + 2 * self.n), dtype=np.int64)
+        self.lock = threading.Lock()
+        self.written = 0      # rows ever finalized
+        self.drained = 0      # rows handed to the writer
+        self.cur = np.zeros(2 + 2 * self.n, dtype=np.int64)
+        self.cur_ts = None
+        self.last_totals = None
+
+    def new_run(self, source: str = None, model_file: str = None):
+        # counters restart from zero with a new run
+        self.close()
+        self.last_totals = None
+        try:
+            self.run = _start_run(self.sid, source, model_file)
+        except Exception as e:
+            print("history run not recorded:", e)
+            self.run = None
+        return self.run
+
+    def record(self, now: float, totals: np.ndarray, current: np.ndarray):
+        ts = int(now // self.bucket_s) * self.bucket_s
+        if self.cur_ts != ts:
+            self.close()
+            self.cur_ts = ts
+            self.cur[:] = 0
+            self.cur[0] = ts
+        if self.last_totals is not None:
+            self.cur[1:1 + self.n] += totals - self.last_totals
+        else:
+            self.cur[1:1 + self.n] += totals
+        self.last_totals = totals.copy()
+        vis = self.cur[1 + self.n:1 + 2 * self.n]
+        np.maximum(vis, current, out=vis)
+        self.cur[-1] += 1
+
+    def close(self):
+        """Finalizes the open bucket (if any) into the ring."""
+        if self.cur_ts is None:
+            return
+        with self.lock:
+            self.ring[self.written % self.ring.shape[0]] = self.cur
+            self.written += 1
+        self.cur_ts = None
+
+    def drain(self) -> np.ndarray:
+        with self.lock:
+            cap = self.ring.shape[0]
+            start = max(self.drained, self.written - cap)   # overflowed rows are lost
+            idx = np.arange(start, self.written) % cap
+            self.drained = self.written
+            return self.ring[idx].copy()
+
+
+def _rollup(rows: np.ndarray, bucket_s: int, n: int) -> np.ndarray:
+    # sum new counts + frames, max visible, per coarser bucket
+    keys = rows[:, 0] // bucket_s * bucket_s
+    uniq, inv = np.unique(keys, return_inverse=True)
+    out = np.zeros((uniq.size, rows.shape[1]), dtype=np.int64)
+    out[:, 0] = uniq
+    for col in list(range(1, 1 + n)) + [rows.shape[1] - 1]:
+        out[:, col] = np.bincount(inv, weights=rows[:, col], minlength=uniq.size).astype(np.int64)
+    for col in range(1 + n, 1 + 2 * n):
+        np.maximum.at(out[:, col], inv, rows[:, col])
+    return out
+
+
+class HistoryWriter:
+    """Drains every registered CountHistory and writes raw rows + rollups in one transaction."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.histories = {}
+        self.thread = None
+        self.last_prune = 0.0
+
+    def register(self, history: CountHistory):
+        with self.lock:
+            self.histories[history.sid] = history
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+
+    def unregister(self, history: CountHistory):
+        history.close()
+        self._flush([history])
+        with self.lock:
+            if self.histories.get(history.sid) is history:
+                del self.histories[history.sid]
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print("history flush failed:", e)
+
+    def flush(self):
+        with self.lock:
+            histories = list(self.histories.values())
+        self._flush(histories)
+
+    def _flush(self, histories):
+        batches = [(h.run, h.drain()) for h in histories]
+        batches = [(run, rows) for run, rows in batches if run is not None and len(rows)]
+        now = time.time()
+        prune = now - self.last_prune > 3600
+        if not batches and not prune:
+            return
+
+        n = len(COUNTABLE)
+        cols = ", ".join(_COLUMNS)
+        marks = ", ".join("?" * (len(_COLUMNS) + 1))
+        with self.flush_lock:
+            conn = get_db()
+            try:
+                cur = conn.cursor()
+                for run, rows in batches:
+                    # additive like the rollups, so a bucket written twice adds up in every table
+                    self._upsert(cur, "count_history", run, rows, cols, marks)
+                    for table, bucket_s in (("count_history_1m", 60), ("count_history_1h", 3600)):
+                        self._upsert(cur, table, run, _rollup(rows, bucket_s, n), cols, marks)
+                if prune:
+                    for table, keep_s in RETENTION.items():
+                        cur.execute(f"DELETE FROM {table} WHERE ts < ?", (int(now - keep_s),))
+                    self.last_prune = now
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _upsert(cur, table, run, rows, cols, marks):
+        sets = [f"{c} = {c} + excluded.{c}" for c in list(COUNTABLE) + ["frames"]]
+        sets += [f"vis_{c} = MAX(vis_{c}, excluded.vis_{c})" for c in COUNTABLE]
+        cur.executemany(
+            f"INSERT INTO {table} (run, {cols}) VALUES ({marks}) "
+            f"ON CONFLICT(run, ts) DO UPDATE SET {', '.join(sets)}",
+            [(run, *map(int, r)) for r in rows],
+        )
+
+
+def pick_resolution(t_from: float, t_to: float) -> str:
+    span = t_to - t_from
+    if span <= 15 * 60:
+        return "1s"
+    if span <= 2 * 24 * 3600:
+        return "1m"
+    return "1h"
+
+
+def list_runs(sid: int = None, limit: int = 50):
+    """Most recent runs first, optionally of one sid."""
+    conn = get_db()
+    try:
+        if sid is None:
+            rows = conn.execute(
+                "SELECT run, sid, source, model_file, started FROM history_runs ORDER BY run DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT run, sid, source, model_file, started FROM history_runs WHERE sid = ? "
+                "ORDER BY run DESC LIMIT ?",
+                (sid, limit),
+            ).fetchall()
+    finally:
+        conn.close()
+    return [{"run": r[0], "sid": r[1], "source": r[2], "model_file": r[3], "started": r[4]} for r in rows]
+
+
+def query_history(sid: int, t_from: float, t_to: float, resolution: str = "auto", run: int = None):
+    """
+    One run's series. Without `run`, the latest run of `sid` started
+    before `t_to` (a sid's earlier runs, possibly of other sources, are
+    never merged in).
+    """
+    if resolution not in RESOLUTIONS:
+        resolution = pick_resolution(t_from, t_to)
+    table, bucket_s = RESOLUTIONS[resolution]
+
+    # rows still buffered in memory become visible to the query
+    history_writer.flush()
+
+    conn = get_db()
+    try:
+        if run is None:
+            info = conn.execute(
+                "SELECT run, sid, source, started FROM history_runs WHERE sid = ? AND started <= ? "
+                "ORDER BY run DESC LIMIT 1",
+                (sid, t_to),
+            ).fetchone()
+        else:
+            info = conn.execute(
+                "SELECT run, sid, source, started FROM history_runs WHERE run = ?", (run,)
+            ).fetchone()
+        rows = []
+        if info:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM {table} WHERE run = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (info[0], int(t_from // bucket_s * bucket_s), int(t_to)),
+            ).fetchall()
+    finally:
+        conn.close()
+
+    data = np.array([tuple(r) for r in rows], dtype=np.int64).reshape(-1, len(_COLUMNS))
+    n = len(COUNTABLE)
+    return {
+        "sid": info[1] if info else sid,
+        "run": info[0] if info else None,
+        "source": info[2] if info else None,
+        "started": info[3] if info else None,
+        "resolution": resolution,
+        "bucket_s": bucket_s,
+        "from": int(t_from),
+        "to": int(t_to),
+        "ts": data[:, 0].tolist(),
+        "counts": {c: data[:, 1 + i].tolist() for i, c in enumerate(COUNTABLE)},
+        "visible_max": {c: data[:, 1 + n + i].tolist() for i, c in enumerate(COUNTABLE)},
+        "fps": (data[:, -1] / float(bucket_s)).round(2).tolist(),
+    }
+
+# Singleton writer
+history_writer = HistoryWriter()
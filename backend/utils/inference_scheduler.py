@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+MAX_BATCH = int(os.environ.get("INFER_MAX_BATCH", "4"))
+MAX_WAIT_MS = float(os.environ.get("INFER_MAX_WAIT_MS", "10"))
+# longest a caller waits for its result before giving up on the worker
+RESULT_TIMEOUT_S = float(os.environ.get("INFER_TIMEOUT_S", "120"))
+
+
+class _Pending:
+    __slots__ = ("frame", "conf", "future", "t_submit", "group")
+
+    def __init__(self, frame, conf, group: int = 1):
+        self.frame = frame
+        self.conf = conf
+        self.future = Future()
+        self.t_submit = time.perf_counter()
+        self.group = group      # frames submitted together (tiles of one frame)
+
+
+class _BatchQueue:
+    """Frames waiting for one (model, imgsz) pair, served by one worker thread."""
+
+    def __init__(self, key, entry, imgsz):
+        self.key = key
+        self.entry = entry
+        self.imgsz = imgsz
+        self.cond = threading.Condition()
+        self.pending = deque()
+        self.subscribers = 0
+        self.thread = None
+        self.busy_s = 0.0       # cumulative time in predict()
+
+        # metrics
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_size = 0
+        self.avg_batch_ms = 0.0
+        self.max_batch_ms = 0.0
+        self.avg_wait_ms = 0.0
+
+    def stats(self):
+        return {
+            "model_file": self.key[0],
+            "imgsz": self.key[1],
+            "sessions": self.subscribers,
+            "pending": len(self.pending),
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_ms": round(self.avg_batch_ms, 2),
+            "max_batch_ms": round(self.max_batch_ms, 2),
+            "avg_wait_ms": round(self.avg_wait_ms, 2),
+        }
+
+
+class InferenceScheduler:
+    """
+    Batches frames from all sessions that share a model and imgsz into
+    one predict() call.
+
+    A batch is dispatched as soon as every registered session has a frame
+    waiting, max_batch is reached, or the oldest frame has waited
+    max_wait_ms - so a lone session never pays the wait.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.lock = threading.Lock()
+        self.queues = {}   # (model_file, imgsz) -> _BatchQueue
+        self.busy_s = 0.0  # cumulative time spent in predict(), all queues
+
+    def register(self, entry, imgsz: int):
+        key = (entry.model_file, int(imgsz))
+        with self.lock:
+            q = self.queues.get(key)
+            if q is None:
+                q = self.queues[key] = _BatchQueue(key, entry, int(imgsz))
+                q.subscribers = 1
+                q.thread = threading.Thread(target=self._worker, args=(q,), daemon=True)
+                q.thread.start()
+            else:
+                with q.cond:
+                    q.subscribers += 1
+                    # a reloaded model (weights replaced on disk) takes over the queue
+                    q.entry = entry
+        return key
+
+    def unregister(self, key):
+        with self.lock:
+            q = self.queues.get(key)
+            if q is None:
+                return
+            with q.cond:
+                q.subscribers = max(0, q.subscribers - 1)
+                if q.subscribers == 0:
+                    del self.queues[key]
+                q.cond.notify_all()
+
+    def submit(self, key, frame, conf: float) -> Future:
+        with self.lock:
+            q = self.queues.get(key)
+        if q is None:
+            raise RuntimeError(f"no inference queue registered for {key}")
+        p = _Pending(frame, conf)
+        with q.cond:
+            q.pending.append(p)
+            q.cond.notify_all()
+        return p.future
+
+    def submit_many(self, key, frames, conf: float):
+        """Queues several images (e.g. tiles of one frame) so they land in the same batch."""
+        with self.lock:
+            q = self.queues.get(key)
+        if q is None:
+            raise RuntimeError(f"no inference queue registered for {key}")
+        items = [_Pending(f, conf, group=len(frames)) for f in frames]
+        with q.cond:
+            q.pending.extend(items)
+            q.cond.notify_all()
+        return [p.future for p in items]
+
+    def predict(self, key, frame, conf: float, timeout: float = RESULT_TIMEOUT_S):
+        return self.submit(key, frame, conf).result(timeout=timeout)
+
+    def predict_many(self, key, frames, conf: float, timeout: float = RESULT_TIMEOUT_S):
+        futures = self.submit_many(key, frames, conf)
+        deadline = time.monotonic() + timeout
+        return [f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures]
+
+    def _collect(self, q: _BatchQueue):
+        with q.cond:
+            while not q.pending:
+                if q.subscribers == 0:
+                    return None
+                q.cond.wait(timeout=1.0)
+
+            deadline = q.pending[0].t_submit + self.max_wait
+            # a tiled frame is never split across batches (see below)
+            limit = max(self.max_batch, q.pending[0].group)
+            while True:
+                target = min(limit, max(q.pending[0].group, q.subscribers))
+                if len(q.pending) >= target:
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                q.cond.wait(timeout=remaining)
+
+            # whole groups only (a group's tiles are queued back to back): a
+            # later group that doesn't fit waits for the next batch in one piece
+            n = 0
+            while n < len(q.pending):
+                g = q.pending[n].group
+                if n and n + g > limit:
+                    break
+                n += g
+            return [q.pending.popleft() for _ in range(n)]
+
+    def _worker(self, q: _BatchQueue):
+        while True:
+            batch = self._collect(q)
+            if batch is None:
+                return
+
+            t0 = time.perf_counter()
+            min_conf = min(p.conf for p in batch)
+            try:
+                results = q.entry.predict(
+                    source=[p.frame for p in batch],
+                    conf=min_conf, imgsz=q.imgsz, verbose=False
+                )
+                dt_ms = (time.perf_counter() - t0) * 1000.0
+                with self.lock:
+                    self.busy_s += dt_ms / 1000.0
+                    q.busy_s += dt_ms / 1000.0
+                if len(results) != len(batch):
+                    raise RuntimeError(f"model returned {len(results)} results for {len(batch)} frames")
+                for p, res in zip(batch, results):
+                    # batch ran at the lowest conf; apply each session's own threshold
+                    if p.conf > min_conf and res.boxes is not None:
+                        res = res[res.boxes.conf >= p.conf]
+                    p.future.set_result(res)
+            except Exception as e:
+                # nobody may be left waiting forever on a future of this batch
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+
+            wait_ms = sum((t0 - p.t_submit) for p in batch) * 1000.0 / len(batch)
+            with q.cond:
+                q.batches += 1
+                q.frames += len(batch)
+                q.last_batch_size = len(batch)
+                q.max_batch_ms = max(q.max_batch_ms, dt_ms)
+                a = 0.1 if q.batches > 1 else 1.0
+                q.avg_batch_ms += a * (dt_ms - q.avg_batch_ms)
+                q.avg_wait_ms += a * (wait_ms - q.avg_wait_ms)
+
+    def busy_by_queue(self):
+        """"model:imgsz" -> cumulative predict() seconds of each live queue's worker."""
+        with self.lock:
+            return {f"{q.key[0]}:{q.key[1]}": q.busy_s for q in self.queues.values()}
+
+    def get_stats(self):
+        with self.lock:
+            queues = list(self.queues.values())
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "busy_s": round(self.busy_s, 3),
+            "queues": [q.stats() for q in queues],
+        }
+
+# Singleton scheduler
+inference_scheduler = InferenceScheduler()
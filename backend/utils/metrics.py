@@ -0,0 +1,129 @@
+import time
+from bisect import bisect_left
+
+# latency bucket upper bounds (ms); +Inf is implicit
+BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram, cheap enough for every frame: one
+    bisect and two adds per record(). Written by a single stage thread;
+    readers copy the counts.
+    """
+
+    __slots__ = ("bounds", "counts", "sum_ms", "count")
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum_ms = 0.0
+        self.count = 0
+
+    def record(self, ms: float):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.sum_ms += ms
+        self.count += 1
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum_ms = 0.0
+        self.count = 0
+
+    def snapshot(self):
+        return {"counts": list(self.counts), "sum_ms": self.sum_ms, "count": self.count}
+
+
+def merge_histograms(snaps):
+    """Adds up histogram snapshots (same buckets)."""
+    out = {"counts": [0] * (len(BUCKETS_MS) + 1), "sum_ms": 0.0, "count": 0}
+    for s in snaps:
+        out["counts"] = [a + b for a, b in zip(out["counts"], s["counts"])]
+        out["sum_ms"] += s["sum_ms"]
+        out["count"] += s["count"]
+    return out
+
+
+class RateWindow:
+    """
+    Events per second over the last `window` whole seconds (per-second
+    slots in a small ring), so a stall shows up within a second or two
+    instead of disappearing into a since-start average.
+    """
+
+    def __init__(self, window: int = 5):
+        self.window = max(1, int(window))
+        self.n = self.window + 1
+        self.secs = [-1] * self.n
+        self.counts = [0] * self.n
+
+    def tick(self, now: float = None):
+        s = int(time.monotonic() if now is None else now)
+        i = s % self.n
+        if self.secs[i] != s:
+            self.secs[i] = s
+            self.counts[i] = 0
+        self.counts[i] += 1
+
+    def rate(self, now: float = None) -> float:
+        s = int(time.monotonic() if now is None else now)
+        total = sum(c for sec, c in zip(self.secs, self.counts) if s - self.window <= sec < s)
+        return total / self.window
+
+    def reset(self):
+        self.secs = [-1] * self.n
+        self.counts = [0] * self.n
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _num(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if isinstance(v, float):
+        return repr(round(v, 6))
+    return str(v)
+
+
+class PromText:
+    """Builds a Prometheus text-format (0.0.4) exposition."""
+
+    def __init__(self, prefix: str = "traffic_"):
+        self.prefix = prefix
+        self.lines = []
+        self.declared = set()
+
+    def _declare(self, name, kind, help_text):
+        if name not in self.declared:
+            self.declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, kind: str, help_text: str, value, labels: dict = None):
+        name = self.prefix + name
+        self._declare(name, kind, help_text)
+        self.lines.append(f"{name}{_labels(labels)} {_num(value)}")
+
+    def histogram(self, name: str, help_text: str, snap: dict, labels: dict = None):
+        """snap: Histogram.snapshot() in ms; exported in seconds."""
+        name = self.prefix + name
+        self._declare(name, "histogram", help_text)
+        labels = dict(labels or {})
+        cum = 0
+        for bound, c in zip(BUCKETS_MS + (float("inf"),), snap["counts"]):
+            cum += c
+            le = "+Inf" if bound == float("inf") else _num(bound / 1000.0)
+            self.lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {cum}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {_num(snap['sum_ms'] / 1000.0)}")
+        self.lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
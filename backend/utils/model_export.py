@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import importlib.util
+
+# Inference backends a session can pick. "pt" runs the weights through
+# PyTorch as before; the others run an artifact exported from them, cached
+# next to the .pt file:
+#   yolov8.pt -> yolov8.onnx, yolov8.int8.onnx, yolov8_openvino_model/
+BACKENDS = ("pt", "onnx", "onnx-int8", "openvino")
+DEFAULT_BACKEND = os.environ.get("MODEL_BACKEND", "pt")
+
+# Bump when the export settings below change, so older artifacts count as stale
+EXPORT_VERSION = 1
+# Longest another process may hold an export lock before it is considered dead
+EXPORT_TIMEOUT = float(os.environ.get("MODEL_EXPORT_TIMEOUT", "900"))
+
+# backend -> modules it needs besides ultralytics
+_REQUIRES = {
+    "pt": (),
+    "onnx": ("onnx", "onnxruntime"),
+    "onnx-int8": ("onnx", "onnxruntime"),
+    "openvino": ("openvino",),
+}
+
+_locks = {}                 # artifact path -> Lock, for exports within this process
+_locks_guard = threading.Lock()
+
+
+def backend_available(backend: str) -> bool:
+    if backend not in _REQUIRES:
+        return False
+    return all(importlib.util.find_spec(m) is not None for m in _REQUIRES[backend])
+
+
+def artifact_path(pt_path: str, backend: str) -> str:
+    stem = os.path.splitext(pt_path)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "onnx-int8":
+        return stem + ".int8.onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return pt_path
+
+
+def _meta_path(artifact: str) -> str:
+    return artifact.rstrip("/\\") + ".meta.json"
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def path_nbytes(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _read_meta(artifact: str):
+    try:
+        with open(_meta_path(artifact)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(artifact: str, meta: dict):
+    path = _meta_path(artifact)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _quick_check(pt_path: str, artifact: str, meta):
+    """True / False from the sidecar's size + mtime, None when only the mtime differs."""
+    if not meta or meta.get("version") != EXPORT_VERSION or not os.path.exists(artifact):
+        return False
+    try:
+        st = os.stat(pt_path)
+    except OSError:
+        return False
+    src = meta.get("source") or {}
+    if src.get("size") != st.st_size:
+        return False
+    if src.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    return None
+
+
+def is_fresh(pt_path: str, backend: str) -> bool:
+    """
+    True when the cached export of `pt_path` exists and was made from the
+    current weights. The sidecar records the .pt's size, mtime and sha256;
+    size + mtime is the fast path, and a touched but unchanged file is
+    re-hashed once and then accepted (rewriting the sidecar, so callers
+    hold the export lock; see ensure_export).
+    """
+    if backend == "pt":
+        return os.path.exists(pt_path)
+    artifact = artifact_path(pt_path, backend)
+    meta = _read_meta(artifact)
+    quick = _quick_check(pt_path, artifact, meta)
+    if quick is not None:
+        return quick
+    st = os.stat(pt_path)
+    src = meta["source"]
+    if src.get("sha256") != _sha256(pt_path):
+        return False
+    src["mtime_ns"] = st.st_mtime_ns
+    try:
+        _write_meta(artifact, meta)
+    except OSError:
+        pass
+    return True
+
+
+def _remove(artifact: str):
+    if os.path.isdir(artifact):
+        shutil.rmtree(artifact, ignore_errors=True)
+    elif os.path.exists(artifact):
+        os.remove(artifact)
+    try:
+        os.remove(_meta_path(artifact))
+    except OSError:
+        pass
+
+
+class _FileLock:
+    """Cross-process export lock (process-mode sessions each have their own registry)."""
+
+    def __init__(self, artifact: str):
+        self.path = artifact.rstrip("/\\") + ".lock"
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > EXPORT_TIMEOUT:
+                        os.remove(self.path)     # left behind by a dead exporter
+                        continue
+                except OSError:
+                    continue
+                time.sleep(0.5)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _export(pt_path: str, backend: str, imgsz: int) -> str:
+    from ultralytics import YOLO
+    # dynamic axes: sessions batch frames together and change imgsz when degraded
+    if backend == "onnx":
+        return YOLO(pt_path).export(format="onnx", dynamic=True, imgsz=imgsz)
+    if backend == "openvino":
+        return YOLO(pt_path).export(format="openvino", dynamic=True, imgsz=imgsz)
+    if backend == "onnx-int8":
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        src = ensure_export(pt_path, "onnx", imgsz)
+        dst = artifact_path(pt_path, "onnx-int8")
+        # weight-only INT8, no calibration data needed
+        quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+        return dst
+    raise ValueError(f"unknown backend: {backend}")
+
+
+def ensure_export(pt_path: str, backend: str, imgsz: int = 640) -> str:
+    """
+    Path of a fresh `backend` artifact for `pt_path`, exporting it first
+    if it is missing or stale. Raises RuntimeError when the backend's
+    packages are not installed or the export fails.
+    """
+    if backend == "pt":
+        return pt_path
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    if not backend_available(backend):
+        raise RuntimeError(f"{backend} backend needs: {', '.join(_REQUIRES[backend])}")
+    if importlib.util.find_spec("ultralytics") is None:
+        raise RuntimeError("ultralytics is not installed")
+    artifact = artifact_path(pt_path, backend)
+    with _locks_guard:
+        lock = _locks.setdefault(artifact, threading.Lock())
+    with lock, _FileLock(artifact):
+        if is_fresh(pt_path, backend):
+            return artifact
+        st = os.stat(pt_path)
+        source = {"file": os.path.basename(pt_path), "size": st.st_size,
+                  "mtime_ns": st.st_mtime_ns, "sha256": _sha256(pt_path)}
+        _remove(artifact)
+        t0 = time.time()
+        try:
+            out = _export(pt_path, backend, imgsz)
+        except Exception as e:
+            _remove(artifact)
+            raise RuntimeError(f"{backend} export of {os.path.basename(pt_path)} failed: {e}")
+        if os.path.abspath(str(out)) != os.path.abspath(artifact):
+            shutil.move(str(out), artifact)
+        # the sidecar is written last: an artifact without one is never used
+        _write_meta(artifact, {
+            "version": EXPORT_VERSION,
+            "backend": backend,
+            "source": source,
+            "export_s": round(time.time() - t0, 2),
+            "created": time.time(),
+        })
+        print(f"exported {os.path.basename(pt_path)} -> {os.path.basename(artifact)} "
+              f"in {time.time() - t0:.1f}s")
+        return artifact
+
+
+def export_status(pt_path: str):
+    """
+    backend -> {available, exported, fresh, unverified, mb} for one .pt file.
+
+    Read-only: staleness comes from the sidecar's size + mtime. "unverified"
+    marks a .pt with the recorded size but a new mtime; ensure_export
+    re-hashes it (under the export lock) on the next use.
+    """
+    out = {}
+    for backend in BACKENDS:
+        artifact = artifact_path(pt_path, backend)
+        exported = os.path.exists(artifact)
+        meta = _read_meta(artifact) if backend != "pt" else None
+        quick = exported if backend == "pt" else _quick_check(pt_path, artifact, meta)
+        out[backend] = {
+            "available": backend_available(backend),
+            "exported": exported,
+            "fresh": bool(quick),
+            "unverified": exported and quick is None,
+            "mb": round(path_nbytes(artifact) / (1024 * 1024), 1) if exported else None,
+            "export_s": meta.get("export_s") if meta else None,
+        }
+    return out
@@ -0,0 +1,321 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from .model_export import BACKENDS, DEFAULT_BACKEND, ensure_export, export_status, path_nbytes
+
+try:
+    from ultralytics import YOLO
+except ImportError:
+    YOLO = None   # only needed to load weights; register_model() works without it
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
+
+# Budget for models kept resident after their last session stops (MB)
+DEFAULT_BUDGET_MB = float(os.environ.get("MODEL_CACHE_MB", "1024"))
+
+
+def _model_nbytes(model, path: str) -> int:
+    # parameter + buffer bytes of the torch module; file size as a fallback
+    try:
+        net = model.model
+        total = sum(p.numel() * p.element_size() for p in net.parameters())
+        total += sum(b.numel() * b.element_size() for b in net.buffers())
+        if total > 0:
+            return int(total)
+    except Exception:
+        pass
+    return path_nbytes(path)
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def model_key(model_file: str, backend: str = "pt") -> str:
+    # registry / scheduler key; the PyTorch model keeps its bare filename
+    return model_file if backend in (None, "", "pt") else f"{model_file}:{backend}"
+
+
+class ModelEntry:
+    def __init__(self, model_file: str, model, nbytes: int, load_time: float, backend: str = "pt"):
+        self.model_file = model_file   # registry key, see model_key()
+        self.backend = backend
+        self.model = model
+        self.nbytes = nbytes
+        self.load_time = load_time
+        self.refs = 0
+        self.last_used = time.time()
+        self.source = None             # (size, mtime_ns) of the .pt it was loaded from
+        # ultralytics predictors keep per-call state, so calls on a shared
+        # model are serialized
+        self.lock = threading.Lock()
+
+    def predict(self, *args, **kwargs):
+        with self.lock:
+            return self.model.predict(*args, **kwargs)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded YOLO models.
+
+    Sessions acquire() a model by filename and backend and release() it
+    when they stop. Models with no references stay resident (LRU order)
+    until the memory budget forces them out. A non-"pt" backend exports the
+    weights on first use (see model_export) and loads the cached artifact.
+    A resident model whose .pt changed on disk (size or mtime) is reloaded,
+    and re-exported, by the next acquire(); running sessions keep the old one.
+    """
+
+    def __init__(self, models_dir: str = MODELS_DIR, budget_mb: float = DEFAULT_BUDGET_MB):
+        self.models_dir = models_dir
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # model_key -> ModelEntry, LRU first
+        self.loading = {}              # model_key -> Event while a load is in flight
+        self.benchmarks = {}           # model_file -> last benchmark() result
+        self.bench_thread = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    def _load(self, model_file: str, backend: str) -> ModelEntry:
+        path = os.path.join(self.models_dir, model_file)
+        if YOLO is None:
+            raise RuntimeError("ultralytics is not installed")
+        t0 = time.time()
+        source = _stamp(path)
+        path = ensure_export(path, backend)
+        # exported files carry no task metadata for ultralytics to guess from
+        model = YOLO(path) if backend == "pt" else YOLO(path, task="detect")
+        load_time = time.time() - t0
+        entry = ModelEntry(model_key(model_file, backend), model, _model_nbytes(model, path), load_time, backend)
+        entry.source = source
+        return entry
+
+    def acquire(self, model_file: str, backend: str = DEFAULT_BACKEND) -> ModelEntry:
+        if backend and backend not in BACKENDS:
+            raise ValueError(f"unknown backend: {backend}")
+        if model_file in self.entries and not os.path.exists(os.path.join(self.models_dir, model_file)):
+            # registered in-memory model: there are no weights to export
+            if backend and backend != "pt":
+                raise ValueError(f"{model_file} is registered in memory and only runs as pt, not {backend}")
+            backend = "pt"
+        backend = backend or DEFAULT_BACKEND
+        key = model_key(model_file, backend)
+        stamp = _stamp(os.path.join(self.models_dir, model_file))
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.source is not None and stamp is not None \
+                        and entry.source != stamp:
+                    # weights replaced on disk: load (and re-export) them afresh;
+                    # sessions still holding the old entry keep it until release()
+                    del self.entries[key]
+                    self.reloads += 1
+                    entry = None
+                if entry is not None:
+                    self.hits += 1
+                    entry.refs += 1
+                    entry.last_used = time.time()
+                    self.entries.move_to_end(key)
+                    return entry
+                pending = self.loading.get(key)
+                if pending is None:
+                    self.misses += 1
+                    pending = self.loading[key] = threading.Event()
+                    break
+            # another thread is loading the same file; wait and retry as a hit
+            pending.wait()
+
+        try:
+            entry = self._load(model_file, backend)
+        except Exception:
+            with self.lock:
+                self.loading.pop(key).set()
+            raise
+
+        with self.lock:
+            entry.refs = 1
+            self.entries[key] = entry
+            self.loading.pop(key).set()
+            self._evict_locked()
+        return entry
+
+    def register_model(self, model_file: str, model, nbytes: int = 0):
+        """
+        Adds an already constructed model under `model_file` (anything with
+        an ultralytics-style predict(), e.g. a benchmark stub). It is then
+        acquired like a loaded file.
+        """
+        with self.lock:
+            old = self.entries.get(model_file)
+            entry = ModelEntry(model_file, model, nbytes, 0.0)
+            entry.refs = old.refs if old is not None else 0
+            self.entries[model_file] = entry
+            self._evict_locked()
+        return entry
+
+    def release(self, model_file: str, entry: ModelEntry = None):
+        """
+        model_file: the acquired entry's model_file (its registry key).
+        entry: the acquired entry itself, so that releasing one replaced by
+        a reload does not touch its successor's refs.
+        """
+        with self.lock:
+            current = self.entries.get(model_file)
+            if entry is not None and entry is not current:
+                entry.refs = max(0, entry.refs - 1)
+                return
+            entry = current
+            if entry is None:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.time()
+            self._evict_locked()
+
+    def _evict_locked(self):
+        total = sum(e.nbytes for e in self.entries.values())
+        if total <= self.budget_bytes:
+            return
+        for name in list(self.entries.keys()):
+            if total <= self.budget_bytes:
+                break
+            entry = self.entries[name]
+            if entry.refs > 0:
+                continue
+            del self.entries[name]
+            total -= entry.nbytes
+            self.evictions += 1
+
+    def prewarm(self, model_files, imgsz: int = 640, backend: str = DEFAULT_BACKEND):
+        """Load (exporting if needed) and run one dummy inference so the first session starts hot."""
+        import numpy as np
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        for f in model_files:
+            if not os.path.exists(os.path.join(self.models_dir, f)):
+                print("prewarm: model not found:", f)
+                continue
+            try:
+                entry = self.acquire(f, backend)
+            except Exception as e:
+                print("prewarm failed for", f, ":", e)
+                continue
+            try:
+                entry.predict(source=dummy, imgsz=imgsz, verbose=False)
+            except Exception as e:
+                print("prewarm failed for", f, ":", e)
+            finally:
+                self.release(entry.model_file, entry)
+
+    def benchmark(self, model_file: str, backends=None, imgsz: int = 640, batch: int = 1, runs: int = 20):
+        """
+        Latency of one model under each backend, on the same synthetic
+        frames: export + load time, then `runs` timed predict() calls of
+        `batch` frames after two warm-up calls. Runs on the serving CPU, so
+        numbers taken while sessions are busy are pessimistic. The result is
+        kept in self.benchmarks and shown by export_info().
+        """
+        import numpy as np
+        if backends is None and not os.path.exists(os.path.join(self.models_dir, model_file)):
+            backends = ("pt",)     # registered in-memory model, nothing to export
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (imgsz * 9 // 16, imgsz, 3), dtype=np.uint8) for _ in range(batch)]
+        source = frames if batch > 1 else frames[0]
+        results = {}
+        for backend in backends or BACKENDS:
+            t0 = time.perf_counter()
+            try:
+                entry = self.acquire(model_file, backend)
+            except Exception as e:
+                results[backend] = {"error": str(e)}
+                continue
+            load_s = time.perf_counter() - t0
+            try:
+                for _ in range(2):
+                    entry.predict(source=source, imgsz=imgsz, verbose=False)
+                times = []
+                for _ in range(max(1, int(runs))):
+                    t = time.perf_counter()
+                    entry.predict(source=source, imgsz=imgsz, verbose=False)
+                    times.append((time.perf_counter() - t) * 1000.0)
+            except Exception as e:
+                results[backend] = {"error": str(e)}
+                continue
+            finally:
+                self.release(entry.model_file, entry)
+            times.sort()
+            mean = sum(times) / len(times)
+            results[backend] = {
+                "load_s": round(load_s, 2),
+                "mean_ms": round(mean, 2),
+                "p50_ms": round(times[len(times) // 2], 2),
+                "p90_ms": round(times[min(len(times) - 1, int(0.9 * len(times)))], 2),
+                "fps": round(batch * 1000.0 / mean, 1) if mean > 0 else None,
+            }
+        base = results.get("pt", {}).get("mean_ms")
+        for r in results.values():
+            if base and r.get("mean_ms"):
+                r["speedup"] = round(base / r["mean_ms"], 2)
+        out = {"model_file": model_file, "imgsz": imgsz, "batch": batch, "runs": runs,
+               "time": time.time(), "backends": results}
+        with self.lock:
+            self.benchmarks[model_file] = out
+        return out
+
+    def start_benchmark(self, model_file: str, **kwargs) -> bool:
+        """benchmark() in a background thread; False while another one is running."""
+        with self.lock:
+            if self.bench_thread is not None and self.bench_thread.is_alive():
+                return False
+            self.bench_thread = threading.Thread(target=self._benchmark_safe, args=(model_file,),
+                                                 kwargs=kwargs, daemon=True)
+            self.bench_thread.start()
+        return True
+
+    def _benchmark_safe(self, model_file, **kwargs):
+        try:
+            self.benchmark(model_file, **kwargs)
+        except Exception as e:
+            print("benchmark failed for", model_file, ":", e)
+
+    def export_info(self, model_file: str):
+        """Per-backend export state of one .pt file plus its last benchmark."""
+        with self.lock:
+            bench = self.benchmarks.get(model_file)
+        return {
+            "backends": export_status(os.path.join(self.models_dir, model_file)),
+            "benchmark": bench,
+        }
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "budget_mb": round(self.budget_bytes / (1024 * 1024), 1),
+                "resident_mb": round(sum(e.nbytes for e in self.entries.values()) / (1024 * 1024), 1),
+                "models": [
+                    {
+                        "file": e.model_file,
+                        "backend": e.backend,
+                        "refs": e.refs,
+                        "mb": round(e.nbytes / (1024 * 1024), 1),
+                        "load_time": round(e.load_time, 3),
+                        "last_used": e.last_used,
+                    }
+                    for e in self.entries.values()
+                ],
+            }
+
+# Singleton registry
+model_registry = ModelRegistry()
@@ -0,0 +1,77 @@
+import time
+import cv2
+import numpy as np
+
+PIXEL_DELTA = 20      # grey-level change that counts as a moved pixel
+
+
+class MotionGate:
+    """
+    Decides per frame whether detection has to run.
+
+    Each frame is shrunk to a small blurred greyscale image and compared
+    with the one the last detection ran on. If the fraction of changed
+    pixels stays under `threshold` the scene is treated as static and the
+    frame is skipped, but never more than `max_skip` frames in a row.
+    Comparing against the last *detected* frame (not the previous one)
+    means slow movement still adds up and eventually triggers a run.
+    """
+
+    def __init__(self, enabled: bool = False, threshold: float = 0.001,
+                 max_skip: int = 10, width: int = 256):
+        self.enabled = bool(enabled)
+        self.threshold = float(threshold)
+        self.max_skip = max(0, int(max_skip))
+        self.width = int(width)
+        self.ref = None
+        self.run_of_skips = 0
+        self.checked = 0
+        self.skipped = 0
+        self.score = 0.0
+        self.cost_ms = 0.0
+
+    def _small(self, frame):
+        # plain decimation: an area resize of a full HD frame costs more than
+        # the whole comparison, and the blur below smooths out the aliasing
+        step = frame.shape[1] // self.width
+        if step > 1:
+            frame = np.ascontiguousarray(frame[::step, ::step])
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame) -> bool:
+        if not self.enabled:
+            return True
+        t0 = time.perf_counter()
+        small = self._small(frame)
+        self.checked += 1
+
+        if self.ref is None or self.ref.shape != small.shape:
+            score = 1.0
+        else:
+            diff = cv2.absdiff(small, self.ref)
+            score = float(np.count_nonzero(diff > PIXEL_DELTA)) / diff.size
+        self.score = score
+
+        detect = score >= self.threshold or self.run_of_skips >= self.max_skip
+        if detect:
+            self.ref = small
+            self.run_of_skips = 0
+        else:
+            self.run_of_skips += 1
+            self.skipped += 1
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.cost_ms += 0.1 * (ms - self.cost_ms) if self.checked > 1 else ms
+        return detect
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_skip": self.max_skip,
+            "score": round(self.score, 5),
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.checked, 3) if self.checked else 0.0,
+            "cost_ms": round(self.cost_ms, 3),
+        }
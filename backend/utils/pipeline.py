@@ -0,0 +1,143 @@
+import time
+import threading
+from collections import deque
+
+from .metrics import Histogram
+
+# Sentinel pushed through the stage queues when the source ends / session stops
+END = object()
+
+
+class DropQueue:
+    """
+    Small bounded queue between pipeline stages.
+
+    With drop_oldest=True a put() on a full queue discards the oldest item so
+    the consumer always sees the freshest frame (live sources). With
+    drop_oldest=False put() blocks instead, so no frame is lost (files).
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = True):
+        self.maxsize = max(1, maxsize)
+        self.drop_oldest = drop_oldest
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item, stop_event=None, force: bool = False):
+        with self.cond:
+            if self.drop_oldest or force:
+                while len(self.items) >= self.maxsize:
+                    self.items.popleft()
+                    self.dropped += 1
+            else:
+                while len(self.items) >= self.maxsize:
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self.cond.wait(timeout=0.1)
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout: float = None):
+        """Returns the next item, or None on timeout."""
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout=timeout)
+                if not self.items:
+                    return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def clear(self):
+        with self.cond:
+            self.items.clear()
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class StageStats:
+    """Latency (EWMA + max + histogram) and item count for one pipeline stage."""
+
+    def __init__(self, name: str, alpha: float = 0.1):
+        self.name = name
+        self.alpha = alpha
+        self.count = 0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.hist = Histogram()
+        self.trace = None   # StageTrace while a trace is being recorded
+
+    def record(self, dt: float):
+        ms = dt * 1000.0
+        self.count += 1
+        self.total_ms += ms
+        self.hist.record(ms)
+        if self.trace is not None:
+            self.trace.add(self.name, dt)
+        a = self.alpha if self.count > 1 else 1.0
+        self.avg_ms += a * (ms - self.avg_ms)
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def reset(self):
+        self.count = 0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.hist.reset()
+
+    def snapshot(self, queue: DropQueue = None):
+        out = {
+            "frames": self.count,
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "total_ms": round(self.total_ms, 1),
+        }
+        if queue is not None:
+            out["queue"] = len(queue)
+            out["dropped"] = queue.dropped
+        return out
+
+
+class LatencyWindow:
+    """Last `size` end-to-end latencies, for percentiles."""
+
+    def __init__(self, size: int = 2048):
+        self.samples = deque(maxlen=size)
+
+    def record(self, dt: float):
+        self.samples.append(dt * 1000.0)
+
+    def reset(self):
+        self.samples.clear()
+
+    def snapshot(self):
+        xs = sorted(self.samples.copy())   # copy() is atomic; writers may be mid-append
+        if not xs:
+            return {"n": 0}
+
+        def pick(q):
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+        return {"n": len(xs), "p50_ms": pick(0.5), "p90_ms": pick(0.9),
+                "p99_ms": pick(0.99), "max_ms": round(xs[-1], 2)}
+
+
+class Timer:
+    """with Timer(stage): ... records the block duration into a StageStats."""
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: StageStats):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stage.record(time.perf_counter() - self.t0)
+        return False
@@ -0,0 +1,308 @@
+import os
+import time
+import queue
+import struct
+import itertools
+import threading
+from concurrent.futures import Future
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from .broadcaster import FrameBroadcaster
+from .zones import CountingEngine
+from .roi import RegionOfInterest
+
+SHM_SLOTS = int(os.environ.get("SESSION_SHM_SLOTS", "4"))
+SHM_SLOT_KB = int(os.environ.get("SESSION_SHM_SLOT_KB", "2048"))
+STATS_INTERVAL = 0.1          # child -> parent stats push period (s)
+
+_HEADER = struct.Struct("<QI4x")   # seq, length (+ pad to 16 bytes)
+
+# spawn: the parent runs Flask threads, fork would copy their locks mid-use
+_ctx = mp.get_context("spawn")
+
+
+class JpegRing:
+    """
+    Fixed slots in a SharedMemory block, written by one process and read by
+    another. Each slot is [seq][len][data]; the writer fills data and length
+    first and stores seq last, the reader re-checks seq after copying, so a
+    slot overwritten mid-read is detected and skipped.
+    """
+
+    def __init__(self, name=None, slots: int = SHM_SLOTS, slot_size: int = SHM_SLOT_KB * 1024):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stride = _HEADER.size + slot_size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * self.stride)
+            for i in range(slots):
+                _HEADER.pack_into(self.shm.buf, i * self.stride, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    def write(self, seq: int, data: bytes) -> bool:
+        if len(data) > self.slot_size:
+            return False
+        off = (seq % self.slots) * self.stride
+        _HEADER.pack_into(self.shm.buf, off, 0, 0)       # invalidate while writing
+        self.shm.buf[off + _HEADER.size:off + _HEADER.size + len(data)] = data
+        _HEADER.pack_into(self.shm.buf, off, seq, len(data))
+        return True
+
+    def read(self, seq: int):
+        off = (seq % self.slots) * self.stride
+        got, n = _HEADER.unpack_from(self.shm.buf, off)
+        if got != seq:
+            return None
+        data = bytes(self.shm.buf[off + _HEADER.size:off + _HEADER.size + n])
+        if _HEADER.unpack_from(self.shm.buf, off)[0] != seq:
+            return None       # lapped by the writer while copying
+        return data
+
+    def close(self, unlink: bool = False):
+        try:
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _worker_main(sid, args, options, ring_name, conn):
+    """Child process: a regular in-process StreamSession, relayed over shm + pipe."""
+    from .video_worker import StreamSession
+    from .inference_scheduler import inference_scheduler
+
+    ring = JpegRing(name=ring_name)
+    session = StreamSession(sid)
+    ok, msg = session.start(*args, options)
+    conn.send(("started", (ok, msg)))
+    if not ok:
+        ring.close()
+        return
+
+    seq = 0
+    last_stats = 0.0
+    replies = queue.Queue()     # only this loop sends on the pipe
+
+    def call(req_id, method, args):
+        try:
+            result = getattr(session, method)(*args)
+        except Exception as e:
+            print(f"session {method} failed:", e)
+            result = None
+        replies.put(("reply", (req_id, result)))
+
+    try:
+        while True:
+            while conn.poll():
+                cmd, arg = conn.recv()
+                if cmd == "call":
+                    # profile / trace block for seconds; run them beside the relay loop
+                    threading.Thread(target=call, args=arg, daemon=True).start()
+                elif cmd == "stop":
+                    session.stop_event.set()
+                elif cmd == "viewers":
+                    # nobody subscribes in here; this is what gates encoding
+                    session.broadcaster.viewers = int(arg)
+                elif cmd == "degrade":
+                    session.set_degrade(arg)
+
+            b = session.broadcaster
+            with b.cond:
+                if b.seq == seq:
+                    b.cond.wait(timeout=STATS_INTERVAL)
+                new_seq, frame = b.seq, b.frame
+            if new_seq != seq and frame is not None:
+                seq = new_seq
+                if ring.write(seq, frame):
+                    conn.send(("frame", seq))
+                else:
+                    conn.send(("frame_data", frame))    # larger than a slot
+
+            while not replies.empty():
+                conn.send(replies.get())
+
+            now = time.monotonic()
+            alive = session.thread.is_alive()
+            if now - last_stats >= STATS_INTERVAL or not alive:
+                t = os.times()
+                # the parent's load monitor cannot see a live child's cpu time
+                stats = dict(session.get_stats(), cpu_s=t.user + t.system,
+                             infer_busy=inference_scheduler.busy_by_queue(), metrics=session.metrics())
+                conn.send(("stats", stats))
+                last_stats = now
+            if not alive:
+                break
+    except (BrokenPipeError, EOFError):
+        session.stop()
+    finally:
+        ring.close()
+        try:
+            conn.send(("exit", None))
+        except Exception:
+            pass
+
+
+class ProcessStreamSession:
+    """
+    StreamSession look-alike that runs the real session in a child process.
+
+    Decode, inference, tracking, counting and encoding all happen in the
+    child, outside this process's GIL. Encoded JPEGs come back through a
+    shared-memory ring (only the sequence number crosses the pipe), stats
+    and control messages over a multiprocessing Pipe. MJPEG viewers are
+    served from a local FrameBroadcaster exactly like the threaded session.
+    """
+
+    def __init__(self, sid: int):
+        self.sid = sid
+        self.thread = None        # relay thread; alive while the child runs
+        self.proc = None
+        self.conn = None
+        self.ring = None
+        self.stop_event = threading.Event()
+        self.broadcaster = FrameBroadcaster()
+        self._stats = {"sid": sid, "status": "idle"}
+        self._metrics = None      # child's StreamSession.metrics(), relayed with its stats
+        self._outbox = queue.Queue()      # ("call" / "stop", ...) messages; sent by the relay thread
+        self._stopping = False
+        self._calls = {}                  # request id -> Future
+        self._call_ids = itertools.count(1)
+        self.degrade = 0
+
+    def start(self, model_file, source, conf, imgsz, interval, options=None):
+        if self.thread and self.thread.is_alive():
+            return False, "session already running"
+        options = options or {}
+        # validate here so bad input is reported synchronously, as in-process
+        try:
+            CountingEngine(lines=options.get("lines"), zones=options.get("zones"))
+        except (ValueError, TypeError, AttributeError) as e:
+            return False, f"invalid lines/zones: {e}"
+        try:
+            RegionOfInterest(polygon=options.get("roi"), tiles=options.get("tiles"))
+        except (ValueError, TypeError) as e:
+            return False, f"invalid roi/tiles: {e}"
+
+        self.stop_event.clear()
+        self._stopping = False
+        self.ring = JpegRing()
+        self.conn, child_conn = _ctx.Pipe()
+        self.proc = _ctx.Process(
+            target=_worker_main,
+            args=(self.sid, (model_file, source, conf, imgsz, interval), options, self.ring.name, child_conn),
+            daemon=True,
+        )
+        self._stats = {"sid": self.sid, "status": "starting", "model_file": model_file, "source": source}
+        self.proc.start()
+        child_conn.close()
+        self.thread = threading.Thread(target=self._relay, daemon=True)
+        self.thread.start()
+        return True, "started"
+
+    def set_degrade(self, level: int):
+        # forwarded to the child by the relay thread (the only sender on the pipe)
+        self.degrade = int(level)
+
+    def _relay(self):
+        viewers = -1
+        degrade = 0
+        exited = False
+        try:
+            while True:
+                if self.broadcaster.viewers != viewers:
+                    viewers = self.broadcaster.viewers
+                    self.conn.send(("viewers", viewers))
+                if self.degrade != degrade:
+                    degrade = self.degrade
+                    self.conn.send(("degrade", degrade))
+                while not self._outbox.empty():
+                    self.conn.send(self._outbox.get())
+                if not self.conn.poll(0.2):
+                    if not self.proc.is_alive():
+                        break
+                    continue
+                kind, payload = self.conn.recv()
+                if kind == "frame":
+                    jpg = self.ring.read(payload)
+                    if jpg is not None:
+                        self.broadcaster.publish(jpg)
+                elif kind == "frame_data":
+                    self.broadcaster.publish(payload)
+                elif kind == "stats":
+                    self._metrics = payload.pop("metrics", None)
+                    self._stats = payload
+                elif kind == "reply":
+                    req_id, result = payload
+                    fut = self._calls.pop(req_id, None)
+                    if fut is not None:
+                        fut.set_result(result)
+                elif kind == "started":
+                    ok, msg = payload
+                    if not ok:
+                        self._stats = dict(self._stats, status="failed_start", message=msg)
+                elif kind == "exit":
+                    exited = True
+                    break
+        except (EOFError, BrokenPipeError, OSError):
+            pass
+        finally:
+            if not exited and not str(self._stats.get("status", "")).startswith("failed"):
+                # child killed or crashed: its last stats still say "running"
+                self._stats = dict(self._stats, status="stopped" if self._stopping else "failed")
+            self.proc.join(timeout=5.0)
+            self.conn.close()
+            self.ring.close(unlink=True)
+            self.stop_event.set()
+            self.broadcaster.wake()
+            for fut in self._calls.values():
+                fut.set_result(None)
+            self._calls.clear()
+
+    def stop(self):
+        self._stopping = True
+        if self.proc is not None and self.proc.is_alive():
+            if self.thread and self.thread.is_alive():
+                self._outbox.put(("stop", None))
+            self.proc.join(timeout=5.0)
+            if self.proc.is_alive():
+                self.proc.terminate()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.stop_event.set()
+        self.broadcaster.reset()
+
+    def mjpeg_chunks(self, max_fps: float = None):
+        yield from self.broadcaster.subscribe(self.stop_event, max_fps=max_fps)
+
+    def _call(self, method: str, args, timeout: float):
+        """Runs a StreamSession method in the child and waits for its result (None on failure)."""
+        if not (self.thread and self.thread.is_alive()):
+            return None
+        req_id = next(self._call_ids)
+        fut = self._calls[req_id] = Future()
+        self._outbox.put(("call", (req_id, method, tuple(args))))
+        try:
+            return fut.result(timeout=timeout)
+        except Exception:
+            self._calls.pop(req_id, None)
+            return None
+
+    def profile(self, seconds: float = 5.0, hz: float = 100.0):
+        return self._call("profile", (seconds, hz), timeout=seconds + 10.0)
+
+    def record_trace(self, seconds: float = 5.0):
+        return self._call("record_trace", (seconds,), timeout=seconds + 30.0)
+
+    def metrics(self):
+        return self._metrics
+
+    def get_stats(self):
+        out = dict(self._stats)
+        out["viewers"] = self.broadcaster.viewers
+        out["mode"] = "process"
+        out["pid"] = self.proc.pid if self.proc is not None else None
+        return out
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+
+PROFILE_HZ = float(os.environ.get("PROFILE_HZ", "100"))
+MAX_PROFILE_S = 60.0
+TRACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "traces"))
+MAX_TRACE_EVENTS = 500000
+
+
+def _func_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_threads(threads: dict, seconds: float, hz: float = PROFILE_HZ, top: int = 25):
+    """
+    Wall-clock sampling profiler over the given threads (name -> ident).
+
+    Every 1/hz s the other threads' stacks are read from
+    sys._current_frames(); nothing is installed in the profiled threads,
+    so they run at full speed between samples. Returns collapsed stacks
+    ("thread;outer;...;leaf count" lines, the input format of
+    flamegraph.pl / speedscope) and the top functions by self time.
+    Blocked time counts too: a stage starved by its queue shows up as
+    time in its wait().
+    """
+    seconds = max(0.1, min(MAX_PROFILE_S, float(seconds)))
+    period = 1.0 / max(1.0, min(1000.0, float(hz)))
+    names = {ident: name for name, ident in threads.items() if ident}
+    stacks = Counter()
+    labels = {}           # code object -> "func (file:line)"
+    ticks = 0
+    cost = 0.0
+    perf = time.perf_counter
+
+    start = perf()
+    deadline = start + seconds
+    next_t = start
+    while True:
+        t0 = perf()
+        if t0 >= deadline:
+            break
+        frames = sys._current_frames()
+        for ident, name in names.items():
+            f = frames.get(ident)
+            stack = []
+            while f is not None:
+                code = f.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _func_name(code)
+                stack.append(label)
+                f = f.f_back
+            if stack:
+                stack.append(name)
+                stacks[tuple(reversed(stack))] += 1
+        del frames
+        ticks += 1
+        cost += perf() - t0
+        next_t += period
+        delay = next_t - perf()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = perf() - start
+
+    total = sum(stacks.values())
+    self_counts, incl_counts, per_thread = Counter(), Counter(), Counter()
+    for stack, c in stacks.items():
+        per_thread[stack[0]] += c
+        self_counts[stack[-1]] += c
+        for fn in set(stack[1:]):
+            incl_counts[fn] += c
+
+    def pct(c):
+        return round(100.0 * c / total, 1) if total else 0.0
+
+    return {
+        "seconds": round(elapsed, 2),
+        "hz": round(1.0 / period, 1),
+        "ticks": ticks,
+        "samples": total,
+        "overhead_pct": round(100.0 * cost / elapsed, 2) if elapsed > 0 else 0.0,
+        "threads": dict(per_thread),
+        "top_self": [
+            {"function": fn, "self_samples": c, "self_pct": pct(c), "total_pct": pct(incl_counts[fn])}
+            for fn, c in self_counts.most_common(top)
+        ],
+        "collapsed": "\n".join(f"{';'.join(s)} {c}" for s, c in stacks.most_common()),
+    }
+
+
+class StageTrace:
+    """
+    Per-frame stage timings while attached to a session's StageStats:
+    one (stage, thread, start, duration) event per Timer block plus a
+    marker per frame entering inference. Written as a Chrome trace
+    (chrome://tracing, Perfetto) for offline analysis.
+    """
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS):
+        self.max_events = max_events
+        self.events = []       # (name, thread ident, start s, duration s, frame index)
+        self.dropped = 0
+        self.t0 = time.perf_counter()
+
+    def add(self, name: str, dt: float):
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        end = time.perf_counter()
+        self.events.append((name, threading.get_ident(), end - dt, dt, None))
+
+    def mark(self, frame_idx: int):
+        if len(self.events) < self.max_events:
+            self.events.append(("frame", threading.get_ident(), time.perf_counter(), 0.0, frame_idx))
+
+    def summary(self):
+        durs = {}
+        for name, _, _, dt, frame in self.events:
+            if frame is None:
+                durs.setdefault(name, []).append(dt * 1000.0)
+        out = {}
+        for name, xs in durs.items():
+            xs.sort()
+            out[name] = {
+                "n": len(xs),
+                "mean_ms": round(sum(xs) / len(xs), 3),
+                "p50_ms": round(xs[len(xs) // 2], 3),
+                "p99_ms": round(xs[min(len(xs) - 1, int(0.99 * len(xs)))], 3),
+                "max_ms": round(xs[-1], 3),
+            }
+        return out
+
+    def write(self, path: str, thread_names: dict = None):
+        pid = os.getpid()
+        trace = []
+        for ident, name in (thread_names or {}).items():
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": name}})
+        for name, tid, start, dt, frame in self.events:
+            ts = round((start - self.t0) * 1e6, 1)
+            if frame is None:
+                trace.append({"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": ts,
+                              "dur": round(dt * 1e6, 1)})
+            else:
+                trace.append({"name": f"frame {frame}", "ph": "i", "s": "t", "pid": pid, "tid": tid,
+                              "ts": ts, "args": {"frame": frame}})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
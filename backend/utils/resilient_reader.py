@@ -0,0 +1,179 @@
+import os
+import time
+import random
+import threading
+import cv2
+
+from .pipeline import DropQueue, END
+
+READ_AHEAD = int(os.environ.get("READ_AHEAD", "4"))
+MAX_READ_AHEAD = 64
+BACKOFF_INITIAL = float(os.environ.get("RECONNECT_BACKOFF_S", "0.5"))
+BACKOFF_MAX = float(os.environ.get("RECONNECT_BACKOFF_MAX_S", "30"))
+# 0 = keep retrying a live source until the session is stopped
+GIVE_UP_S = float(os.environ.get("RECONNECT_GIVE_UP_S", "0"))
+
+
+class ResilientReader:
+    """
+    Reads a capture on its own thread into a small read-ahead buffer, and
+    reconnects live sources when they drop.
+
+    opener() must return (cap, via) or (None, None); the session passes one
+    that re-resolves the source. While reconnecting, retries back off
+    exponentially (with jitter) from backoff_initial up to backoff_max.
+    The consumer only sees a pause - tracker and counts carry on - and
+    read() ends only when a finite source is done, the reader gives up
+    (give_up_s without a frame) or stop() is called.
+
+    Files are read with a blocking buffer (no frame lost); live sources
+    drop the oldest buffered frame rather than fall behind.
+    """
+
+    def __init__(self, opener, cap, via: str, live: bool = True, buffer: int = READ_AHEAD,
+                 backoff_initial: float = BACKOFF_INITIAL, backoff_max: float = BACKOFF_MAX,
+                 give_up_s: float = GIVE_UP_S, stage=None, on_status=None):
+        self.opener = opener
+        self.cap = cap
+        self.via = via
+        self.live = live
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.give_up_s = give_up_s
+        self.stage = stage              # optional StageStats for decode time
+        self.on_status = on_status      # on_status(status, via)
+        self.buffer = DropQueue(maxsize=max(1, min(MAX_READ_AHEAD, buffer)), drop_oldest=live)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.state = "connected"
+        self.delay = backoff_initial
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.gap_started = None
+        self.last_gap_s = 0.0
+        self.max_gap_s = 0.0
+        self.total_gap_s = 0.0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _ended(self, from_cap: int) -> bool:
+        if not self.live:
+            return True
+        # a remote VOD that reached its last frame is done, not dropped
+        total = self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        return total > 0 and from_cap >= total - 1
+
+    def _loop(self):
+        from_cap = 0
+        try:
+            while not self.stop_event.is_set():
+                t = time.perf_counter()
+                ok, frame = self.cap.read()
+                if ok:
+                    if self.stage is not None:
+                        self.stage.record(time.perf_counter() - t)
+                    from_cap += 1
+                    self.delay = self.backoff_initial   # source works again
+                    if not self.buffer.put(frame, stop_event=self.stop_event):
+                        return
+                    continue
+                if self._ended(from_cap) or not self._reconnect(from_cap):
+                    break
+                from_cap = 0
+        finally:
+            if self.state == "connected":
+                self.state = "ended"
+            # blocking put so a file's last frames are not pushed out by END
+            if not self.buffer.put(END, stop_event=self.stop_event):
+                self.buffer.put(END, force=True)
+
+    def _reconnect(self, from_cap: int) -> bool:
+        self.state = "reconnecting"
+        self.gap_started = time.monotonic()
+        self._notify("reconnecting")
+        try:
+            self.cap.release()
+        except Exception:
+            pass
+
+        # first retry is immediate, unless the last reconnect never produced
+        # a frame - then a flapping source would spin without backing off
+        if from_cap == 0:
+            self._wait()
+        while not self.stop_event.is_set():
+            cap, via = self.opener()
+            if cap is not None:
+                if self.stop_event.is_set():
+                    cap.release()
+                    return False
+                self.cap, self.via = cap, via
+                gap = time.monotonic() - self.gap_started
+                self.last_gap_s = gap
+                self.max_gap_s = max(self.max_gap_s, gap)
+                self.total_gap_s += gap
+                self.reconnects += 1
+                self.gap_started = None
+                self.state = "connected"
+                self._notify("running")
+                return True
+
+            self.failed_attempts += 1
+            if self.give_up_s and time.monotonic() - self.gap_started >= self.give_up_s:
+                self.state = "gave_up"
+                return False
+            self._wait()
+        return False
+
+    def _wait(self):
+        # jitter keeps many sessions on one dead camera from retrying in lockstep
+        self.stop_event.wait(self.delay * random.uniform(0.8, 1.2))
+        self.delay = min(self.backoff_max, self.delay * 2)
+
+    def _notify(self, status: str):
+        if self.on_status is not None:
+            try:
+                self.on_status(status, self.via)
+            except Exception as e:
+                print("reader status callback failed:", e)
+
+    def read(self, stop_event=None):
+        """Next frame as (ok, frame); blocks through reconnects until stop_event is set."""
+        while True:
+            item = self.buffer.get(timeout=0.5)
+            if item is END:
+                return False, None
+            if item is not None:
+                return True, item
+            if self.stop_event.is_set() or (stop_event is not None and stop_event.is_set()):
+                return False, None
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        try:
+            self.cap.release()
+        except Exception:
+            pass
+
+    def stats(self):
+        gap_now = time.monotonic() - self.gap_started if self.gap_started is not None else 0.0
+        return {
+            "state": self.state,
+            "via": self.via,
+            "buffered": len(self.buffer),
+            "dropped": self.buffer.dropped,
+            "reconnects": self.reconnects,
+            "failed_attempts": self.failed_attempts,
+            "current_gap_s": round(gap_now, 2),
+            "last_gap_s": round(self.last_gap_s, 2),
+            "max_gap_s": round(self.max_gap_s, 2),
+            "total_gap_s": round(self.total_gap_s + gap_now, 2),
+        }
@@ -0,0 +1,184 @@
+import os
+import re
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+import yt_dlp
+
+try:
+    import streamlink
+except Exception:
+    streamlink = None
+
+RESOLVE_TIMEOUT = float(os.environ.get("RESOLVE_TIMEOUT", "20"))
+DEFAULT_TTL = float(os.environ.get("RESOLVE_TTL", "300"))   # when the URL carries no expiry
+EXPIRY_MARGIN = 60.0     # re-resolve this long before a signed URL runs out
+
+_EXPIRE_PATH = re.compile(r"/expire/(\d+)")
+
+
+def resolve_youtube_with_ytdlp(url: str):
+    try:
+        ydl_opts = {
+            "format": "best[ext=mp4]/best",
+            "quiet": True,
+            "noplaylist": True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            return info.get("url", None)
+    except Exception as e:
+        print("yt-dlp resolve error:", e)
+        return None
+
+
+def resolve_with_streamlink(url: str):
+    if streamlink is None:
+        return None
+    try:
+        streams = streamlink.streams(url)
+        if not streams:
+            return None
+        best = streams.get("best") or next(iter(streams.values()))
+        return best.to_url()
+    except Exception as e:
+        print("streamlink error:", e)
+        return None
+
+
+def _is_youtube(url: str) -> bool:
+    return "youtube.com" in url or "youtu.be" in url
+
+
+# name -> (matches(url), resolve(url) -> playable url or None), tried in parallel
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def register_resolver(name: str, resolve, matches=None):
+    """Adds or replaces a resolver. matches(url) limits which sources it is raced on."""
+    with _resolvers_lock:
+        _resolvers[name] = (matches or (lambda url: True), resolve)
+
+
+def unregister_resolver(name: str):
+    with _resolvers_lock:
+        _resolvers.pop(name, None)
+
+
+def resolvers_for(url: str):
+    with _resolvers_lock:
+        items = list(_resolvers.items())
+    return [(name, resolve) for name, (matches, resolve) in items if matches(url)]
+
+
+register_resolver("ytdlp", resolve_youtube_with_ytdlp, matches=_is_youtube)
+if streamlink is not None:
+    register_resolver("streamlink", resolve_with_streamlink)
+
+
+def url_expiry(url: str):
+    """Unix time a signed media URL stops working (expire= query or /expire/<ts>/ path), if any."""
+    try:
+        q = parse_qs(urlparse(url).query).get("expire")
+        if q:
+            return float(q[0])
+    except ValueError:
+        pass
+    m = _EXPIRE_PATH.search(url)
+    return float(m.group(1)) if m else None
+
+
+class ResolverCache:
+    """source URL -> (resolved URL, strategy), valid until the resolved URL expires."""
+
+    def __init__(self, default_ttl: float = DEFAULT_TTL):
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.entries = {}     # source -> (resolved, via, valid_until)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str):
+        now = time.time()
+        with self.lock:
+            e = self.entries.get(source)
+            if e is None or e[2] <= now:
+                self.entries.pop(source, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return e[0], e[1]
+
+    def put(self, source: str, resolved: str, via: str):
+        now = time.time()
+        expires = url_expiry(resolved)
+        valid_until = now + self.default_ttl
+        if expires is not None:
+            valid_until = min(valid_until, expires - EXPIRY_MARGIN)
+        if valid_until <= now:
+            return
+        with self.lock:
+            self.entries[source] = (resolved, via, valid_until)
+
+    def invalidate(self, source: str):
+        with self.lock:
+            self.entries.pop(source, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_s": {src: round(e[2] - now, 1) for src, e in self.entries.items()},
+            }
+
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="resolve")
+
+
+def race(tasks, timeout: float = RESOLVE_TIMEOUT, discard=None):
+    """
+    Runs (name, fn) tasks concurrently; returns (name, result) of the first
+    one that returns something other than None, or None. Results of tasks
+    that finish after the winner are passed to discard() (e.g. to release
+    an opened capture) instead of leaking.
+    """
+    futures = {_executor.submit(fn): name for name, fn in tasks}
+    winner = None
+    try:
+        for fut in as_completed(futures, timeout=timeout):
+            try:
+                res = fut.result()
+            except Exception as e:
+                print(f"resolver {futures[fut]} failed:", e)
+                continue
+            if res is not None:
+                winner = fut
+                break
+    except FutureTimeout:
+        pass
+
+    if discard is not None:
+        def _drop(f):
+            try:
+                res = f.result()
+            except Exception:
+                return
+            if res is not None:
+                discard(res)
+        for fut in futures:
+            if fut is not winner:
+                fut.add_done_callback(_drop)
+    return (futures[winner], winner.result()) if winner is not None else None
+
+
+# Singleton cache
+resolver_cache = ResolverCache()
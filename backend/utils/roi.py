@@ -0,0 +1,225 @@
+import math
+import cv2
+import numpy as np
+import supervision as sv
+
+MAX_TILES = 6           # per axis
+EDGE_PX = 3             # a box this close to an inner tile edge is cut off by it
+
+
+def parse_tiles(tiles):
+    """None / n / [cols, rows] -> (cols, rows); ValueError for anything else."""
+    if tiles is None or tiles == 0:
+        return (1, 1)
+    if isinstance(tiles, int) and not isinstance(tiles, bool):
+        tiles = (tiles, tiles)
+    if not isinstance(tiles, (list, tuple)) or len(tiles) != 2 \
+            or not all(isinstance(t, int) and not isinstance(t, bool) and t > 0 for t in tiles):
+        raise ValueError("tiles must be a positive int or [cols, rows] of positive ints")
+    return (min(MAX_TILES, tiles[0]), min(MAX_TILES, tiles[1]))
+
+
+def merge_tile_boxes(xyxy, cut_x, cut_y, order, ios: float = 0.5):
+    """
+    Class-agnostic greedy merge of boxes from overlapping tiles.
+
+    cut_x / cut_y: box is cut off by an inner tile edge on the left/right or
+    top/bottom. Two boxes match when they intersect and either their
+    intersection over the smaller box is >= ios (the same vehicle seen in
+    two tiles) or both are cut the same way and line up across the seam
+    (the two halves of a vehicle larger than the overlap). Pairwise matches
+    are computed once with numpy; boxes are then taken in `order`. An uncut
+    box absorbs its unused matches. A cut box absorbs everything reachable
+    through matches of cut boxes (a vehicle cut into up to four pieces at a
+    tile corner) and becomes their union, classed as its largest fragment;
+    a complete view in the group wins over the union. Returns
+    [(representative index, box)].
+    """
+    b = np.asarray(xyxy, dtype=np.float64)
+    n = len(b)
+    cut_x = np.asarray(cut_x, dtype=bool)
+    cut_y = np.asarray(cut_y, dtype=bool)
+    w = b[:, 2] - b[:, 0]
+    h = b[:, 3] - b[:, 1]
+    iw = np.minimum(b[:, None, 2], b[None, :, 2]) - np.maximum(b[:, None, 0], b[None, :, 0])
+    ih = np.minimum(b[:, None, 3], b[None, :, 3]) - np.maximum(b[:, None, 1], b[None, :, 1])
+    touch = (iw > 0) & (ih > 0)
+    area = w * h
+    smaller = np.maximum(1e-6, np.minimum(area[:, None], area[None, :]))
+    same = touch & (iw * ih / smaller >= ios)
+    # overlap along the seam, as a fraction of the shorter side
+    along_y = ih / np.maximum(1e-6, np.minimum(h[:, None], h[None, :]))
+    along_x = iw / np.maximum(1e-6, np.minimum(w[:, None], w[None, :]))
+    halves = touch & ((cut_x[:, None] & cut_x[None, :] & (along_y >= 0.5)) |
+                      (cut_y[:, None] & cut_y[None, :] & (along_x >= 0.5)))
+    match = same | halves
+    cut = cut_x | cut_y
+    rank = np.empty(n, dtype=int)
+    rank[np.asarray(order, dtype=int)] = np.arange(n)
+
+    used = np.zeros(n, dtype=bool)
+    out = []
+    for i in order:
+        if used[i]:
+            continue
+        if not cut[i]:
+            members = same[i] & ~used
+            used |= members
+            out.append((i, b[i]))
+            continue
+        group = [i]
+        used[i] = True
+        k = 0
+        while k < len(group):
+            nb = np.flatnonzero(match[group[k]] & ~used)
+            used[nb] = True
+            group.extend(nb.tolist())
+            k += 1
+        group = np.array(group)
+        whole = group[~cut[group]]
+        if len(whole):
+            # the complete view wins over fragments
+            rep = whole[np.argmin(rank[whole])]
+            out.append((rep, b[rep]))
+            continue
+        g = b[group]
+        rep = group[np.argmax(area[group])]
+        out.append((rep, np.array([g[:, 0].min(), g[:, 1].min(), g[:, 2].max(), g[:, 3].max()])))
+    return out
+
+
+def _tile_starts(length: int, n: int, overlap: float):
+    """n windows of equal size covering [0, length) with the given overlap."""
+    if n <= 1:
+        return [0], length
+    size = int(math.ceil(length / (n - (n - 1) * overlap)))
+    size = min(size, length)
+    step = (length - size) / (n - 1)
+    return [int(round(i * step)) for i in range(n)], size
+
+
+class RegionOfInterest:
+    """
+    Per-session ROI crop and optional tiled inference.
+
+    polygon: [[x, y], ...] in source-frame pixels. The frame is cropped to
+        the polygon's bounding box and pixels outside it are blacked out, so
+        sky / sidewalk never reach the model; detections whose bottom-centre
+        anchor falls outside the polygon are dropped.
+    tiles: n or (cols, rows) - the (cropped) frame is split into overlapping
+        tiles that go to the model as one batch; detections are shifted back
+        to frame coordinates and merged across tiles (merge_tile_boxes), so a
+        vehicle on a seam is one box, not one per tile.
+    """
+
+    def __init__(self, polygon=None, tiles=None, overlap: float = 0.2, merge_ios: float = 0.5):
+        self.polygon = None
+        if polygon:
+            pts = np.asarray(polygon, dtype=np.int32)
+            if pts.ndim != 2 or pts.shape[1] != 2 or pts.shape[0] < 3:
+                raise ValueError("roi needs at least 3 [x, y] points")
+            self.polygon = pts
+        self.tiles = parse_tiles(tiles)
+        self.overlap = min(0.9, max(0.0, float(overlap)))
+        self.merge_ios = float(merge_ios)
+
+        self._shape = None
+        self._box = None       # x0, y0, x1, y1 of the crop
+        self._mask = None      # polygon mask inside the crop (None = keep all)
+        self._windows = []     # (x, y, w, h) tiles relative to the crop
+
+    @property
+    def active(self) -> bool:
+        return self.polygon is not None or self.tiles != (1, 1)
+
+    def _layout(self, shape):
+        # frame size is only known once the source is open; computed once
+        h, w = shape[:2]
+        if self.polygon is not None:
+            pts = self.polygon.copy()
+            pts[:, 0] = np.clip(pts[:, 0], 0, w - 1)
+            pts[:, 1] = np.clip(pts[:, 1], 0, h - 1)
+            x, y, bw, bh = cv2.boundingRect(pts)
+            self._box = (x, y, x + bw, y + bh)
+            mask = np.zeros((bh, bw), dtype=np.uint8)
+            cv2.fillPoly(mask, [pts - np.array([x, y], dtype=np.int32)], 1)
+            self._mask = mask.astype(bool) if not mask.all() else None
+        else:
+            self._box = (0, 0, w, h)
+            self._mask = None
+
+        x0, y0, x1, y1 = self._box
+        xs, tw = _tile_starts(x1 - x0, self.tiles[0], self.overlap)
+        ys, th = _tile_starts(y1 - y0, self.tiles[1], self.overlap)
+        self._windows = [(x, y, tw, th) for y in ys for x in xs]
+        self._shape = shape
+
+    def split(self, frame):
+        """Returns (images for the model, (dx, dy) offset of each in frame coords)."""
+        if frame.shape != self._shape:
+            self._layout(frame.shape)
+        x0, y0, x1, y1 = self._box
+        crop = frame[y0:y1, x0:x1]
+        if self._mask is not None:
+            crop = crop.copy()
+            crop[~self._mask] = 0
+        if len(self._windows) == 1:
+            return [crop], [(x0, y0)]
+        images, offsets = [], []
+        for x, y, tw, th in self._windows:
+            images.append(crop[y:y + th, x:x + tw])
+            offsets.append((x0 + x, y0 + y))
+        return images, offsets
+
+    def merge(self, results, offsets) -> sv.Detections:
+        parts, cut_x, cut_y = [], [], []
+        tiled = len(results) > 1
+        if tiled:
+            cw, ch = self._box[2] - self._box[0], self._box[3] - self._box[1]
+        for k, (res, (dx, dy)) in enumerate(zip(results, offsets)):
+            d = sv.Detections.from_ultralytics(res)
+            if tiled:
+                # which of this tile's edges are inside the crop (seams)
+                x, y, tw, th = self._windows[k]
+                b = d.xyxy
+                cut_x.append(((x > 0) & (b[:, 0] <= EDGE_PX)) | ((x + tw < cw) & (b[:, 2] >= tw - EDGE_PX)))
+                cut_y.append(((y > 0) & (b[:, 1] <= EDGE_PX)) | ((y + th < ch) & (b[:, 3] >= th - EDGE_PX)))
+            if len(d) and (dx or dy):
+                d.xyxy = d.xyxy + np.array([dx, dy, dx, dy], dtype=d.xyxy.dtype)
+            parts.append(d)
+        dets = sv.Detections.merge(parts) if parts else sv.Detections.empty()
+        if tiled and len(dets):
+            # the same vehicle shows up in every tile it overlaps, possibly
+            # cut in two and classed differently in each
+            cx, cy = np.concatenate(cut_x), np.concatenate(cut_y)
+            conf = dets.confidence if dets.confidence is not None else np.ones(len(dets))
+            order = np.lexsort((-conf, cx | cy))   # uncut first, then by confidence
+            groups = merge_tile_boxes(dets.xyxy, cx, cy, order, self.merge_ios)
+            keep = np.array([i for i, _ in groups], dtype=int)
+            boxes = np.array([b for _, b in groups], dtype=dets.xyxy.dtype)
+            dets = dets[keep]
+            dets.xyxy = boxes
+        return self.keep_inside(dets)
+
+    def keep_inside(self, dets: sv.Detections) -> sv.Detections:
+        """Drops detections whose bottom-centre anchor is outside the ROI polygon."""
+        if self.polygon is None or not len(dets):
+            return dets
+        anchors = np.stack([(dets.xyxy[:, 0] + dets.xyxy[:, 2]) / 2, dets.xyxy[:, 3]], axis=1)
+        poly = self.polygon.astype(np.float32)
+        inside = np.array([cv2.pointPolygonTest(poly, (float(x), float(y)), False) >= 0
+                           for x, y in anchors], dtype=bool)
+        return dets[inside]
+
+    def draw(self, img):
+        if self.polygon is not None:
+            cv2.polylines(img, [self.polygon], True, (0, 200, 0), 1)
+        return img
+
+    def stats(self):
+        return {
+            "roi": self.polygon.tolist() if self.polygon is not None else None,
+            "crop": list(self._box) if self._box else None,
+            "tiles": list(self.tiles),
+            "overlap": self.overlap,
+        }
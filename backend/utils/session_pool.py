@@ -0,0 +1,113 @@
+import os
+import time
+
+from .inference_scheduler import inference_scheduler
+
+# hard cap on running sessions, 0 = admission by measured load only
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "0"))
+IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "300"))      # stopped sessions reclaimed after (s)
+MONITOR_INTERVAL = float(os.environ.get("POOL_MONITOR_S", "2"))
+# load = max(cpu, inference) utilisation, 1.0 = saturated
+ADMIT_LOAD = float(os.environ.get("POOL_ADMIT_LOAD", "0.85"))
+HIGH_LOAD = float(os.environ.get("POOL_HIGH_LOAD", "0.9"))
+LOW_LOAD = float(os.environ.get("POOL_LOW_LOAD", "0.6"))
+RESTORE_HOLD_S = 3 * MONITOR_INTERVAL   # no restore right after a degrade (no flapping)
+
+# degrade level -> (interval multiplier, imgsz scale); level 0 = as requested
+DEGRADE_STEPS = [(1, 1.0), (2, 1.0), (2, 0.75), (4, 0.75), (4, 0.5)]
+MAX_DEGRADE = len(DEGRADE_STEPS) - 1
+MIN_IMGSZ = 320
+
+
+def degraded(interval: int, imgsz: int, level: int):
+    """(interval, imgsz) a session runs at on the given degrade level."""
+    mult, scale = DEGRADE_STEPS[max(0, min(MAX_DEGRADE, level))]
+    if scale < 1.0:
+        imgsz = max(min(MIN_IMGSZ, imgsz), int(imgsz * scale) // 32 * 32)
+    return max(1, interval) * mult, imgsz
+
+
+def session_cost(stats: dict) -> float:
+    """Seconds of inference per second of wall time a session is using."""
+    infer = (stats.get("stages") or {}).get("infer") or {}
+    return float(stats.get("fps_proc") or 0.0) * float(infer.get("avg_ms") or 0.0) / 1000.0
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class LoadMonitor:
+    """
+    Measures headroom between samples: CPU time used by this process and
+    by session child processes (which report their own cpu_s), over wall
+    time and cores, and the busy fraction of the busiest inference worker
+    (one per scheduler queue, children's included). Workers run in
+    parallel, so their busy times are not added up: four workers at 30%
+    leave each of them room, while one at 100% is saturated. Load is the
+    larger of the two.
+    """
+
+    def __init__(self, cores: int = None):
+        self.cores = cores or _cpu_count()
+        self.cpu = 0.0
+        self.infer = 0.0
+        self.load = 0.0
+        self.samples = 0
+        self.admitted = 0          # sessions started since the last sample
+        self._prev = None          # (wall, {counter key: cumulative seconds})
+
+    def _counters(self, stats: dict):
+        t = os.times()
+        out = {"cpu:self": t.user + t.system}
+        for q, busy in inference_scheduler.busy_by_queue().items():
+            out[f"infer:self:{q}"] = busy
+        for sid, s in stats.items():
+            if s.get("cpu_s") is not None:
+                out[f"cpu:{sid}:{s.get('pid')}"] = s["cpu_s"]
+            for q, busy in (s.get("infer_busy") or {}).items():
+                out[f"infer:{sid}:{s.get('pid')}:{q}"] = busy
+        return out
+
+    def sample(self, stats: dict) -> float:
+        """stats: sid -> get_stats() of every session; returns the new load."""
+        return self.update(self._counters(stats), time.monotonic())
+
+    def update(self, counters: dict, now: float) -> float:
+        """counters: "cpu:..." / "infer:..." -> cumulative seconds (see _counters)."""
+        if self._prev is not None:
+            wall, prev = self._prev
+            dt = now - wall
+            if dt > 0:
+                # only counters seen both times (a child that exited takes its cpu with it)
+                cpu = sum(v - prev[k] for k, v in counters.items() if k.startswith("cpu:") and k in prev)
+                busy = [v - prev[k] for k, v in counters.items() if k.startswith("infer:") and k in prev]
+                self.cpu = max(0.0, cpu / dt / self.cores)
+                self.infer = min(1.0, max([0.0] + busy) / dt)
+                self.load = max(self.cpu, self.infer)
+                self.samples += 1
+        self._prev = (now, counters)
+        self.admitted = 0
+        return self.load
+
+    def projected(self, sessions: int) -> float:
+        """Load expected with this many sessions, scaled from the ones already measured."""
+        measured = sessions - 1 - self.admitted     # minus the candidate and the unmeasured
+        if measured <= 0:
+            return self.load
+        return self.load * sessions / measured
+
+    def stats(self):
+        return {
+            "load": round(self.load, 3),
+            "cpu": round(self.cpu, 3),
+            "inference": round(self.infer, 3),
+            "cores": self.cores,
+            "samples": self.samples,
+            "admit_below": ADMIT_LOAD,
+            "degrade_above": HIGH_LOAD,
+            "restore_below": LOW_LOAD,
+        }
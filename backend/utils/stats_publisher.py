@@ -0,0 +1,142 @@
+import json
+import time
+import threading
+
+MAX_TICK_HZ = 10.0
+HEARTBEAT_S = 15.0
+
+
+def _diff(old: dict, new: dict) -> dict:
+    """Top-level keys whose value changed (nested dicts are sent whole)."""
+    if old is None:
+        return dict(new)
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+class _SidState:
+    __slots__ = ("version", "snapshot", "delta_json")
+
+    def __init__(self):
+        self.version = 0
+        self.snapshot = None
+        self.delta_json = None   # serialized delta from version-1, shared by all subscribers
+
+
+class StatsPublisher:
+    """
+    One polling thread that snapshots session stats for every subscriber.
+
+    Each tick reads get_stats() once per session (not once per client),
+    bumps a version when anything changed and pre-serializes the delta.
+    A subscriber that is exactly one version behind reuses that shared
+    payload; one that fell behind gets a single coalesced diff against
+    the snapshot it last saw.
+    """
+
+    def __init__(self, fetch_stats, list_sids):
+        self.fetch_stats = fetch_stats
+        self.list_sids = list_sids
+        self.cond = threading.Condition()
+        self.state = {}          # sid -> _SidState
+        self.rates = {}          # subscriber token -> requested Hz
+        self.thread = None
+        self.ticks = 0
+
+    def _tick_interval(self):
+        rate = max(self.rates.values()) if self.rates else 1.0
+        return 1.0 / min(MAX_TICK_HZ, max(0.1, rate))
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                if not self.rates:
+                    self.thread = None
+                    return
+                interval = self._tick_interval()
+            self._poll()
+            time.sleep(interval)
+
+    def _poll(self):
+        sids = list(self.list_sids())
+        fresh = {}
+        for sid in sids:
+            s = self.fetch_stats(sid)
+            if s is not None:
+                fresh[sid] = s
+        with self.cond:
+            for sid, snap in fresh.items():
+                st = self.state.get(sid)
+                if st is None:
+                    st = self.state[sid] = _SidState()
+                delta = _diff(st.snapshot, snap)
+                if not delta:
+                    continue
+                st.version += 1
+                st.snapshot = snap
+                st.delta_json = json.dumps({"sid": sid, "v": st.version, "delta": delta})
+            for sid in list(self.state):
+                if sid not in fresh:
+                    del self.state[sid]
+            self.ticks += 1
+            self.cond.notify_all()
+
+    def subscribe(self, sids=None, rate: float = 2.0):
+        """
+        Generator of server-sent-event chunks. sids=None multiplexes every
+        session (including ones that appear later) into this one stream.
+        """
+        token = object()
+        rate = min(MAX_TICK_HZ, max(0.1, float(rate)))
+        gap = 1.0 / rate
+        seen = {}                  # sid -> (version, snapshot) last sent
+        with self.cond:
+            self.rates[token] = rate
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+        try:
+            last_send = time.monotonic()
+            yield "retry: 2000\n\n"
+            while True:
+                events = []
+                with self.cond:
+                    self.cond.wait(timeout=gap)
+                    wanted = self.state.keys() if sids is None else [s for s in sids if s in self.state]
+                    for sid in list(wanted):
+                        st = self.state[sid]
+                        prev = seen.get(sid)
+                        if prev is not None and prev[0] == st.version:
+                            continue
+                        if prev is None:
+                            payload = json.dumps({"sid": sid, "v": st.version, "full": st.snapshot})
+                        elif prev[0] + 1 == st.version:
+                            payload = st.delta_json
+                        else:
+                            delta = _diff(prev[1], st.snapshot)
+                            payload = json.dumps({"sid": sid, "v": st.version, "delta": delta})
+                        seen[sid] = (st.version, st.snapshot)
+                        events.append(payload)
+                    gone = [sid for sid in seen if sid not in self.state]
+                for sid in gone:
+                    del seen[sid]
+                    events.append(json.dumps({"sid": sid, "removed": True}))
+
+                now = time.monotonic()
+                if events:
+                    yield "".join(f"event: stats\ndata: {e}\n\n" for e in events)
+                    last_send = now
+                elif now - last_send > HEARTBEAT_S:
+                    yield ": ping\n\n"
+                    last_send = now
+
+                # rate cap: anything that changes meanwhile is coalesced into the next diff
+                sleep_for = gap - (time.monotonic() - now)
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+        finally:
+            with self.cond:
+                self.rates.pop(token, None)
+
+    def get_stats(self):
+        with self.cond:
+            return {"subscribers": len(self.rates), "sessions": len(self.state), "ticks": self.ticks}
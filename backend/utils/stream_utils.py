@@ -1,56 +1,46 @@
 import os
-import time
-import cv2
-import yt_dlp
 
-def try_open(cap_url):
-    cap = None
-    try:
-        cap = cv2.VideoCapture(cap_url, cv2.CAP_FFMPEG)
-        time.sleep(0.3)
-        if not cap.isOpened():
-            if cap is not None:
-                cap.release()
-            return None
-        return cap
-    except Exception:
-        try:
-            if cap is not None:
-                cap.release()
-        except Exception:
-            pass
-        return None
+from .capture import open_capture
+from .resolvers import resolver_cache, resolvers_for, race
 
-def resolve_youtube_with_ytdlp(url: str):
-    try:
-        ydl_opts = {
-            "format": "best[ext=mp4]/best",
-            "quiet": True,
-            "noplaylist": True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            return info.get("url", None)
-    except Exception as e:
-        print("yt-dlp resolve error:", e)
-        return None
+def try_open(cap_url, **capture_opts):
+    # open_capture only returns once a first frame decoded - no fixed settle sleep
+    return open_capture(cap_url, **capture_opts)
 
-def open_source(source: str):
+def open_source(source: str, refresh: bool = False, **capture_opts):
+    """
+    Opens a local file, or races a direct open against every resolver that
+    matches the URL (yt-dlp, streamlink, ...); the first capture that
+    delivers a frame wins. The winning URL is cached until it expires, so
+    the next start skips the race. refresh=True ignores the cache.
+    capture_opts: backend, threads, hw_accel, width, skip (see utils.capture).
+    """
     # Local file?
     if os.path.exists(source):
-        return try_open(source), "file"
+        return try_open(source, **capture_opts), "file"
 
-    # direct HTTP/RTSP?
-    cap = try_open(source)
-    if cap:
-        return cap, "direct"
-
-    # YouTube?
-    if "youtube.com" in source or "youtu.be" in source:
-        direct = resolve_youtube_with_ytdlp(source)
-        if direct:
-            cap = try_open(direct)
+    if not refresh:
+        hit = resolver_cache.get(source)
+        if hit:
+            cap = try_open(hit[0], **capture_opts)
             if cap:
-                return cap, "ytdlp"
+                return cap, hit[1]
+    resolver_cache.invalidate(source)
+
+    def strategy(resolve):
+        def run():
+            url = resolve(source)
+            if not url:
+                return None
+            cap = try_open(url, **capture_opts)
+            return (cap, url) if cap else None
+        return run
 
-    return None, None
+    tasks = [("direct", strategy(lambda url: url))]
+    tasks += [(name, strategy(resolve)) for name, resolve in resolvers_for(source)]
+    won = race(tasks, discard=lambda result: result[0].release())
+    if won is None:
+        return None, None
+    via, (cap, url) = won
+    resolver_cache.put(source, url, via)
+    return cap, via
@@ -1,163 +1,420 @@
 import os
 import time
 import threading
-import queue
+from types import MappingProxyType
 import cv2
-from ultralytics import YOLO
 import supervision as sv
 
 from .stream_utils import open_source
+from .capture import DECODE_THREADS
+from .resilient_reader import ResilientReader, READ_AHEAD, MAX_READ_AHEAD
+from .model_registry import model_registry
+from .inference_scheduler import inference_scheduler
+from .pipeline import DropQueue, StageStats, LatencyWindow, Timer, END
+from .metrics import RateWindow, PromText, merge_histograms
+from .profiler import StageTrace, sample_threads, PROFILE_HZ, TRACE_DIR, MAX_PROFILE_S
+from .broadcaster import FrameBroadcaster
+from .encoder import JpegEncoder
+from .motion import MotionGate
+from .roi import RegionOfInterest
+from .counting import COUNTABLE, NAME_MAP, TrackCounter
+from .zones import CountingEngine
+from .history import CountHistory, history_writer
+from .stats_publisher import StatsPublisher
+from .process_session import ProcessStreamSession
+from .session_pool import (
+    MAX_SESSIONS, IDLE_TTL, MONITOR_INTERVAL, ADMIT_LOAD, HIGH_LOAD, LOW_LOAD, RESTORE_HOLD_S,
+    MAX_DEGRADE, LoadMonitor, degraded, session_cost,
+)
 
-COUNTABLE = ("car", "van", "truck", "bus")
-NAME_MAP = {"car":"car","van":"van","truck":"truck","bus":"bus"}
-
-MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
 UPLOAD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "uploads"))
 
+# "thread": sessions share this process; "process": one child process per session
+SESSION_MODE = os.environ.get("SESSION_MODE", "thread")
+
+# hot-loop stats are republished every N processed frames
+STATS_EVERY = int(os.environ.get("STATS_EVERY", "5"))
+
+STAGES = ("read", "infer", "track", "count", "plot", "encode")
+# frames queued between two stages (read -> infer, infer -> encode)
+HANDOFF = 2
+
+# ROI / tiled results have no single ultralytics result to plot()
+_box_annotator = sv.BoxAnnotator(thickness=2)
+_label_annotator = sv.LabelAnnotator(text_scale=0.5)
+
+
+def _annotate(img, dets: sv.Detections):
+    img = img.copy()
+    _box_annotator.annotate(img, dets)
+    names = dets.data.get("class_name") if dets.data else None
+    if names is not None and len(dets):
+        _label_annotator.annotate(img, dets, labels=[str(n) for n in names])
+    return img
+
 class StreamSession:
     def __init__(self, sid: int):
         self.sid = sid
         self.thread = None
         self.stop_event = threading.Event()
-        self.frame_q = queue.Queue(maxsize=2)
+        self.broadcaster = FrameBroadcaster()  # latest JPEG for all MJPEG viewers
+        self.encoder = JpegEncoder()
+        self.motion = MotionGate()  # adaptive mode: skip detection on static scenes
+        self.roi = RegionOfInterest()  # optional crop / tiled inference
 
         self.tracker = sv.ByteTrack()
-        self.seen_ids = {k: set() for k in COUNTABLE}
+        self.counter = TrackCounter(COUNTABLE, NAME_MAP)
+        self.engine = CountingEngine()  # optional virtual lines / zones
+        self.history = CountHistory(sid)  # 1 s count buckets, flushed to SQLite
         self.cumulative = {k: 0 for k in COUNTABLE}
         self.current_visible = {k: 0 for k in COUNTABLE}
-        self.stats_lock = threading.Lock()
-        self.stats = {
+        # Immutable stats snapshot, replaced wholesale by the session thread.
+        # Readers just grab the current reference - no lock on either side.
+        self._snapshot = MappingProxyType({
             "sid": sid,
             "status": "idle",
             "model_file": None,
+            "backend": None,
             "source": None,
             "resolved_via": None,
             "fps_in": 0.0,
             "fps_proc": 0.0,
             "counts": dict(self.cumulative),
             "current_visible": dict(self.current_visible),
-            "frames": 0
-        }
+            "frames": 0,
+            "degrade": {"level": 0, "interval": None, "imgsz": None},
+        })
+        self._publish_lock = threading.Lock()  # writers only (session + reader threads)
+        self.frames = 0
         self.local_upload_path = None  # for auto-delete
 
+        # reader -> inference -> annotate/encode, each on its own thread
+        self.read_q = DropQueue(maxsize=HANDOFF)
+        self.encode_q = DropQueue(maxsize=HANDOFF)
+        self.stage_stats = {name: StageStats(name) for name in STAGES}
+        self.latency = LatencyWindow()  # frame read -> counted (or JPEG published when watched)
+        self.rate_in = RateWindow()     # moving-window fps: frames read / frames inferred
+        self.rate_proc = RateWindow()
+        self.reader = None  # ResilientReader: read-ahead + reconnects
+        self._stage_threads = {}  # name -> Thread, for the profiler
+        self.trace = None  # StageTrace while recording
+        self.degrade = 0  # load shedding level set by the StreamManager
+
     def _reset(self):
         self.tracker = sv.ByteTrack()
-        self.seen_ids = {k: set() for k in COUNTABLE}
+        self.counter = TrackCounter(COUNTABLE, NAME_MAP)
         self.cumulative = {k: 0 for k in COUNTABLE}
         self.current_visible = {k: 0 for k in COUNTABLE}
-        with self.stats_lock:
-            self.stats["counts"] = dict(self.cumulative)
-            self.stats["current_visible"] = dict(self.current_visible)
+        self._publish(counts=dict(self.cumulative), current_visible=dict(self.current_visible))
+
+    def _publish(self, **changes):
+        # copy-on-write + a single reference swap (atomic under the GIL)
+        with self._publish_lock:
+            snap = dict(self._snapshot)
+            snap.update(changes)
+            self._snapshot = MappingProxyType(snap)
+
+    def _publish_counts(self, fps_proc: float = None):
+        self.cumulative = self.counter.totals_dict()
+        self.current_visible = self.counter.current_dict()
+        changes = {
+            "counts": self.cumulative,
+            "current_visible": self.current_visible,
+            "frames": self.frames,
+        }
+        if fps_proc is not None:
+            changes["fps_proc"] = fps_proc
+        if self.engine.enabled:
+            changes.update(self.engine.stats())
+        self._publish(**changes)
 
     def _update_counts(self, tracks: sv.Detections, class_names: dict):
-        curr = {k: 0 for k in COUNTABLE}
-        if len(tracks) > 0:
-            ids = tracks.tracker_id
-            class_ids = tracks.class_id
-            for i in range(len(tracks)):
-                tid = int(ids[i]) if ids is not None else None
-                cid = int(class_ids[i])
-                name = class_names.get(cid, str(cid)).lower()
-                mapped = NAME_MAP.get(name)
-                if mapped in COUNTABLE:
-                    curr[mapped] += 1
-                    if tid is not None and tid not in self.seen_ids[mapped]:
-                        self.seen_ids[mapped].add(tid)
-                        self.cumulative[mapped] += 1
-        with self.stats_lock:
-            self.stats["counts"] = dict(self.cumulative)
-            self.stats["current_visible"] = dict(curr)
-
-    def run(self, model_file: str, source: str, conf: float, imgsz: int, interval: int):
+        self.counter.update(tracks.class_id, tracks.tracker_id, class_names)
+        if self.engine.enabled and tracks.tracker_id is not None:
+            keep = self.counter.last_keep
+            self.engine.update(tracks.xyxy[keep], tracks.tracker_id[keep], self.counter.last_cls_idx)
+
+    def run(self, model_file: str, source: str, conf: float, imgsz: int, interval: int, options: dict = None):
+        options = options or {}
         self.stop_event.clear()
         self._reset()
+        self.encoder = JpegEncoder(
+            quality=int(options.get("jpeg_quality") or 80),
+            max_width=options.get("max_width"),
+            budget_ms=options.get("encode_budget_ms"),
+            adaptive=bool(options.get("adaptive_encode")),
+        )
+        self.motion = MotionGate(
+            enabled=bool(options.get("adaptive")),
+            threshold=float(options.get("motion_threshold") or 0.001),
+            max_skip=int(options.get("max_skip") or 10),
+        )
 
-        with self.stats_lock:
-            self.stats.update({"status":"starting","model_file":model_file,"source":source})
-
-        model_path = os.path.join(MODELS_DIR, model_file)
-        model = YOLO(model_path)
+        self._publish(status="starting", model_file=model_file, source=source)
 
+        try:
+            # a first use of an exported backend includes the export
+            entry = model_registry.acquire(model_file, options.get("backend"))
+        except Exception as e:
+            print("Model load failed:", e)
+            self._publish(status="failed_model")
+            return
+        self._entry = entry
+        self._publish(backend=entry.backend)
+        self._batch_key = inference_scheduler.register(entry, imgsz)
+        self._publish(run=self.history.new_run(source, model_file))
+        history_writer.register(self.history)
+        read_ahead = max(1, min(MAX_READ_AHEAD, int(options.get("read_ahead") or READ_AHEAD)))
+        capture_opts = {
+            "backend": options.get("capture_backend"),
+            "threads": options.get("decode_threads") or DECODE_THREADS,
+            "hw_accel": bool(options.get("hw_decode")),
+            "width": options.get("decode_width"),
+            "skip": options.get("decode_skip") or 0,
+            # frames alive at once: read-ahead buffer, read_q and encode_q, plus
+            # one each being decoded, read, inferred, plotted and encoded
+            "hold": read_ahead + 2 * HANDOFF + 5,
+        }
+        try:
+            self._run_loop(source, conf, imgsz, interval, capture_opts, read_ahead=read_ahead, geometry=options)
+        finally:
+            history_writer.unregister(self.history)
+            inference_scheduler.unregister(self._batch_key)
+            model_registry.release(entry.model_file, entry)
+
+    def _run_loop(self, source: str, conf: float, imgsz: int, interval: int, capture_opts: dict,
+                  read_ahead: int = READ_AHEAD, geometry: dict = None):
         # detect if local upload
         if os.path.exists(source) and source.startswith(UPLOAD_DIR):
             self.local_upload_path = source
         else:
             self.local_upload_path = None
 
-        cap, via = open_source(source)
+        cap, via = open_source(source, **capture_opts)
         if cap is None:
-            with self.stats_lock:
-                self.stats["status"] = "failed_open"
+            self._publish(status="failed_open")
             return
 
-        with self.stats_lock:
-            self.stats["resolved_via"] = via
-            self.stats["status"] = "running"
+        # lines / zones / roi are given in source pixels; decode_width scales the frames
+        sx, sy = cap.scale() if hasattr(cap, "scale") else (1.0, 1.0)
+        if geometry and (sx, sy) != (1.0, 1.0):
+            self._scale_geometry(geometry, sx, sy)
 
         input_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
-        with self.stats_lock:
-            self.stats["fps_in"] = float(input_fps)
+        self._publish(resolved_via=via, status="running", fps_in=float(input_fps),
+                      capture=getattr(cap, "name", "opencv"))
+
+        # live sources drop stale frames between stages; files must not lose any
+        self.read_q = DropQueue(maxsize=HANDOFF, drop_oldest=(via != "file"))
+        self.encode_q = DropQueue(maxsize=HANDOFF, drop_oldest=True)
+        for st in self.stage_stats.values():
+            st.reset()
+        self.latency.reset()
+        self.rate_in.reset()
+        self.rate_proc.reset()
+
+        # live feeds reconnect (re-resolving the URL) without resetting counts
+        self.reader = ResilientReader(
+            lambda: open_source(source, refresh=True, **capture_opts),
+            cap, via, live=(via != "file"), buffer=read_ahead,
+            stage=self.stage_stats["read"],
+            on_status=lambda status, via: self._publish(status=status, resolved_via=via),
+        ).start()
+        reader = threading.Thread(target=self._read_stage, daemon=True)
+        encoder = threading.Thread(target=self._encode_stage, daemon=True)
+        reader.start()
+        encoder.start()
+        self._stage_threads = {"read": reader, "encode": encoder}
+
+        failed = False
+        try:
+            self._infer_stage(conf, imgsz, interval)
+        except Exception as e:
+            # model error or a result that never arrived (scheduler timeout)
+            print("Inference failed:", repr(e))
+            failed = True
+        finally:
+            self.stop_event.set()
+            self.encode_q.put(END, force=True)
+            reader.join(timeout=2.0)
+            encoder.join(timeout=2.0)
+            self.reader.stop()
+
+        self._publish_counts()
+        self._publish(status="failed_infer" if failed else "stopped")
 
-        t0 = time.time()
-        proc = 0
-        frame_idx = 0
+        # Auto-delete uploaded local file (storage-friendly)
+        if self.local_upload_path and os.path.exists(self.local_upload_path):
+            try:
+                os.remove(self.local_upload_path)
+            except Exception as e:
+                print("Auto-delete upload failed:", e)
 
+    def _read_stage(self):
+        frame_idx = 0
         while not self.stop_event.is_set():
-            ok, frame = cap.read()
+            ok, frame = self.reader.read(self.stop_event)
             if not ok:
                 break
             frame_idx += 1
+            self.rate_in.tick()
+            if not self.read_q.put((frame_idx, frame, time.perf_counter()), stop_event=self.stop_event):
+                return
+        self.read_q.put(END, stop_event=self.stop_event)
+
+    def set_degrade(self, level: int):
+        # picked up by the inference loop on its next frame
+        self.degrade = max(0, min(MAX_DEGRADE, int(level)))
+
+    def _apply_degrade(self, level: int, base_imgsz: int, base_interval: int):
+        interval, imgsz = degraded(base_interval, base_imgsz, level)
+        if imgsz != self._batch_key[1]:
+            # move to the (model, imgsz) queue of the new size; release the old one
+            old = self._batch_key
+            self._batch_key = inference_scheduler.register(self._entry, imgsz)
+            inference_scheduler.unregister(old)
+        self._publish(degrade={"level": level, "interval": interval, "imgsz": imgsz})
+        return interval
+
+    def _infer_stage(self, conf: float, base_imgsz: int, base_interval: int):
+        stage = self.stage_stats["infer"]
+        track_stage = self.stage_stats["track"]
+        count_stage = self.stage_stats["count"]
+        t0 = time.time()
+        proc = 0
+        tracked = 0   # tracks in the last detected frame
+        level = self.degrade
+        interval = self._apply_degrade(level, base_imgsz, base_interval)
 
-            proc += 1
-            if proc % 20 == 0:
-                dt = time.time() - t0
-                with self.stats_lock:
-                    self.stats["fps_proc"] = proc / dt if dt > 0 else 0.0
-
-            # skip frames if interval > 1
-            if interval > 1 and (frame_idx % interval != 0):
-                ok_raw, jpg_raw = cv2.imencode(".jpg", frame)
-                if ok_raw and not self.frame_q.full():
-                    self.frame_q.put(jpg_raw.tobytes())
+        while not self.stop_event.is_set():
+            item = self.read_q.get(timeout=0.5)
+            if item is None:
                 continue
+            if item is END:
+                break
+            frame_idx, frame, t_read = item
+            trace = self.trace
+            if trace is not None:
+                trace.mark(frame_idx)
 
-            res = model.predict(source=frame, conf=conf, imgsz=imgsz, verbose=False)[0]
-            dets = sv.Detections.from_ultralytics(res)
-            tracks = self.tracker.update_with_detections(dets)
-            class_names = res.names if hasattr(res, "names") else {}
-            self._update_counts(tracks, class_names)
-
-            plotted = res.plot()
-            ok2, jpg = cv2.imencode(".jpg", plotted)
-            if ok2 and not self.frame_q.full():
-                self.frame_q.put(jpg.tobytes())
-
-            with self.stats_lock:
-                self.stats["frames"] += 1
+            proc += 1
+            if self.degrade != level:
+                level = self.degrade
+                interval = self._apply_degrade(level, base_imgsz, base_interval)
 
-        try:
-            cap.release()
-        except Exception:
-            pass
+            # annotate + encode only while someone is watching
+            watched = self.broadcaster.viewers > 0
 
-        with self.stats_lock:
-            self.stats["status"] = "stopped"
+            # skip frames if interval > 1 (raw frame still goes to the viewer)
+            if interval > 1 and (frame_idx % interval != 0):
+                if watched:
+                    self.encode_q.put((frame, None, None, t_read))
+                continue
 
-        # Auto-delete uploaded local file (storage-friendly)
-        if self.local_upload_path and os.path.exists(self.local_upload_path):
-            try:
-                os.remove(self.local_upload_path)
-            except Exception as e:
-                print("Auto-delete upload failed:", e)
+            # adaptive mode: nothing moved since the last detection
+            if not self.motion.should_detect(frame):
+                if tracked == 0:
+                    # empty scene: keep the tracker's clock running so stale
+                    # lost tracks age out; with live tracks it is left frozen
+                    # instead, since empty updates would drop parked vehicles
+                    self.tracker.update_with_detections(sv.Detections.empty())
+                if watched:
+                    self.encode_q.put((frame, None, None, t_read))
+                continue
 
-        del model
+            with Timer(stage):
+                # batched with other sessions running the same model + imgsz
+                if self.roi.active:
+                    images, offsets = self.roi.split(frame)
+                    results = inference_scheduler.predict_many(self._batch_key, images, conf)
+                    dets = self.roi.merge(results, offsets)
+                    res = None
+                    class_names = getattr(results[0], "names", {})
+                else:
+                    res = inference_scheduler.predict(self._batch_key, frame, conf)
+                    dets = sv.Detections.from_ultralytics(res)
+                    class_names = res.names if hasattr(res, "names") else {}
+            with Timer(track_stage):
+                tracks = self.tracker.update_with_detections(dets)
+                tracked = len(tracks)
+            with Timer(count_stage):
+                self._update_counts(tracks, class_names)
+                self.history.record(time.time(), self.counter.totals, self.counter.current)
+
+            if watched:
+                self.encode_q.put((frame, res, dets if res is None else None, t_read))
+            else:
+                self.latency.record(time.perf_counter() - t_read)
+
+            self.frames += 1
+            self.rate_proc.tick()
+            if self.frames % STATS_EVERY == 0:
+                dt = time.time() - t0
+                self._publish_counts(fps_proc=proc / dt if dt > 0 else 0.0)
+
+    def _encode_stage(self):
+        plot_stage = self.stage_stats["plot"]
+        stage = self.stage_stats["encode"]
+        while True:
+            item = self.encode_q.get(timeout=0.5)
+            if item is None:
+                if self.stop_event.is_set():
+                    return
+                continue
+            if item is END:
+                return
+            frame, res, dets, t_read = item
+            with Timer(plot_stage):
+                if res is not None:
+                    img = res.plot()
+                elif dets is not None:
+                    img = _annotate(frame, dets)
+                else:
+                    img = frame
+                if self.roi.active:
+                    img = self.roi.draw(img)
+                if self.engine.enabled:
+                    self.engine.draw(img)
+            with Timer(stage):
+                jpg = self.encoder.encode(img)
+            if jpg is not None:
+                self.broadcaster.publish(jpg)
+                self.latency.record(time.perf_counter() - t_read)
+
+    def _scale_geometry(self, options: dict, sx: float, sy: float):
+        def pts(points):
+            return [[float(x) * sx, float(y) * sy] for x, y in points]
+        lines = [dict(l, points=pts(l["points"])) for l in options.get("lines") or []]
+        zones = [dict(z, polygon=pts(z["polygon"])) for z in options.get("zones") or []]
+        roi = options.get("roi")
+        # already validated by start()
+        self.engine = CountingEngine(lines=lines, zones=zones)
+        self.roi = RegionOfInterest(
+            polygon=[[int(round(x)), int(round(y))] for x, y in pts(roi)] if roi else None,
+            tiles=options.get("tiles"),
+            overlap=float(options.get("tile_overlap") or 0.2),
+        )
 
-    def start(self, model_file, source, conf, imgsz, interval):
+    def start(self, model_file, source, conf, imgsz, interval, options=None):
         if self.thread and self.thread.is_alive():
             return False, "session already running"
+        options = options or {}
+        try:
+            self.engine = CountingEngine(lines=options.get("lines"), zones=options.get("zones"))
+        except (ValueError, TypeError, AttributeError) as e:
+            return False, f"invalid lines/zones: {e}"
+        try:
+            self.roi = RegionOfInterest(
+                polygon=options.get("roi"),
+                tiles=options.get("tiles"),
+                overlap=float(options.get("tile_overlap") or 0.2),
+            )
+        except (ValueError, TypeError) as e:
+            return False, f"invalid roi/tiles: {e}"
+        self._publish(**self.engine.stats())
         self.thread = threading.Thread(
             target=self.run,
-            args=(model_file, source, conf, imgsz, interval),
+            args=(model_file, source, conf, imgsz, interval, options),
             daemon=True
         )
         self.thread.start()
@@ -167,33 +424,214 @@ class StreamSession:
         self.stop_event.set()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2.0)
-        while not self.frame_q.empty():
-            try:
-                self.frame_q.get_nowait()
-            except Exception:
-                break
+        self.broadcaster.reset()
 
-    def mjpeg_chunks(self):
-        while not self.stop_event.is_set():
-            try:
-                frame = self.frame_q.get(timeout=1.0)
-                yield frame
-            except queue.Empty:
-                continue
+    def mjpeg_chunks(self, max_fps: float = None):
+        yield from self.broadcaster.subscribe(self.stop_event, max_fps=max_fps)
 
     def get_stats(self):
-        with self.stats_lock:
-            return dict(self.stats)
+        out = dict(self._snapshot)
+        out["viewers"] = self.broadcaster.viewers
+        out["encode"] = self.encoder.stats()
+        out["motion"] = self.motion.stats()
+        out["roi"] = self.roi.stats()
+        out["seen_ids"] = self.counter.seen.stats()
+        out["stages"] = {
+            "read": self.stage_stats["read"].snapshot(self.read_q),
+            "infer": self.stage_stats["infer"].snapshot(),
+            "track": self.stage_stats["track"].snapshot(),
+            "count": self.stage_stats["count"].snapshot(),
+            "plot": self.stage_stats["plot"].snapshot(),
+            "encode": self.stage_stats["encode"].snapshot(self.encode_q),
+        }
+        out["latency"] = self.latency.snapshot()
+        out["fps_in_window"] = self.rate_in.rate()
+        out["fps_window"] = self.rate_proc.rate()
+        reader = self.reader
+        out["source_health"] = reader.stats() if reader is not None else None
+        return out
+
+    def thread_ids(self):
+        """name -> thread ident of every thread doing work for this session."""
+        out = {"session": self.thread.ident if self.thread else None}
+        out.update({name: t.ident for name, t in self._stage_threads.items() if t.is_alive()})
+        reader = self.reader
+        if reader is not None and reader.thread is not None:
+            out["decode"] = reader.thread.ident
+        q = inference_scheduler.queues.get(getattr(self, "_batch_key", None))
+        if q is not None and q.thread is not None:
+            out["batch"] = q.thread.ident   # shared with other sessions on the same model + imgsz
+        return out
+
+    def profile(self, seconds: float = 5.0, hz: float = PROFILE_HZ):
+        if not (self.thread and self.thread.is_alive()):
+            return None
+        return dict(sample_threads(self.thread_ids(), seconds, hz), sid=self.sid)
 
-class StreamManager:
-    def __init__(self, max_sessions: int = 4):
-        self.sessions = {sid: StreamSession(sid) for sid in range(1, max_sessions + 1)}
+    def record_trace(self, seconds: float = 5.0, path: str = None):
+        """Attaches a StageTrace for `seconds` (or until the session stops), then writes it."""
+        if not (self.thread and self.thread.is_alive()) or self.trace is not None:
+            return None
+        trace = StageTrace()
+        names = {ident: name for name, ident in self.thread_ids().items() if ident}
+        self.trace = trace
+        for st in self.stage_stats.values():
+            st.trace = trace
+        try:
+            self.stop_event.wait(max(0.1, min(MAX_PROFILE_S, float(seconds))))
+        finally:
+            for st in self.stage_stats.values():
+                st.trace = None
+            self.trace = None
+        path = path or os.path.join(TRACE_DIR, f"session{self.sid}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        trace.write(path, names)
+        return {"sid": self.sid, "path": path, "events": len(trace.events), "dropped": trace.dropped,
+                "stages": trace.summary()}
+
+    def metrics(self):
+        """Raw counters / histograms for /metrics (see StreamManager.metrics_text)."""
+        reader = self.reader
+        read_ahead = reader.buffer if reader is not None else None
+        return {
+            "stages": {name: st.hist.snapshot() for name, st in self.stage_stats.items()},
+            "frames_read": self.stage_stats["read"].count,
+            "frames_inferred": self.frames,
+            "fps_in_window": self.rate_in.rate(),
+            "fps_window": self.rate_proc.rate(),
+            "queues": {
+                "read_ahead": (len(read_ahead), read_ahead.dropped) if read_ahead is not None else (0, 0),
+                "read": (len(self.read_q), self.read_q.dropped),
+                "encode": (len(self.encode_q), self.encode_q.dropped),
+            },
+            "reconnects": reader.reconnects if reader is not None else 0,
+        }
 
-    def start_session(self, sid, model_file, source, conf, imgsz, interval):
-        s = self.sessions.get(sid)
-        if not s:
-            return False, "invalid sid"
-        return s.start(model_file, source, conf, imgsz, interval)
+def _running(s) -> bool:
+    return bool(s.thread and s.thread.is_alive())
+
+class StreamManager:
+    """
+    Sessions are created on demand, with a server-assigned sid unless the
+    client picks one. A monitor thread samples CPU / inference load: above
+    HIGH_LOAD the costliest of the least degraded sessions
+    is degraded one step (fewer frames
+    inferred, then smaller imgsz), below LOW_LOAD the most degraded one is
+    restored. A new session is refused only when the projected load is too
+    high and every running session is already fully degraded. Stopped
+    sessions are reclaimed after IDLE_TTL.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, mode: str = SESSION_MODE):
+        self.mode = mode
+        self.session_cls = ProcessStreamSession if mode == "process" else StreamSession
+        self.max_sessions = max_sessions    # 0 = no hard cap
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.idle_since = {}    # sid -> monotonic time it was first seen stopped
+        self.next_sid = 1
+        self.monitor = LoadMonitor()
+        self.monitor_thread = None
+        self.last_degrade = 0.0
+        # totals of sessions already reclaimed, so exported counters never go backwards
+        self.retired = {"stages": {}, "frames_read": 0, "frames_inferred": 0, "dropped": {}, "reconnects": 0}
+        # one shared poller behind every /streams/events client
+        self.publisher = StatsPublisher(self.get_stats, self.list_sids)
+
+    def list_sids(self):
+        with self.lock:
+            return sorted(self.sessions.keys())
+
+    def _new_sid(self):
+        while self.next_sid in self.sessions:
+            self.next_sid += 1
+        self.next_sid += 1
+        return self.next_sid - 1
+
+    def _degrade_one(self, running):
+        """Degrades one session that still has a step left; returns its sid or None."""
+        candidates = [(s.degrade, session_cost(st), sid, s) for sid, s, st in running if s.degrade < MAX_DEGRADE]
+        if not candidates:
+            return None
+        # spread the pain: least degraded first, the costliest of those
+        _, _, sid, s = min(candidates, key=lambda c: (c[0], -c[1]))
+        s.set_degrade(s.degrade + 1)
+        self.last_degrade = time.monotonic()
+        return sid
+
+    def _running_stats(self):
+        with self.lock:
+            items = list(self.sessions.items())
+        return [(sid, s, s.get_stats()) for sid, s in items if _running(s)]
+
+    def start_session(self, sid, model_file, source, conf, imgsz, interval, options=None):
+        """Returns (ok, message, sid); sid 0 / None lets the server pick one."""
+        with self.lock:
+            if sid and sid in self.sessions and _running(self.sessions[sid]):
+                return False, "session already running", sid
+            n_running = sum(1 for s in self.sessions.values() if _running(s))
+        if self.max_sessions and n_running >= self.max_sessions:
+            return False, f"session limit reached ({self.max_sessions})", None
+
+        projected = self.monitor.projected(n_running + 1)
+        if n_running and projected > ADMIT_LOAD:
+            # make room by shedding load first; refuse only when nothing is left to shed
+            if self._degrade_one(self._running_stats()) is None:
+                return False, f"no capacity (load {projected:.2f}, all sessions degraded)", None
+
+        with self.lock:
+            if not sid:
+                sid = self._new_sid()
+            elif sid in self.sessions and _running(self.sessions[sid]):
+                return False, "session already running", sid
+            s = self.session_cls(sid)
+            ok, msg = s.start(model_file, source, conf, imgsz, interval, options)
+            if not ok:
+                return False, msg, None
+            if sid in self.sessions:
+                self._retire(self.sessions[sid])
+            self.sessions[sid] = s
+            self.idle_since.pop(sid, None)
+            self.monitor.admitted += 1
+            if self.monitor_thread is None:
+                self.monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+                self.monitor_thread.start()
+        return True, msg, sid
+
+    def _monitor(self):
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            try:
+                self._rebalance()
+                self._reap()
+            except Exception as e:
+                print("session monitor error:", e)
+
+    def _rebalance(self):
+        with self.lock:
+            items = list(self.sessions.items())
+        stats = {sid: s.get_stats() for sid, s in items}
+        load = self.monitor.sample(stats)
+        running = [(sid, s, stats[sid]) for sid, s in items if _running(s)]
+        if load > HIGH_LOAD:
+            self._degrade_one(running)
+        elif load < LOW_LOAD and time.monotonic() - self.last_degrade > RESTORE_HOLD_S:
+            shed = [(s.degrade, sid, s) for sid, s, _ in running if s.degrade > 0]
+            if shed:
+                _, _, s = max(shed, key=lambda d: (d[0], -d[1]))
+                s.set_degrade(s.degrade - 1)
+
+    def _reap(self):
+        now = time.monotonic()
+        with self.lock:
+            for sid, s in list(self.sessions.items()):
+                if _running(s):
+                    self.idle_since.pop(sid, None)
+                    continue
+                since = self.idle_since.setdefault(sid, now)
+                if now - since >= IDLE_TTL:
+                    self._retire(s)
+                    del self.sessions[sid]
+                    del self.idle_since[sid]
 
     def stop_session(self, sid):
         s = self.sessions.get(sid)
@@ -202,13 +640,13 @@ class StreamManager:
 
     def has_session(self, sid):
         s = self.sessions.get(sid)
-        return s and s.thread and s.thread.is_alive()
+        return s is not None and _running(s)
 
-    def mjpeg_generator(self, sid):
+    def mjpeg_generator(self, sid, max_fps=None):
         s = self.sessions.get(sid)
         if not s:
             return
-        yield from s.mjpeg_chunks()
+        yield from s.mjpeg_chunks(max_fps=max_fps)
 
     def get_stats(self, sid):
         s = self.sessions.get(sid)
@@ -216,5 +654,119 @@ class StreamManager:
             return None
         return s.get_stats()
 
+    def profile_session(self, sid, seconds=5.0, hz=PROFILE_HZ):
+        s = self.sessions.get(sid)
+        if not s:
+            return None
+        return s.profile(seconds, hz)
+
+    def trace_session(self, sid, seconds=5.0):
+        s = self.sessions.get(sid)
+        if not s:
+            return None
+        return s.record_trace(seconds)
+
+    def list_sessions(self):
+        with self.lock:
+            items = sorted(self.sessions.items())
+        sessions = []
+        for sid, s in items:
+            st = s.get_stats()
+            sessions.append({
+                "sid": sid,
+                "status": st.get("status"),
+                "running": _running(s),
+                "model_file": st.get("model_file"),
+                "backend": st.get("backend"),
+                "source": st.get("source"),
+                "fps_proc": st.get("fps_proc", 0.0),
+                "frames": st.get("frames", 0),
+                "degrade": st.get("degrade"),
+                "viewers": st.get("viewers", 0),
+            })
+        return {
+            "sessions": sessions,
+            "running": sum(1 for x in sessions if x["running"]),
+            "max_sessions": self.max_sessions or None,
+            "idle_ttl_s": IDLE_TTL,
+            "load": self.monitor.stats(),
+        }
+
+    def stats_events(self, sids=None, rate=2.0):
+        yield from self.publisher.subscribe(sids, rate)
+
+    def _retire(self, s):
+        m = s.metrics()
+        if not m:
+            return
+        r = self.retired
+        for name, snap in m["stages"].items():
+            r["stages"][name] = merge_histograms([snap] + ([r["stages"][name]] if name in r["stages"] else []))
+        r["frames_read"] += m["frames_read"]
+        r["frames_inferred"] += m["frames_inferred"]
+        r["reconnects"] += m["reconnects"]
+        for q, (_, dropped) in m["queues"].items():
+            r["dropped"][q] = r["dropped"].get(q, 0) + dropped
+
+    def metrics_text(self):
+        """All sessions (plus reclaimed ones) in Prometheus text format."""
+        with self.lock:
+            items = sorted(self.sessions.items())
+            r = self.retired
+            retired = dict(r, stages=dict(r["stages"]), dropped=dict(r["dropped"]))
+        live = [(sid, s, s.metrics()) for sid, s in items]
+        live = [(sid, s, m) for sid, s, m in live if m]
+        w = PromText()
+
+        w.sample("sessions", "gauge", "Sessions by state.",
+                 sum(1 for _, s in items if _running(s)), {"state": "running"})
+        w.sample("sessions", "gauge", "Sessions by state.",
+                 sum(1 for _, s in items if not _running(s)), {"state": "stopped"})
+
+        for stage in STAGES:
+            snaps = [m["stages"][stage] for _, _, m in live if stage in m["stages"]]
+            if stage in retired["stages"]:
+                snaps.append(retired["stages"][stage])
+            w.histogram("stage_latency_seconds", "Per-frame time spent in each pipeline stage.",
+                        merge_histograms(snaps), {"stage": stage})
+
+        w.sample("frames_read_total", "counter", "Frames decoded.",
+                 retired["frames_read"] + sum(m["frames_read"] for _, _, m in live))
+        w.sample("frames_inferred_total", "counter", "Frames run through detection + tracking.",
+                 retired["frames_inferred"] + sum(m["frames_inferred"] for _, _, m in live))
+        w.sample("reconnects_total", "counter", "Live source reconnects.",
+                 retired["reconnects"] + sum(m["reconnects"] for _, _, m in live))
+        for q in ("read_ahead", "read", "encode"):
+            w.sample("dropped_frames_total", "counter", "Frames dropped by a full stage queue.",
+                     retired["dropped"].get(q, 0) + sum(m["queues"][q][1] for _, _, m in live), {"queue": q})
+        for q in ("read_ahead", "read", "encode"):
+            w.sample("queue_depth", "gauge", "Frames waiting in each stage queue, all sessions.",
+                     sum(m["queues"][q][0] for _, _, m in live), {"queue": q})
+
+        w.sample("fps", "gauge", "Frames inferred per second, last 5 s, all sessions.",
+                 sum(m["fps_window"] for _, _, m in live))
+        running = [(sid, s, m) for sid, s, m in live if _running(s)]
+        # one family at a time: the text format wants a metric's samples grouped
+        for sid, s, m in running:
+            w.sample("session_fps", "gauge", "Frames inferred per second, last 5 s.", m["fps_window"], {"sid": sid})
+        for sid, s, m in running:
+            w.sample("session_fps_in", "gauge", "Frames read per second, last 5 s.", m["fps_in_window"], {"sid": sid})
+        for sid, s, m in running:
+            w.sample("session_degrade_level", "gauge", "Load shedding level (0 = none).", s.degrade, {"sid": sid})
+
+        sched = inference_scheduler.get_stats()
+        w.sample("inference_busy_seconds_total", "counter", "Time spent in batched predict() calls.",
+                 sched["busy_s"])
+        w.sample("inference_pending", "gauge", "Frames waiting for a batch.",
+                 sum(q["pending"] for q in sched["queues"]))
+        load = self.monitor.stats()
+        for key in ("load", "cpu", "inference"):
+            w.sample("load", "gauge", "Measured utilisation (1.0 = saturated).", load[key], {"kind": key})
+        return w.text()
+
+    def get_scheduler_stats(self):
+        # in process mode every child batches on its own
+        return dict(inference_scheduler.get_stats(), mode=self.mode)
+
 # Singleton manager
-stream_manager = StreamManager(max_sessions=4)
+stream_manager = StreamManager()
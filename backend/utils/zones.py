@@ -0,0 +1,184 @@
+import numpy as np
+import cv2
+
+from .counting import COUNTABLE
+
+
+def _as_points(pts, min_len, what):
+    arr = np.asarray(pts, dtype=np.float64)
+    if arr.ndim != 2 or arr.shape[1] != 2 or arr.shape[0] < min_len:
+        raise ValueError(f"{what} needs at least {min_len} [x, y] points")
+    return arr
+
+
+def _cross(ox, oy, ax, ay, bx, by):
+    # z of (a - o) x (b - o), broadcasting
+    return (ax - ox) * (by - oy) - (ay - oy) * (bx - ox)
+
+
+class CountingEngine:
+    """
+    Directional line-crossing and polygon-zone counts for one session.
+
+    Each track is reduced to its bottom-centre anchor (where the vehicle
+    touches the road). The previous anchor of every track is kept in
+    sorted arrays, so one frame is a handful of array ops over
+    tracks x lines and tracks x polygon edges.
+
+    lines: [{"name": "north", "points": [[x1, y1], [x2, y2]]}, ...]
+        "in" = crossing from the left of a->b to its right as seen on screen
+        (top-to-bottom for a left-to-right line), "out" = the opposite.
+    zones: [{"name": "junction", "polygon": [[x, y], ...]}, ...]
+    """
+
+    def __init__(self, lines=None, zones=None, classes=COUNTABLE, max_age: int = 30):
+        self.classes = tuple(classes)
+        self.max_age = max_age
+        n = len(self.classes)
+
+        lines = lines or []
+        self.line_names = [str(l.get("name") or f"line{i + 1}") for i, l in enumerate(lines)]
+        segs = [_as_points(l.get("points"), 2, "line")[:2] for l in lines]
+        self.line_a = np.array([s[0] for s in segs], dtype=np.float64).reshape(-1, 2)
+        self.line_b = np.array([s[1] for s in segs], dtype=np.float64).reshape(-1, 2)
+        self.line_counts = np.zeros((len(segs), 2, n), dtype=np.int64)  # [line, in/out, class]
+        self._line_e = self.line_b - self.line_a
+
+        zones = zones or []
+        self.zone_names = [str(z.get("name") or f"zone{i + 1}") for i, z in enumerate(zones)]
+        self.polygons = [_as_points(z.get("polygon"), 3, "zone") for z in zones]
+        self.zone_current = np.zeros((len(self.polygons), n), dtype=np.int64)
+        self.zone_entered = np.zeros((len(self.polygons), n), dtype=np.int64)
+
+        # all polygon edges flattened, so inside-tests are one (tracks x edges) op
+        if self.polygons:
+            x1 = np.concatenate([p[:, 0] for p in self.polygons])
+            y1 = np.concatenate([p[:, 1] for p in self.polygons])
+            x2 = np.concatenate([np.roll(p[:, 0], -1) for p in self.polygons])
+            y2 = np.concatenate([np.roll(p[:, 1], -1) for p in self.polygons])
+            dy = y2 - y1
+            # horizontal edges never straddle a ray, their slope is irrelevant
+            self._edge_x1, self._edge_y1, self._edge_y2 = x1, y1, y2
+            self._edge_k = np.divide(x2 - x1, dy, out=np.zeros_like(dy), where=dy != 0)
+            self._edge_starts = np.cumsum([0] + [len(p) for p in self.polygons[:-1]])
+
+        # per-track state, sorted by id
+        self.prev_ids = np.zeros(0, dtype=np.int64)
+        self.prev_xy = np.zeros((0, 2), dtype=np.float64)
+        self.prev_inside = np.zeros((0, len(self.polygons)), dtype=bool)
+        self.prev_frame = np.zeros(0, dtype=np.int64)
+        self.frame = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(len(self.line_names) or len(self.zone_names))
+
+    def _inside(self, xy: np.ndarray) -> np.ndarray:
+        # even-odd ray casting: all points x all edges of all polygons at once
+        if xy.shape[0] == 0 or not self.polygons:
+            return np.zeros((xy.shape[0], len(self.polygons)), dtype=bool)
+        px = xy[:, 0:1]
+        py = xy[:, 1:2]
+        straddle = (self._edge_y1 > py) != (self._edge_y2 > py)
+        x_at = self._edge_x1 + (py - self._edge_y1) * self._edge_k
+        hits = (straddle & (px < x_at)).astype(np.int32)
+        per_zone = np.add.reduceat(hits, self._edge_starts, axis=1)
+        return (per_zone & 1).astype(bool)
+
+    def update(self, xyxy: np.ndarray, tracker_ids: np.ndarray, cls_idx: np.ndarray):
+        """xyxy / tracker_ids / cls_idx for countable tracks only (cls_idx into self.classes)."""
+        self.frame += 1
+        n_cls = len(self.classes)
+        tids = np.asarray(tracker_ids, dtype=np.int64)
+        cls_idx = np.asarray(cls_idx, dtype=np.int64)
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        xy = np.stack([(xyxy[:, 0] + xyxy[:, 2]) * 0.5, xyxy[:, 3]], axis=1)
+
+        # match against previous anchors
+        if self.prev_ids.size:
+            pos = np.searchsorted(self.prev_ids, tids)
+            pos_c = np.minimum(pos, self.prev_ids.size - 1)
+            matched = self.prev_ids[pos_c] == tids
+        else:
+            pos_c = np.zeros(tids.shape, dtype=np.int64)
+            matched = np.zeros(tids.shape, dtype=bool)
+
+        # ---------- LINES ----------
+        if self.line_a.shape[0] and matched.any():
+            p = self.prev_xy[pos_c[matched]]            # (M, 2)
+            q = xy[matched]
+            c = cls_idx[matched]
+            ax, ay = self.line_a[:, 0], self.line_a[:, 1]
+            ex, ey = self._line_e[:, 0], self._line_e[:, 1]
+            px, py, qx, qy = p[:, 0:1], p[:, 1:2], q[:, 0:1], q[:, 1:2]
+            # side of the previous / current anchor w.r.t. each line (M, L)
+            d1 = ex * (py - ay) - ey * (px - ax)
+            d2 = ex * (qy - ay) - ey * (qx - ax)
+            t_idx, l_idx = np.nonzero(d1 * d2 < 0)
+            if t_idx.size:
+                # only for anchors that switched sides: did the motion pass between a and b?
+                mx = q[t_idx, 0] - p[t_idx, 0]
+                my = q[t_idx, 1] - p[t_idx, 1]
+                d3 = _cross(p[t_idx, 0], p[t_idx, 1], q[t_idx, 0], q[t_idx, 1], ax[l_idx], ay[l_idx])
+                d4 = d3 + mx * ey[l_idx] - my * ex[l_idx]
+                hit = d3 * d4 < 0
+                t_idx, l_idx = t_idx[hit], l_idx[hit]
+                direction = (d1[t_idx, l_idx] > 0).astype(np.int64)   # 0 = in, 1 = out
+                flat = (l_idx * 2 + direction) * n_cls + c[t_idx]
+                self.line_counts += np.bincount(flat, minlength=self.line_counts.size).reshape(self.line_counts.shape)
+
+        # ---------- ZONES ----------
+        inside = self._inside(xy)
+        if self.polygons:
+            prev_in = np.zeros_like(inside)
+            if matched.any():
+                prev_in[matched] = self.prev_inside[pos_c[matched]]
+            entered = inside & ~prev_in
+            size = self.zone_current.size
+            t_idx, z_idx = np.nonzero(inside)
+            self.zone_current = np.bincount(
+                z_idx * n_cls + cls_idx[t_idx], minlength=size).reshape(self.zone_current.shape)
+            if entered.any():
+                t_idx, z_idx = np.nonzero(entered)
+                self.zone_entered += np.bincount(
+                    z_idx * n_cls + cls_idx[t_idx], minlength=size).reshape(self.zone_entered.shape)
+
+        # ---------- STATE ----------
+        # keep briefly-lost tracks so a re-found track still has its last anchor
+        keep_old = np.ones(self.prev_ids.shape, dtype=bool)
+        if matched.any():
+            keep_old[pos_c[matched]] = False
+        keep_old &= (self.frame - self.prev_frame) <= self.max_age
+
+        ids = np.concatenate([self.prev_ids[keep_old], tids])
+        order = np.argsort(ids, kind="stable")
+        self.prev_ids = ids[order]
+        self.prev_xy = np.concatenate([self.prev_xy[keep_old], xy])[order]
+        self.prev_inside = np.concatenate([self.prev_inside[keep_old], inside])[order]
+        self.prev_frame = np.concatenate([
+            self.prev_frame[keep_old], np.full(tids.shape, self.frame, dtype=np.int64)
+        ])[order]
+
+    def _per_class(self, row):
+        return {c: int(v) for c, v in zip(self.classes, row)}
+
+    def stats(self):
+        return {
+            "lines": {
+                name: {"in": self._per_class(self.line_counts[i, 0]),
+                       "out": self._per_class(self.line_counts[i, 1])}
+                for i, name in enumerate(self.line_names)
+            },
+            "zones": {
+                name: {"current": self._per_class(self.zone_current[i]),
+                       "entered": self._per_class(self.zone_entered[i])}
+                for i, name in enumerate(self.zone_names)
+            },
+        }
+
+    def draw(self, img):
+        for a, b in zip(self.line_a.astype(int), self.line_b.astype(int)):
+            cv2.line(img, tuple(a), tuple(b), (0, 255, 255), 2)
+        for poly in self.polygons:
+            cv2.polylines(img, [poly.astype(np.int32)], True, (255, 200, 0), 2)
+        return img